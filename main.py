@@ -1,25 +1,234 @@
+"""
+Command-line entry point of the scheduling assistant.
+
+Only the standard library and python-dotenv are imported at module load.
+Telemetry is set up first, then crewAI and the Google clients are
+imported: that way ``--help`` answers immediately, settings read at
+import time see the .env file, and the instrumentation is in place before
+the libraries it patches are loaded.
+"""
+
+import argparse
+import functools
 import os
+
 from dotenv import load_dotenv
-from traceloop.sdk import Traceloop
-from crewai_observability.crew import SchedulingCrew
 
-def main():
+OTLP_ENDPOINT = "http://localhost:4318"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the AI scheduling assistant."
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Process every meeting request found in its own concurrent "
+        "pipeline instead of a single sequential crew.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and process new inbox messages as they arrive.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the stages an interrupted earlier run already completed.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Maximum number of meeting requests processed at once.",
+    )
+    parser.add_argument(
+        "--accounts",
+        nargs="*",
+        metavar="ACCOUNT",
+        default=None,
+        help="Serve these accounts from the credential store, or every "
+        "stored account if none is named, on a pool of worker processes.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Number of worker processes the accounts are sharded across.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample the Python stacks of the run and attach them to the "
+        "run, task and tool spans (PROFILING_ENABLED).",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Seconds between profiler samples (PROFILING_INTERVAL).",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Also record memory allocated while each span is open, with "
+        "tracemalloc (PROFILING_MEMORY).",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        metavar="DIR",
+        help="Also write each profile as a collapsed-stack file in DIR "
+        "(PROFILING_OUTPUT_DIR).",
+    )
+    return parser.parse_args(argv)
+
+
+def profiling_settings(args):
+    """
+    Returns the profiling settings given on the command line, as the
+    environment variables they override. Passing them through the
+    environment also applies them to the shard worker processes.
+    """
+    settings = {}
+    if args.profile:
+        settings["PROFILING_ENABLED"] = "true"
+    if args.profile_interval is not None:
+        settings["PROFILING_INTERVAL"] = str(args.profile_interval)
+    if args.profile_memory:
+        settings["PROFILING_MEMORY"] = "true"
+    if args.profile_dir is not None:
+        settings["PROFILING_OUTPUT_DIR"] = args.profile_dir
+    return settings
+
+
+def init_telemetry():
+    """
+    Points the exporters at the OpenTelemetry Collector and initializes
+    OpenLLMetry. Must run before crewAI or any LLM client is imported.
+    """
+    # Exporters read the endpoint when they are created, so it has to be
+    # set first; an endpoint from the environment (e.g. docker compose)
+    # takes precedence.
+    endpoint = os.environ.setdefault(
+        "OTEL_EXPORTER_OTLP_ENDPOINT", OTLP_ENDPOINT
+    )
+
+    from traceloop.sdk import Traceloop
+
+    from crewai_observability.telemetry import span_processor
+    from crewai_observability.usage import install_usage_processor
+
+    # Initialize OpenLLMetry
+    Traceloop.init(
+        app_name="crewai_scheduling_assistant",
+        api_endpoint=endpoint,
+        processor=span_processor(),
+    )
+    # Roll LLM token usage and cost up by run, task and agent
+    install_usage_processor()
+
+
+def main(argv=None):
     """
     Main function to run the crew.
     """
+    args = parse_args(argv)
+    # Before any module reads its settings
+    os.environ.update(profiling_settings(args))
+
     # Load environment variables from .env file
     load_dotenv()
+    if args.daemon:
+        # A long-running process gets to reuse what the first calendar
+        # sync lists; one-shot runs would only pay for it.
+        os.environ.setdefault("CALENDAR_SYNC_IDS", "primary")
+    init_telemetry()
 
-    # Initialize OpenLLMetry
-    Traceloop.init(app_name="crewai_scheduling_assistant")
+    from crewai_observability.checkpoints import (
+        CHECKPOINT_RESUME,
+        StageCheckpoint,
+    )
+    from crewai_observability.crew import SchedulingCrew
+    from crewai_observability.daemon import AssistantDaemon
+    from crewai_observability.pipeline import (
+        PIPELINE_MAX_WORKERS,
+        SchedulingPipeline,
+    )
+    from crewai_observability.prefetch import calendar_prefetch
+    from crewai_observability.supervisor import (
+        SUPERVISOR_SHARDS,
+        Supervisor,
+        process_account,
+    )
+    from crewai_observability.usage import get_usage_processor, run_span
+
+    resume = args.resume or CHECKPOINT_RESUME
 
-    # Set the OTLP endpoint
-    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = "http://localhost:4318"
+    if args.accounts is not None:
+        supervisor = Supervisor(
+            accounts=args.accounts or None,
+            shards=args.shards or SUPERVISOR_SHARDS,
+            work=functools.partial(
+                process_account,
+                max_workers=args.workers or PIPELINE_MAX_WORKERS,
+                resume=resume,
+            ),
+            initializer=init_telemetry,
+        )
+        print(
+            f"Serving {len(supervisor.accounts)} accounts on "
+            f"{len(supervisor.plan())} shards..."
+        )
+        for report in supervisor.run():
+            print(
+                f"Shard {report.shard}: {report.processed} of "
+                f"{len(report.accounts)} accounts and {report.requests} "
+                f"requests in {report.elapsed:.1f}s "
+                f"({report.accounts_per_second:.2f} accounts/s, "
+                f"{report.requests_per_second:.2f} requests/s)"
+            )
+            for account, error in report.errors.items():
+                print(f"  {account} failed: {error}")
+        print("All shards finished.")
+        return
+
+    if args.daemon:
+        print("Starting the scheduling assistant daemon...")
+        pipeline = SchedulingPipeline(
+            max_workers=args.workers or PIPELINE_MAX_WORKERS, resume=resume
+        )
+        AssistantDaemon(pipeline=pipeline).serve_forever()
+        print("Daemon stopped.")
+        return
+
+    if args.parallel:
+        print("Kicking off the scheduling pipeline...")
+        pipeline = SchedulingPipeline(
+            max_workers=args.workers or PIPELINE_MAX_WORKERS, resume=resume
+        )
+        for result in pipeline.kickoff():
+            status = "done" if result.ok else f"failed: {result.error}"
+            print(f"Request finished in {result.elapsed:.1f}s ({status})")
+        print("Pipeline execution finished.")
+        return
 
     print("Kicking off the crew...")
-    crew = SchedulingCrew()
-    crew.crew().kickoff()
+    checkpoint = StageCheckpoint(resume=resume)
+    crew = SchedulingCrew(checkpoint=checkpoint)
+    with run_span("crew") as span, calendar_prefetch():
+        crew.crew().kickoff()
+        usage = get_usage_processor().run_usage(span)
+    checkpoint.finish()
     print("Crew execution finished.")
+    if usage is not None:
+        print(
+            f"LLM usage: {usage.total_tokens} tokens, "
+            f"about ${usage.cost:.4f}."
+        )
+
 
 if __name__ == "__main__":
     main()
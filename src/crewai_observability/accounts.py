@@ -0,0 +1,261 @@
+"""
+Per-account credentials and context for serving many mailboxes.
+
+The account being served is carried in a context variable set with
+``account_scope()``. The Google client registry, the quota executors, the
+busy cache and account-keyed local state all follow it, so one process
+can work for many users in turn while reusing its service objects and
+crews. Outside any account scope the assistant serves the single user of
+``token.json``, as before.
+
+Each account's OAuth token lives in its own file in CREDENTIALS_DIR, so
+refreshing one user's token never contends with another's. Writes and
+refreshes take an exclusive lock on that account's lock file, which keeps
+the worker processes of a shard pool from refreshing the same token twice
+or reading a half-written file. Accounts are added with:
+
+    python -m crewai_observability.accounts add alice@example.com
+"""
+
+import argparse
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+import threading
+import urllib.parse
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from .auth import CLIENT_SECRET_FILE, SCOPES
+
+CREDENTIALS_DIR = os.getenv("CREDENTIALS_DIR", ".credentials")
+# Refresh access tokens this many seconds before they expire.
+CREDENTIALS_REFRESH_MARGIN = int(
+    os.getenv("GOOGLE_CREDENTIALS_REFRESH_MARGIN", "300")
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_account = contextvars.ContextVar("account", default=None)
+
+
+def _lock_file(fh):
+    """Takes an exclusive lock on an open file, waiting for it."""
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        return
+    # msvcrt locks byte ranges from the current position, and LK_LOCK
+    # gives up after ten seconds of retries.
+    fh.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_UN)
+        return
+    fh.seek(0)
+    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class AccountNotFound(LookupError):
+    """Raised when an account has no stored credentials."""
+
+
+@contextlib.contextmanager
+def account_scope(account):
+    """Serves ``account`` for the work done in this context."""
+    token = _account.set(account)
+    try:
+        yield
+    finally:
+        _account.reset(token)
+
+
+def current_account():
+    """Returns the account being served, or None for the default user."""
+    return _account.get()
+
+
+def account_key(key, account=None):
+    """
+    Returns ``key`` namespaced by ``account`` (default: the current one),
+    for state that is kept per mailbox.
+    """
+    account = account if account is not None else current_account()
+    return key if account is None else f"{account}/{key}"
+
+
+def needs_refresh(creds, margin=CREDENTIALS_REFRESH_MARGIN):
+    """Tells whether ``creds`` expire within ``margin`` seconds."""
+    expiry = getattr(creds, "expiry", None)
+    if expiry is None or not creds.refresh_token:
+        return False
+    # google-auth stores expiry as a naive UTC datetime.
+    now = datetime.datetime.utcnow()
+    return expiry - now <= datetime.timedelta(seconds=margin)
+
+
+class CredentialStore:
+    """OAuth tokens by account, one file per account."""
+
+    def __init__(self, directory=CREDENTIALS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Serialized tokens as last read or written, by account.
+        self._stored = {}
+        self._lock = threading.Lock()
+
+    def path(self, account):
+        name = urllib.parse.quote(account, safe="@.-_")
+        return os.path.join(self.directory, f"{name}.json")
+
+    def accounts(self):
+        """Returns the accounts that have stored credentials, sorted."""
+        return sorted(
+            urllib.parse.unquote(name[: -len(".json")])
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        )
+
+    @contextlib.contextmanager
+    def locked(self, account):
+        """Holds the account's lock, across threads and processes."""
+        with open(self.path(account) + ".lock", "a") as fh:
+            _lock_file(fh)
+            try:
+                yield
+            finally:
+                _unlock_file(fh)
+
+    def _read(self, account):
+        try:
+            with open(self.path(account)) as fh:
+                token = fh.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._stored[account] = token
+        return token
+
+    def load(self, account):
+        """Returns the account's credentials, or None if there are none."""
+        token = self._read(account)
+        if token is None:
+            return None
+        return Credentials.from_authorized_user_info(json.loads(token), SCOPES)
+
+    def save(self, account, creds):
+        """
+        Persists the account's credentials, skipping the write if nothing
+        changed. The file is replaced atomically, under the account lock.
+        """
+        token = creds.to_json()
+        with self._lock:
+            if self._stored.get(account) == token:
+                return False
+        with self.locked(account):
+            self._write(account, token)
+        return True
+
+    def _write(self, account, token):
+        # Callers hold the account lock.
+        path = self.path(account)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial, "w") as fh:
+            fh.write(token)
+        os.replace(partial, path)
+        with self._lock:
+            self._stored[account] = token
+
+    def refresh(self, account, creds):
+        """
+        Brings ``creds`` up to date in place. Under the account lock, a
+        token another process refreshed in the meantime is adopted rather
+        than refreshed again.
+        """
+        with self.locked(account):
+            stored = self.load(account)
+            if stored is not None and not needs_refresh(stored):
+                creds.token = stored.token
+                creds.expiry = stored.expiry
+                return creds
+            creds.refresh(Request())
+            self._write(account, creds.to_json())
+        return creds
+
+    def remove(self, account):
+        with self.locked(account):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path(account))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path(account) + ".lock")
+        with self._lock:
+            self._stored.pop(account, None)
+
+    def authorize(self, account, client_secret_file=CLIENT_SECRET_FILE):
+        """Runs the OAuth consent flow for ``account`` and stores it."""
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        flow = InstalledAppFlow.from_client_secrets_file(
+            client_secret_file, SCOPES
+        )
+        creds = flow.run_local_server(port=0, login_hint=account)
+        self.save(account, creds)
+        return creds
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_credential_store():
+    """Returns the process-wide credential store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CredentialStore()
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Manage the accounts the assistant serves."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show the stored accounts.")
+    add = commands.add_parser("add", help="Authorize an account.")
+    add.add_argument("account", help="Email address of the account.")
+    remove = commands.add_parser("remove", help="Forget an account.")
+    remove.add_argument("account")
+    args = parser.parse_args(argv)
+
+    store = get_credential_store()
+    if args.command == "list":
+        accounts = store.accounts()
+        if not accounts:
+            print("No accounts are stored.")
+        for account in accounts:
+            print(account)
+    elif args.command == "add":
+        store.authorize(args.account)
+        print(f"Account {args.account} added.")
+    else:
+        store.remove(args.account)
+        print(f"Account {args.account} removed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Non-blocking human approval of proposed meeting slots.
+
+With APPROVAL_MODE=broker, the Human Approval Tool no longer prompts on
+the terminal. It files the proposed slots with the approval broker and
+parks its workflow until someone answers. Other workflows keep running
+while it waits. Pending approvals are listed and answered through a small
+local HTTP API, for which this module is also the command-line client:
+
+    python -m crewai_observability.approvals list
+    python -m crewai_observability.approvals approve <id> <slot number>
+    python -m crewai_observability.approvals reject <id>
+
+An approval left unanswered for APPROVAL_TIMEOUT seconds gets the
+APPROVAL_DEFAULT action: ``reject``, or ``first`` to take the first slot.
+The number of pending approvals and the time each one waited are
+exported as metrics, so human latency is visible apart from compute.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .telemetry import meter
+
+# "console" prompts on the terminal; "broker" waits for the approval API.
+APPROVAL_MODE = os.getenv("APPROVAL_MODE", "console")
+APPROVAL_HOST = os.getenv("APPROVAL_HOST", "127.0.0.1")
+APPROVAL_PORT = int(os.getenv("APPROVAL_PORT", "8765"))
+APPROVAL_TIMEOUT = float(os.getenv("APPROVAL_TIMEOUT", "900"))
+APPROVAL_DEFAULT = os.getenv("APPROVAL_DEFAULT", "reject")
+
+REJECTED = "The user did not approve any of the proposed slots."
+
+pending_approvals = meter.create_up_down_counter(
+    "assistant.approval.pending",
+    unit="{approval}",
+    description="Approvals waiting for a human answer.",
+)
+approval_wait = meter.create_histogram(
+    "assistant.approval.wait_time",
+    unit="s",
+    description="Time approvals waited for an answer, by outcome.",
+)
+
+
+class ApprovalNotFound(LookupError):
+    """Raised when answering an approval that is no longer pending."""
+
+
+class Approval:
+    """Proposed slots waiting for a human to pick one."""
+
+    def __init__(self, approval_id, proposed_slots, created_at):
+        self.id = approval_id
+        self.proposed_slots = list(proposed_slots)
+        self.created_at = created_at
+        self.future = Future()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "proposed_slots": self.proposed_slots,
+            "waiting_seconds": round(time.time() - self.created_at, 1),
+        }
+
+
+class ApprovalBroker:
+    """Queues approval requests and hands out the answers."""
+
+    def __init__(
+        self,
+        timeout=APPROVAL_TIMEOUT,
+        default=APPROVAL_DEFAULT,
+        host=APPROVAL_HOST,
+        port=APPROVAL_PORT,
+    ):
+        if default not in ("reject", "first"):
+            raise ValueError(f"Unknown default approval action: {default}")
+        self.timeout = timeout
+        self.default = default
+        self.host = host
+        self.port = port
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    # Requests -----------------------------------------------------------
+
+    def submit(self, proposed_slots):
+        """Files an approval request and returns it without waiting."""
+        with self._lock:
+            approval = Approval(
+                str(next(self._ids)), proposed_slots, time.time()
+            )
+            self._pending[approval.id] = approval
+        pending_approvals.add(1)
+        return approval
+
+    def pending(self):
+        """Returns the approvals waiting for an answer, oldest first."""
+        with self._lock:
+            return list(self._pending.values())
+
+    def resolve(self, approval_id, choice=None):
+        """
+        Answers an approval with the 1-based number of the chosen slot, or
+        rejects all slots when ``choice`` is None.
+        """
+        with self._lock:
+            approval = self._pending.get(approval_id)
+            if approval is None:
+                raise ApprovalNotFound(approval_id)
+            if choice is None:
+                result, outcome = REJECTED, "rejected"
+            elif 1 <= choice <= len(approval.proposed_slots):
+                result = approval.proposed_slots[choice - 1]
+                outcome = "approved"
+            else:
+                raise ValueError(f"No slot number {choice}")
+            del self._pending[approval_id]
+        self._finish(approval, result, outcome)
+
+    def _finish(self, approval, result, outcome):
+        pending_approvals.add(-1)
+        approval_wait.record(
+            time.time() - approval.created_at, {"outcome": outcome}
+        )
+        # A waiter's future may have been cancelled from under it.
+        if not approval.future.done():
+            approval.future.set_result(result)
+
+    def _expire(self, approval):
+        with self._lock:
+            if self._pending.pop(approval.id, None) is None:
+                # Answered just as the wait timed out.
+                return approval.future.result()
+        if self.default == "first" and approval.proposed_slots:
+            result = approval.proposed_slots[0]
+        else:
+            result = REJECTED
+        self._finish(approval, result, "timeout")
+        return result
+
+    def wait(self, approval):
+        """
+        Blocks the calling workflow until ``approval`` is answered or
+        times out, and returns the chosen slot or the rejection.
+        """
+        try:
+            return approval.future.result(timeout=self.timeout)
+        except FutureTimeout:
+            return self._expire(approval)
+
+    async def wait_async(self, approval):
+        """Like ``wait()``, but awaitable from an event loop."""
+        try:
+            # Shielded: timing out must not cancel the approval's future,
+            # which the expiry still answers.
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(approval.future)),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            return self._expire(approval)
+
+    def request(self, proposed_slots):
+        """Files an approval request and waits for its answer."""
+        self.start()
+        approval = self.submit(proposed_slots)
+        print(
+            f"Approval {approval.id} is waiting for an answer: "
+            f"python -m crewai_observability.approvals approve "
+            f"{approval.id} <slot number>"
+        )
+        return self.wait(approval)
+
+    # HTTP API -----------------------------------------------------------
+
+    def start(self):
+        """Starts the HTTP API, if it is not running yet."""
+        with self._lock:
+            if self._server is None:
+                self._server = ThreadingHTTPServer(
+                    (self.host, self.port), _make_handler(self)
+                )
+                threading.Thread(
+                    target=self._server.serve_forever,
+                    name="approval-broker",
+                    daemon=True,
+                ).start()
+        return self
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server else None
+
+    def stop(self):
+        with self._lock:
+            server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def _make_handler(broker):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, data=None):
+            body = (
+                json.dumps(data).encode("utf-8") if data is not None else b""
+            )
+            self.send_response(status)
+            if body:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/approvals":
+                self._reply(404)
+                return
+            self._reply(
+                200, [approval.to_dict() for approval in broker.pending()]
+            )
+
+        def do_POST(self):
+            prefix = "/approvals/"
+            if not self.path.startswith(prefix):
+                self._reply(404)
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                answer = json.loads(self.rfile.read(length) or b"{}")
+                choice = answer.get("choice")
+                broker.resolve(
+                    self.path[len(prefix):],
+                    None if choice is None else int(choice),
+                )
+            except ApprovalNotFound:
+                self._reply(404)
+                return
+            except (ValueError, TypeError, AttributeError):
+                self._reply(400)
+                return
+            self._reply(204)
+
+    return Handler
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_approval_broker():
+    """Returns the process-wide approval broker."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = ApprovalBroker()
+        return _broker
+
+
+# Command-line client ----------------------------------------------------
+
+
+def _call(base_url, method, path, data=None):
+    body = json.dumps(data).encode("utf-8") if data is not None else None
+    request = urllib.request.Request(
+        base_url + path,
+        data=body,
+        method=method,
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        content = response.read()
+    return json.loads(content) if content else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="List and answer pending meeting slot approvals."
+    )
+    parser.add_argument(
+        "--url",
+        default=f"http://{APPROVAL_HOST}:{APPROVAL_PORT}",
+        help="Address of the approval broker.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show pending approvals.")
+    approve = commands.add_parser("approve", help="Choose a slot.")
+    approve.add_argument("id")
+    approve.add_argument("choice", type=int, help="Slot number, from 1.")
+    reject = commands.add_parser("reject", help="Reject every slot.")
+    reject.add_argument("id")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "list":
+            approvals = _call(args.url, "GET", "/approvals") or []
+            if not approvals:
+                print("No approvals are pending.")
+            for approval in approvals:
+                print(
+                    f"[{approval['id']}] waiting "
+                    f"{approval['waiting_seconds']:.0f}s"
+                )
+                for i, slot in enumerate(approval["proposed_slots"]):
+                    print(f"  {i + 1}. {slot}")
+        else:
+            choice = args.choice if args.command == "approve" else None
+            _call(
+                args.url, "POST", f"/approvals/{args.id}", {"choice": choice}
+            )
+            print(f"Approval {args.id} answered.")
+    except urllib.error.HTTPError as exc:
+        parser.exit(1, f"The broker refused the request: {exc.code}\n")
+    except urllib.error.URLError as exc:
+        parser.exit(1, f"Cannot reach the broker: {exc.reason}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os.path
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -8,12 +9,34 @@ SCOPES = [
     'https://www.googleapis.com/auth/calendar'
 ]
 
+TOKEN_FILE = 'token.json'
+CLIENT_SECRET_FILE = 'client_secret.json'
+
+# Serialized token as last read from or written to TOKEN_FILE.
+_stored_token = None
+
+
+def save_credentials(creds):
+    """Persists the credentials, skipping the write if nothing changed."""
+    global _stored_token
+    token = creds.to_json()
+    if token == _stored_token:
+        return False
+    with open(TOKEN_FILE, 'w') as fh:
+        fh.write(token)
+    _stored_token = token
+    return True
+
 
 def get_google_credentials():
     """Handles the OAuth 2.0 flow and returns valid credentials."""
+    global _stored_token
     creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+    if os.path.exists(TOKEN_FILE):
+        with open(TOKEN_FILE) as fh:
+            _stored_token = fh.read()
+        creds = Credentials.from_authorized_user_info(
+            json.loads(_stored_token), SCOPES)
 
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
@@ -21,11 +44,10 @@ def get_google_credentials():
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(
-                'client_secret.json', SCOPES)
+                CLIENT_SECRET_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
 
         # Save the credentials for the next run
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
+        save_credentials(creds)
 
     return creds
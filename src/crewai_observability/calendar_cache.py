@@ -0,0 +1,438 @@
+"""
+In-memory cache of busy intervals per Google Calendar.
+
+Each calendar remembers which time ranges it has fetched ("coverage") and
+the busy blocks inside them, so repeated and overlapping free/busy probes
+are answered locally and only uncovered ranges go to ``freebusy().query``.
+Calendars listed in CALENDAR_SYNC_IDS are kept current with incremental
+``events().list(syncToken=...)`` sync: every changed event invalidates the
+ranges it used to and now occupies. Sync pays off in a long-running
+process: the first sync lists every event of the next CALENDAR_SYNC_DAYS,
+so it is off by default and ``--daemon`` turns it on for the primary
+calendar. Ranges past that horizon, and other calendars, fall back to a
+TTL.
+
+Lookups for many calendars are split into chunks that fit the freebusy
+per-request item limit, and the chunks are queried concurrently. The
+cache's lock is not held during API calls: a lookup marks the calendars
+it fetches as in flight, and lookups needing one of them wait for that
+fetch rather than repeating it.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.errors import HttpError
+
+from .accounts import current_account
+from .intervals import (
+    clip_intervals,
+    event_interval,
+    merge_intervals,
+    subtract_intervals,
+    to_epoch,
+    to_rfc3339,
+)
+from .tool_metrics import current_call
+
+CALENDAR_CACHE_TTL = int(os.getenv("CALENDAR_CACHE_TTL", "900"))
+CALENDAR_SYNC_INTERVAL = int(os.getenv("CALENDAR_SYNC_INTERVAL", "30"))
+# Empty: no calendar is synced (the default, except with --daemon).
+CALENDAR_SYNC_IDS = [
+    calendar_id.strip()
+    for calendar_id in os.getenv("CALENDAR_SYNC_IDS", "").split(",")
+    if calendar_id.strip()
+]
+# Days ahead the events of a synced calendar are listed for.
+CALENDAR_SYNC_DAYS = float(os.getenv("CALENDAR_SYNC_DAYS", "30"))
+
+# freebusy().query answers for at most 50 calendars per request.
+FREEBUSY_MAX_ITEMS = int(os.getenv("FREEBUSY_MAX_ITEMS", "50"))
+FREEBUSY_MAX_CONCURRENCY = int(os.getenv("FREEBUSY_MAX_CONCURRENCY", "8"))
+
+_EVENT_FIELDS = (
+    "nextPageToken,nextSyncToken,"
+    "items(id,status,transparency,start,end)"
+)
+
+
+class _CalendarEntry:
+    def __init__(self):
+        # Non-overlapping (start, end, fetched_at) segments.
+        self.coverage = []
+        self.busy = []
+        self.sync_token = None
+        self.synced_at = 0.0
+        # The end of the range sync keeps current.
+        self.synced_until = 0.0
+        # Event ID -> interval, for events seen through sync.
+        self.events = {}
+
+    def covered(self, now, ttl):
+        """
+        Returns the ranges fetched within ``ttl`` seconds, or at any time
+        inside the range sync keeps current.
+        """
+        spans = []
+        for start, end, fetched_at in self.coverage:
+            if ttl is None or now - fetched_at < ttl:
+                spans.append((start, end))
+            elif self.sync_token and start < self.synced_until:
+                spans.append((start, min(end, self.synced_until)))
+        return merge_intervals(spans)
+
+    def store(self, span, busy, now):
+        self._cut(span)
+        self.coverage.append((span[0], span[1], now))
+        self.busy = merge_intervals(self.busy + list(busy))
+
+    def invalidate(self, interval):
+        self._cut(interval)
+
+    def _cut(self, interval):
+        """Drops coverage and busy blocks inside ``interval``."""
+        removed = [interval]
+        coverage = []
+        for start, end, fetched_at in self.coverage:
+            for piece in subtract_intervals([(start, end)], removed):
+                coverage.append((piece[0], piece[1], fetched_at))
+        self.coverage = coverage
+        self.busy = subtract_intervals(self.busy, removed)
+
+
+class BusyCache:
+    """Answers free/busy lookups from memory, fetching only what is missing."""
+
+    def __init__(
+        self,
+        ttl=CALENDAR_CACHE_TTL,
+        sync_interval=CALENDAR_SYNC_INTERVAL,
+        sync_ids=CALENDAR_SYNC_IDS,
+        sync_days=CALENDAR_SYNC_DAYS,
+        clock=time.time,
+        max_items=FREEBUSY_MAX_ITEMS,
+        max_concurrency=FREEBUSY_MAX_CONCURRENCY,
+    ):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_concurrency = max_concurrency
+        self.sync_interval = sync_interval
+        self.sync_ids = set(sync_ids)
+        self.sync_horizon = sync_days * 86400
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self._entries = {}
+        # Calendar ID -> Event set when its sync or fetch completes.
+        self._inflight = {}
+        self._lock = threading.RLock()
+
+    def stats(self):
+        """Returns the hit, miss and API call counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "api_calls": self.api_calls,
+            }
+
+    def busy(self, service, calendar_ids, start, end):
+        """
+        Returns a dict mapping each calendar ID to its merged busy intervals
+        within [start, end), fetching uncovered ranges from the API.
+        Calendars whose availability could not be read (for example, not
+        shared with the user) are left out of the result.
+        """
+        now = self.clock()
+        # Calendars this lookup synced or queried, and those it could not
+        # read.
+        synced = set()
+        queried = set()
+        unreadable = set()
+        while True:
+            with self._lock:
+                waits, syncs, missing = self._plan(
+                    calendar_ids, start, end, now, synced, queried
+                )
+                if not (waits or syncs or missing):
+                    if not queried:
+                        self.hits += 1
+                    return {
+                        calendar_id: [
+                            (max(s, start), min(e, end))
+                            for s, e in self._entries[calendar_id].busy
+                            if s < end and e > start
+                        ]
+                        for calendar_id in calendar_ids
+                        if calendar_id not in unreadable
+                    }
+                # Calendars being synced are only queried afterwards, as
+                # the changes the sync finds invalidate ranges.
+                claimed = syncs + list(missing)
+                for calendar_id in claimed:
+                    self._inflight[calendar_id] = threading.Event()
+                if missing and not queried:
+                    self.misses += 1
+            if claimed:
+                synced.update(syncs)
+                queried.update(missing)
+                try:
+                    fetched = self._refresh(service, syncs, missing, now)
+                    unreadable.update(set(missing) - set(fetched))
+                finally:
+                    with self._lock:
+                        for calendar_id in claimed:
+                            self._inflight.pop(calendar_id).set()
+            else:
+                for done in waits:
+                    done.wait()
+
+    def _plan(self, calendar_ids, start, end, now, synced, queried):
+        """
+        Returns the in-flight fetches to wait for, the calendars due for
+        a sync and the uncovered ranges of the others. Calendars the
+        lookup already ``synced`` or ``queried`` are not fetched again.
+        """
+        waits, syncs, missing = [], [], {}
+        for calendar_id in dict.fromkeys(calendar_ids):
+            if calendar_id in self._inflight:
+                waits.append(self._inflight[calendar_id])
+                continue
+            entry = self._entries.setdefault(calendar_id, _CalendarEntry())
+            if calendar_id in queried:
+                continue
+            if (
+                calendar_id in self.sync_ids
+                and calendar_id not in synced
+                and now - entry.synced_at >= self.sync_interval
+            ):
+                syncs.append(calendar_id)
+                continue
+            gaps = subtract_intervals(
+                [(start, end)], entry.covered(now, self.ttl)
+            )
+            if gaps:
+                missing[calendar_id] = gaps
+        return waits, syncs, missing
+
+    def _refresh(self, service, syncs, missing, now):
+        """
+        Syncs the ``syncs`` calendars on worker threads while querying
+        the ``missing`` ranges of the others, and returns the busy
+        intervals the query read.
+        """
+        if not syncs:
+            return self._fetch(service, missing, now)
+        workers = max(min(self.max_concurrency, len(syncs)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._sync,
+                    service,
+                    calendar_id,
+                    now,
+                )
+                for calendar_id in syncs
+            ]
+            fetched = self._fetch(service, missing, now) if missing else {}
+            for future in futures:
+                future.result()
+        return fetched
+
+    def _fetch(self, service, missing, now):
+        # One query over the span of every gap; re-fetching covered ranges
+        # inside the span is cheaper than extra round trips.
+        span = (
+            min(gaps[0][0] for gaps in missing.values()),
+            max(gaps[-1][1] for gaps in missing.values()),
+        )
+        fetched = self._query(service, list(missing), span)
+        with self._lock:
+            for calendar_id, busy in fetched.items():
+                entry = self._entries.setdefault(calendar_id, _CalendarEntry())
+                entry.store(span, busy, now)
+        return fetched
+
+    def record_event(self, calendar_id, event):
+        """Updates the cache with an event that was just written."""
+        with self._lock:
+            entry = self._entries.setdefault(calendar_id, _CalendarEntry())
+            self._apply_change(entry, event)
+
+    def has_event(self, calendar_id, event_id):
+        """Tells whether the cache has seen ``event_id`` on the calendar."""
+        with self._lock:
+            entry = self._entries.get(calendar_id)
+            return entry is not None and event_id in entry.events
+
+    def conflicts(self, calendar_id, interval):
+        """
+        Returns the cached busy intervals of a calendar that overlap
+        ``interval``, without calling the API. Ranges that were never
+        fetched, or whose cached data expired, are not checked.
+        """
+        with self._lock:
+            entry = self._entries.get(calendar_id)
+            if entry is None:
+                return []
+            unknown = subtract_intervals(
+                [interval], entry.covered(self.clock(), self.ttl)
+            )
+            return subtract_intervals(
+                clip_intervals(entry.busy, *interval), unknown
+            )
+
+    def invalidate(self, calendar_id=None):
+        """Forgets one calendar, or every calendar when none is given."""
+        with self._lock:
+            if calendar_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(calendar_id, None)
+
+    def _query(self, service, calendar_ids, span):
+        chunks = [
+            calendar_ids[i:i + self.max_items]
+            for i in range(0, len(calendar_ids), self.max_items)
+        ]
+        with self._lock:
+            self.api_calls += len(chunks)
+
+        def _run(chunk):
+            return self._query_chunk(service, chunk, span)
+
+        if len(chunks) == 1 or self.max_concurrency <= 1:
+            results = [_run(chunk) for chunk in chunks]
+        else:
+            # Latency is bounded by the slowest chunk, not their sum.
+            workers = min(self.max_concurrency, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Run each chunk in a copy of this context, so its API
+                # calls are attributed to the calling tool.
+                futures = [
+                    executor.submit(contextvars.copy_context().run, _run, c)
+                    for c in chunks
+                ]
+                results = [future.result() for future in futures]
+
+        fetched = {}
+        for result in results:
+            fetched.update(result)
+        return fetched
+
+    def _query_chunk(self, service, calendar_ids, span):
+        body = {
+            "timeMin": to_rfc3339(span[0]),
+            "timeMax": to_rfc3339(span[1]),
+            "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+        }
+        response = service.freebusy().query(body=body).execute()
+        calendars = response.get("calendars", {})
+        fetched = {}
+        for calendar_id in calendar_ids:
+            calendar = calendars.get(calendar_id, {})
+            if calendar.get("errors"):
+                continue
+            fetched[calendar_id] = merge_intervals(
+                (to_epoch(slot["start"]), to_epoch(slot["end"]))
+                for slot in calendar.get("busy", [])
+            )
+        return fetched
+
+    def _apply_change(self, entry, event):
+        old = entry.events.pop(event.get("id"), None)
+        if old is not None:
+            entry.invalidate(old)
+        if event.get("status") == "cancelled" or "start" not in event:
+            return
+        interval = event_interval(event)
+        if event.get("transparency") == "transparent":
+            entry.invalidate(interval)
+            return
+        if event.get("id"):
+            entry.events[event["id"]] = interval
+        entry.busy = merge_intervals(entry.busy + [interval])
+
+    def _sync(self, service, calendar_id, now):
+        """
+        Applies the events changed since the last sync of a calendar,
+        reading them without holding the lock.
+        """
+        with self._lock:
+            entry = self._entries.setdefault(calendar_id, _CalendarEntry())
+            entry.synced_at = now
+            sync_token = entry.sync_token
+
+        params = {
+            "calendarId": calendar_id,
+            "singleEvents": True,
+            "showDeleted": True,
+            "fields": _EVENT_FIELDS,
+        }
+        initial = sync_token is None
+        if initial:
+            # Seed the event map with what is coming up; past events cannot
+            # affect future availability, and later ones are left to the
+            # TTL.
+            params["timeMin"] = to_rfc3339(now)
+            params["timeMax"] = to_rfc3339(now + self.sync_horizon)
+        else:
+            params["syncToken"] = sync_token
+
+        events = []
+        try:
+            page_token = None
+            while True:
+                with self._lock:
+                    self.api_calls += 1
+                response = (
+                    service.events()
+                    .list(pageToken=page_token, **params)
+                    .execute()
+                )
+                current_call().add(pages=1)
+                events.extend(response.get("items", []))
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as exc:
+            if exc.resp.status != 410:
+                raise
+            # The sync token expired; start again from a clean entry.
+            with self._lock:
+                self._entries[calendar_id] = _CalendarEntry()
+            return
+
+        with self._lock:
+            for event in events:
+                if initial:
+                    if event.get("status") != "cancelled":
+                        entry.events[event["id"]] = event_interval(event)
+                else:
+                    self._apply_change(entry, event)
+            if initial:
+                entry.synced_until = now + self.sync_horizon
+            entry.sync_token = response.get("nextSyncToken")
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_busy_cache():
+    """
+    Returns the process-wide busy interval cache of the account being
+    served; calendar ids such as "primary" name a different calendar for
+    every account.
+    """
+    account = current_account()
+    with _cache_lock:
+        cache = _caches.get(account)
+        if cache is None:
+            cache = _caches[account] = BusyCache()
+        return cache
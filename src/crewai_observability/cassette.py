@@ -0,0 +1,371 @@
+"""
+Record/replay of Google API and LLM traffic.
+
+With ASSISTANT_CASSETTE set, every Google API call and every agent LLM
+call goes through a cassette file. In ``record`` mode the real calls are
+made and their responses saved when the process exits; in ``replay``
+mode responses are served from the file, without network access or
+credentials, after an injected delay per round trip
+(CASSETTE_HTTP_LATENCY and CASSETTE_LLM_LATENCY seconds). This makes it
+possible to rerun a recorded crew run offline, e.g. to benchmark it.
+
+Calls are matched on their method, path, query and body (or, for LLM
+calls, on the response cache key). Batch requests are recorded call by
+call, so a replayed batch may group calls differently from the recorded
+one. A call with no exact match gets the next unused recording for the
+same endpoint, which keeps replays working when something incidental,
+like a timestamp in a query, has changed.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import urllib.parse
+import uuid
+from email.parser import BytesParser
+
+import httplib2
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from .llm_cache import cache_key
+
+ASSISTANT_CASSETTE = os.getenv("ASSISTANT_CASSETTE", "")
+ASSISTANT_CASSETTE_MODE = os.getenv("ASSISTANT_CASSETTE_MODE", "replay")
+CASSETTE_HTTP_LATENCY = float(os.getenv("CASSETTE_HTTP_LATENCY", "0"))
+CASSETTE_LLM_LATENCY = float(os.getenv("CASSETTE_LLM_LATENCY", "0"))
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMiss(LookupError):
+    """Raised when a replayed call has no recording to answer it."""
+
+
+def _normalize_body(body):
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return json.dumps(json.loads(body), sort_keys=True)
+    except ValueError:
+        return body
+
+
+def _split_target(uri):
+    """Returns ``(path, path_and_query)`` for an absolute or relative URI."""
+    parts = urllib.parse.urlsplit(uri)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    return parts.path, target
+
+
+def _parse_http_message(raw):
+    """Splits an HTTP message into its first line, headers and body."""
+    head, _, body = raw.replace("\r\n", "\n").partition("\n\n")
+    lines = head.split("\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0].strip(), headers, body.strip()
+
+
+def _parse_multipart(content_type, body):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    message = BytesParser().parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+    )
+    return message.get_payload()
+
+
+class Cassette:
+    """The recorded calls of one run, stored as a JSON file."""
+
+    def __init__(
+        self,
+        path,
+        mode=REPLAY,
+        http_latency=CASSETTE_HTTP_LATENCY,
+        llm_latency=CASSETTE_LLM_LATENCY,
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.http_latency = http_latency
+        self.llm_latency = llm_latency
+        self.http = []
+        self.llm = []
+        self._used_http = set()
+        self._used_llm = set()
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            with open(path, encoding="utf-8") as handle:
+                data = json.load(handle)
+            self.http = data.get("http", [])
+            self.llm = data.get("llm", [])
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def save(self):
+        """Writes the recorded calls to the cassette file."""
+        with self._lock:
+            data = {"version": 1, "http": self.http, "llm": self.llm}
+        with open(self.path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=2)
+
+    # Google API calls ---------------------------------------------------
+
+    def record_call(self, method, uri, body, status, content_type, content):
+        path, target = _split_target(uri)
+        with self._lock:
+            self.http.append(
+                {
+                    "method": method,
+                    "path": path,
+                    "target": target,
+                    "body": _normalize_body(body),
+                    "status": status,
+                    "content_type": content_type,
+                    "content": content,
+                }
+            )
+
+    def replay_call(self, method, uri, body):
+        """Returns the recorded entry answering one API call."""
+        path, target = _split_target(uri)
+        body = _normalize_body(body)
+        with self._lock:
+            entry = self._take(
+                self.http,
+                self._used_http,
+                lambda e: (e["method"], e["target"], e["body"])
+                == (method, target, body),
+                lambda e: (e["method"], e["path"]) == (method, path),
+            )
+        if entry is None:
+            raise CassetteMiss(f"No recording for {method} {target}")
+        return entry
+
+    # LLM calls ----------------------------------------------------------
+
+    def record_generation(self, key, generations):
+        with self._lock:
+            self.llm.append({"key": key, "generations": dumps(generations)})
+
+    def replay_generation(self, key):
+        with self._lock:
+            entry = self._take(
+                self.llm,
+                self._used_llm,
+                lambda e: e["key"] == key,
+                lambda e: True,
+            )
+        if entry is None:
+            raise CassetteMiss("No recorded LLM response left to replay")
+        return loads(entry["generations"])
+
+    def _take(self, entries, used, exact, similar):
+        # Prefer an unused exact match, then any exact match (calls that
+        # repeat, like polling, replay their last answer), then the next
+        # unused recording of the same kind.
+        fallback = None
+        for index, entry in enumerate(entries):
+            if exact(entry):
+                if index not in used:
+                    used.add(index)
+                    return entry
+                fallback = entry
+        if fallback is not None:
+            return fallback
+        for index, entry in enumerate(entries):
+            if index not in used and similar(entry):
+                used.add(index)
+                return entry
+        return None
+
+    # Transports ---------------------------------------------------------
+
+    def transport(self, http=None):
+        """
+        Wraps ``http`` to record through it, or returns a replaying
+        transport that needs none.
+        """
+        if self.replaying:
+            return ReplayHttp(self)
+        return RecordingHttp(self, http)
+
+    def llm_cache(self):
+        """Returns a LangChain cache that records or replays LLM calls."""
+        return CassetteLLMCache(self)
+
+
+class RecordingHttp:
+    """Passes requests to a real transport and records the responses."""
+
+    def __init__(self, cassette, http):
+        self.cassette = cassette
+        self.http = http
+
+    def __getattr__(self, name):
+        # googleapiclient reads attributes such as ``credentials``.
+        return getattr(self.http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        response, content = self.http.request(
+            uri, method=method, body=body, headers=headers, **kwargs
+        )
+        content_type = response.get("content-type", "")
+        text = content.decode("utf-8", errors="replace")
+        if _is_batch(uri):
+            self._record_batch(uri, headers or {}, body, content_type, text)
+        else:
+            self.cassette.record_call(
+                method, uri, body, response.status, content_type, text
+            )
+        return response, content
+
+    def _record_batch(self, uri, headers, body, content_type, text):
+        root = "{0.scheme}://{0.netloc}".format(urllib.parse.urlsplit(uri))
+        calls = {}
+        request_type = {k.lower(): v for k, v in headers.items()}
+        for part in _parse_multipart(request_type["content-type"], body):
+            request_line, _, call_body = _parse_http_message(
+                part.get_payload()
+            )
+            method, target, _ = request_line.split(" ", 2)
+            calls[part["Content-ID"].strip("<>")] = (
+                method,
+                root + target,
+                call_body,
+            )
+        for part in _parse_multipart(content_type, text):
+            content_id = part["Content-ID"].strip("<>")
+            content_id = content_id.replace("response-", "", 1)
+            status_line, part_headers, part_body = _parse_http_message(
+                part.get_payload()
+            )
+            method, call_uri, call_body = calls[content_id]
+            self.cassette.record_call(
+                method,
+                call_uri,
+                call_body,
+                int(status_line.split(" ")[1]),
+                part_headers.get("content-type", ""),
+                part_body,
+            )
+
+
+class ReplayHttp:
+    """An httplib2-compatible transport serving recorded responses."""
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self.timeout = None
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if self.cassette.http_latency:
+            time.sleep(self.cassette.http_latency)
+        if _is_batch(uri):
+            return self._replay_batch(headers or {}, body)
+        entry = self.cassette.replay_call(method, uri, body)
+        response = httplib2.Response(
+            {"status": entry["status"], "content-type": entry["content_type"]}
+        )
+        return response, entry["content"].encode("utf-8")
+
+    def _replay_batch(self, headers, body):
+        request_type = {k.lower(): v for k, v in headers.items()}
+        boundary = uuid.uuid4().hex
+        chunks = []
+        for part in _parse_multipart(request_type["content-type"], body):
+            request_line, _, call_body = _parse_http_message(
+                part.get_payload()
+            )
+            method, target, _ = request_line.split(" ", 2)
+            entry = self.cassette.replay_call(method, target, call_body)
+            content_id = part["Content-ID"].strip("<>")
+            chunks.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {entry['status']} OK\r\n"
+                f"Content-Type: {entry['content_type']}\r\n\r\n"
+                f"{entry['content']}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        response = httplib2.Response(
+            {
+                "status": 200,
+                "content-type": f"multipart/mixed; boundary={boundary}",
+            }
+        )
+        return response, "".join(chunks).encode("utf-8")
+
+
+def _is_batch(uri):
+    return urllib.parse.urlsplit(uri).path.startswith("/batch")
+
+
+class CassetteLLMCache(BaseCache):
+    """
+    A LangChain cache that lets every call through while recording, and
+    answers every call from the cassette while replaying.
+    """
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    def lookup(self, prompt, llm_string):
+        if not self.cassette.replaying:
+            return None
+        if self.cassette.llm_latency:
+            time.sleep(self.cassette.llm_latency)
+        return self.cassette.replay_generation(cache_key(prompt, llm_string))
+
+    def update(self, prompt, llm_string, return_val):
+        if not self.cassette.replaying:
+            self.cassette.record_generation(
+                cache_key(prompt, llm_string), list(return_val)
+            )
+
+    def clear(self, **kwargs):
+        pass
+
+
+_cassette = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """
+    Returns the process-wide cassette configured by ASSISTANT_CASSETTE, or
+    None when calls go to the real services.
+    """
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        if not _cassette_loaded:
+            _cassette_loaded = True
+            if ASSISTANT_CASSETTE:
+                _cassette = Cassette(
+                    ASSISTANT_CASSETTE, mode=ASSISTANT_CASSETTE_MODE
+                )
+                if not _cassette.replaying:
+                    atexit.register(_cassette.save)
+        return _cassette
+
+
+def use_cassette(cassette):
+    """Installs ``cassette`` as the process-wide one (None to remove it)."""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        _cassette = cassette
+        _cassette_loaded = True
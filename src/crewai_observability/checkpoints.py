@@ -0,0 +1,202 @@
+"""
+Durable checkpoints of task outputs, so interrupted runs resume where they
+stopped.
+
+Every completed task output is saved under the email thread(s) it works
+on, or under ``inbox`` for the inbox scan that finds them. In resume mode
+(CHECKPOINT_RESUME, or ``main.py --resume``) a stage whose output is
+already saved is not run again, so a run that died after the slot search
+goes straight to confirmation and booking. Checkpoints made while serving
+an account are kept under that account.
+
+Bookings are also protected on the Calendar side: every event is created
+with an ID derived from the thread and the event's details (an
+idempotency key), so a resumed or repeated run that books the same
+meeting again gets the existing event back instead of a duplicate.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .accounts import account_key, current_account
+from .state import STATE_DB_PATH
+
+CHECKPOINT_RESUME = os.getenv("CHECKPOINT_RESUME", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+INBOX_SCOPE = "inbox"
+SCAN_STAGE = "scan_inbox_task"
+
+_THREAD_ID = re.compile(r'"thread_id"\s*:\s*"([^"]+)"')
+
+_scope = contextvars.ContextVar("checkpoint_scope", default=None)
+
+
+def thread_scope(text):
+    """
+    Returns the checkpoint scope for the meeting request(s) in ``text``:
+    their thread IDs, sorted and comma-separated, or None if none is
+    named.
+    """
+    ids = sorted(set(_THREAD_ID.findall(str(text))))
+    return ",".join(ids) or None
+
+
+@contextlib.contextmanager
+def checkpoint_scope(scope):
+    """Marks the work done in this context as belonging to ``scope``."""
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope():
+    """Returns the scope of the running stage, or None outside of one."""
+    return _scope.get()
+
+
+def idempotency_key(event, scope=None):
+    """
+    Returns a Calendar event ID identifying ``event`` within ``scope``
+    (default: the current scope). Hex digits are valid event ID
+    characters.
+    """
+    attendees = sorted(
+        attendee.get("email", "") if isinstance(attendee, dict) else attendee
+        for attendee in event.get("attendees") or []
+    )
+    identity = {
+        "scope": scope if scope is not None else current_scope(),
+        "summary": event.get("summary"),
+        "start": event.get("start"),
+        "end": event.get("end"),
+        "attendees": attendees,
+    }
+    digest = hashlib.sha256(json.dumps(identity, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+class CheckpointStore:
+    """Task outputs by scope and stage, backed by SQLite."""
+
+    def __init__(self, path=STATE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "scope TEXT NOT NULL, stage TEXT NOT NULL, "
+            "output TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (scope, stage))"
+        )
+        self._conn.commit()
+
+    def load(self, scope, stage):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output FROM checkpoints "
+                "WHERE scope = ? AND stage = ?",
+                (scope, stage),
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, scope, stage, output):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(scope, stage, output, created_at) VALUES (?, ?, ?, ?)",
+                (scope, stage, str(output), time.time()),
+            )
+            self._conn.commit()
+
+    def completed(self, scope):
+        """Returns the saved outputs of ``scope`` by stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, output FROM checkpoints WHERE scope = ?",
+                (scope,),
+            ).fetchall()
+        return dict(rows)
+
+    def clear(self, scope):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE scope = ?", (scope,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StageCheckpoint:
+    """
+    Runs stages through the checkpoint store: a stage already completed in
+    the current scope is skipped when resuming, and every stage that runs
+    has its output saved.
+    """
+
+    def __init__(self, store=None, resume=CHECKPOINT_RESUME, scope=None):
+        self.store = store or get_checkpoint_store()
+        self.resume = resume
+        self.scope = scope or INBOX_SCOPE
+        self.account = current_account()
+
+    def run(self, stage, execute):
+        """
+        Returns ``(output, restored)``: the saved output of ``stage`` when
+        resuming, or the output of ``execute()``.
+        """
+        if self.resume:
+            saved = self.store.load(self._key(self.scope), stage)
+            if saved is not None:
+                return saved, True
+        with checkpoint_scope(self.scope):
+            output = execute()
+        self.store.save(self._key(self.scope), stage, output)
+        return output, False
+
+    def _key(self, scope):
+        return account_key(scope, self.account)
+
+    def advance(self, stage, output):
+        """
+        Moves on to the threads found by the inbox scan, once ``stage``
+        has produced ``output``.
+        """
+        if stage == SCAN_STAGE:
+            self.scope = thread_scope(output) or self.scope
+
+    def finish(self):
+        """
+        Forgets the inbox scan once its requests are done, so the next run
+        scans the inbox again. Completed thread stages are kept.
+        """
+        self.store.clear(self._key(INBOX_SCOPE))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """Returns the process-wide checkpoint store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore()
+        return _store
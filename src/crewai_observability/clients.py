@@ -0,0 +1,168 @@
+"""
+Process-wide registry of Google API clients.
+
+Services are built once per process from the discovery documents bundled
+with google-api-python-client. Requests run on a per-thread pooled
+transport, since httplib2 connections are not thread-safe, and all
+transports share one credentials object that is refreshed shortly before
+it expires.
+
+Inside an ``accounts.account_scope()`` credentials and transports are
+those of the account being served, loaded from the credential store;
+the service objects stay shared, as every request is bound to the
+current account's transport when it is built.
+"""
+
+import functools
+import os
+import threading
+
+import httplib2
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpRequest
+
+from .accounts import (
+    AccountNotFound,
+    current_account,
+    get_credential_store,
+    needs_refresh,
+)
+from .auth import get_google_credentials, save_credentials
+from .cassette import get_cassette
+from .ratelimit import api_of, get_executor, quota_units
+from .tool_metrics import api_call
+
+HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "60"))
+
+_lock = threading.RLock()
+_local = threading.local()
+_credentials = None
+# Credentials of the accounts served through the credential store, and a
+# lock per account so that refreshing one does not hold up the others.
+_account_credentials = {}
+_account_locks = {}
+_services = {}
+
+
+def _account_lock(account):
+    with _lock:
+        return _account_locks.setdefault(account, threading.Lock())
+
+
+def get_credentials():
+    """
+    Returns the current account's credentials, refreshing them ahead of
+    expiry. Refreshing access tokens this early means requests never have
+    to be retried after a 401.
+    """
+    account = current_account()
+    if account is not None:
+        return _get_account_credentials(account)
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            _credentials = get_google_credentials()
+        creds = _credentials
+        if needs_refresh(creds):
+            creds.refresh(Request())
+            save_credentials(creds)
+        return creds
+
+
+def _get_account_credentials(account):
+    store = get_credential_store()
+    with _account_lock(account):
+        creds = _account_credentials.get(account)
+        if creds is None:
+            creds = store.load(account)
+            if creds is None:
+                raise AccountNotFound(f"No credentials for {account}")
+            _account_credentials[account] = creds
+        if needs_refresh(creds) or not creds.valid:
+            store.refresh(account, creds)
+        return creds
+
+
+def get_http():
+    """
+    Returns the calling thread's authorized, pooled transport, wrapped by
+    the record/replay cassette when one is configured.
+    """
+    cassette = get_cassette()
+    if not hasattr(_local, "http"):
+        _local.http = {}
+    account = current_account()
+    http = _local.http.get(account)
+    if cassette is not None and cassette.replaying:
+        # Replays need neither the network nor credentials.
+        if http is None:
+            http = _local.http[account] = cassette.transport()
+        return http
+    if http is None:
+        http = AuthorizedHttp(
+            get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT)
+        )
+        if cassette is not None:
+            http = cassette.transport(http)
+        _local.http[account] = http
+    else:
+        get_credentials()
+    return http
+
+
+class _InstrumentedRequest(HttpRequest):
+    """
+    An API request that runs under its API's quota throttle and retry
+    policy, and records its round trip by API method.
+    """
+
+    def execute(self, *args, **kwargs):
+        execute = super().execute
+        executor = get_executor(api_of(self.methodId))
+        with api_call(self.methodId):
+            return executor.execute(
+                lambda: execute(*args, **kwargs),
+                units=quota_units(self.methodId),
+            )
+
+
+def _build_request(http, *args, **kwargs):
+    # Bind every request to the transport of the thread that creates it,
+    # which makes the shared service objects safe to use from any thread.
+    return _InstrumentedRequest(get_http(), *args, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document(api, version):
+    document = discovery_cache.get_static_doc(api, version)
+    if document is None:
+        raise ValueError(f"No bundled discovery document for {api} {version}")
+    return document
+
+
+def get_service(api, version):
+    """Returns the process-wide service object for a Google API."""
+    key = (api, version)
+    with _lock:
+        service = _services.get(key)
+        if service is None:
+            service = build_from_document(
+                _discovery_document(api, version),
+                http=get_http(),
+                requestBuilder=_build_request,
+            )
+            _services[key] = service
+        return service
+
+
+def reset_clients():
+    """Drops the cached credentials, services and transports."""
+    global _credentials, _local
+    with _lock:
+        _credentials = None
+        _account_credentials.clear()
+        _services.clear()
+        _local = threading.local()
@@ -1,12 +1,79 @@
+import os
+from typing import Any
+
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
+from crewai.tasks.task_output import TaskOutput
+from pydantic import BaseModel
 
-from .tools.google_tools import (
-    gmail_reader_tool,
-    google_calendar_search_tool,
-    google_calendar_writer_tool,
-    human_approval_tool,
+from .cassette import get_cassette
+from .llm_cache import agent_llm
+from .message_index import commit_on_success
+from .structured import (
+    STRUCTURED_OUTPUTS,
+    TASK_OUTPUTS,
+    output_format,
+    parse_output,
 )
+from .tools import google_tools
+from .usage import check_budget, task_span
+
+
+def _llm_options():
+    """
+    Routes agents through the record/replay cassette or the LLM response
+    cache when either is enabled.
+    """
+    cassette = get_cassette()
+    if cassette is not None:
+        options = {}
+        if cassette.replaying:
+            # Replays never reach OpenAI, so no real key is needed.
+            options["openai_api_key"] = os.getenv("OPENAI_API_KEY", "replay")
+        return {"llm": agent_llm(cache=cassette.llm_cache(), **options)}
+    llm = agent_llm()
+    return {"llm": llm} if llm is not None else {}
+
+
+class TracedTask(Task):
+    """
+    A task that runs inside a span naming it and its agent, which LLM
+    token usage is charged to, and through the run's checkpoint, if any.
+    The messages it scans are only indexed once it completes.
+    """
+
+    name: str = ""
+    agent_name: str = ""
+    checkpoint: Any = None
+
+    def execute(self, *args, **kwargs):
+        execute = super().execute
+        with task_span(self.name, self.agent_name), commit_on_success():
+            if self.checkpoint is None:
+                return execute(*args, **kwargs)
+            output, restored = self.checkpoint.run(
+                self.name, lambda: execute(*args, **kwargs)
+            )
+            if restored:
+                self.output = TaskOutput(
+                    description=self.description, raw_output=output
+                )
+            self.checkpoint.advance(self.name, output)
+            return output
+
+    def _export_output(self, result):
+        model = self.output_pydantic
+        if model is None:
+            return super()._export_output(result)
+        # The answer is usually the JSON itself, possibly wrapped in prose;
+        # only ask the LLM to convert it when it cannot be read directly.
+        parsed = parse_output(model, result)
+        if parsed is None:
+            parsed = super()._export_output(result)
+            if not isinstance(parsed, BaseModel):
+                return parsed
+        # Handed to the next task as JSON rather than as a model's repr.
+        return parsed.model_dump_json(exclude_none=True)
 
 
 @CrewBase
@@ -16,64 +83,151 @@ class SchedulingCrew:
     agents_config = "../../config/agents.yaml"
     tasks_config = "../../config/tasks.yaml"
 
+    def __init__(self, checkpoint=None):
+        # A StageCheckpoint persisting, and on resume restoring, the
+        # output of every task of the sequential crew.
+        self.checkpoint = checkpoint
+        # Stage tasks, and so their agents and LLM clients, by task name,
+        # with their original description; built on first use.
+        self._stage_tasks = {}
+
     @agent
     def email_triage_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["email_triage_agent"],
-            tools=[gmail_reader_tool],
+            tools=[google_tools.gmail_reader_tool],
+            verbose=True,
+            step_callback=check_budget,
+            **_llm_options(),
+        )
+
+    # Not an @agent or @task: the sequential crew scans the inbox itself,
+    # and these only classify one message handed to them, e.g. by the
+    # daemon, without the Gmail reader tool.
+    def message_triage_agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config["email_triage_agent"],
+            tools=[],
             verbose=True,
+            step_callback=check_budget,
+            **_llm_options(),
         )
 
     @agent
     def scheduling_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["scheduling_agent"],
-            tools=[google_calendar_search_tool],
+            tools=[google_tools.google_calendar_search_tool],
             verbose=True,
+            step_callback=check_budget,
+            **_llm_options(),
         )
 
     @agent
     def confirmation_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["confirmation_agent"],
-            tools=[human_approval_tool],
+            tools=[google_tools.human_approval_tool],
             verbose=True,
+            step_callback=check_budget,
+            **_llm_options(),
         )
 
     @agent
     def booking_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["booking_agent"],
-            tools=[google_calendar_writer_tool],
+            tools=[google_tools.google_calendar_writer_tool],
             verbose=True,
+            step_callback=check_budget,
+            **_llm_options(),
+        )
+
+    def _task_options(self, name):
+        """
+        Returns the configuration of task ``name``. With
+        STRUCTURED_OUTPUTS, also declares its output model, and its
+        expected output becomes the short ``structured_output`` followed
+        by the model's JSON shape.
+        """
+        config = {**self.tasks_config[name]}
+        structured_output = config.pop("structured_output", "")
+        if not STRUCTURED_OUTPUTS:
+            return {"config": config}
+        model = TASK_OUTPUTS[name]
+        config["expected_output"] = (
+            f"{structured_output.strip()} {output_format(model)}".lstrip()
         )
+        return {"config": config, "output_pydantic": model}
 
     @task
     def scan_inbox_task(self) -> Task:
-        return Task(
-            config=self.tasks_config["scan_inbox_task"],
+        return TracedTask(
+            **self._task_options("scan_inbox_task"),
             agent=self.email_triage_agent(),
+            name="scan_inbox_task",
+            agent_name="email_triage_agent",
+            checkpoint=self.checkpoint,
+        )
+
+    def triage_message_task(self) -> Task:
+        return TracedTask(
+            **self._task_options("triage_message_task"),
+            agent=self.message_triage_agent(),
+            name="triage_message_task",
+            agent_name="message_triage_agent",
+            checkpoint=self.checkpoint,
         )
 
     @task
     def find_slots_task(self) -> Task:
-        return Task(
-            config=self.tasks_config["find_slots_task"],
+        return TracedTask(
+            **self._task_options("find_slots_task"),
             agent=self.scheduling_agent(),
+            name="find_slots_task",
+            agent_name="scheduling_agent",
+            checkpoint=self.checkpoint,
         )
 
     @task
     def confirm_time_task(self) -> Task:
-        return Task(
-            config=self.tasks_config["confirm_time_task"],
+        return TracedTask(
+            **self._task_options("confirm_time_task"),
             agent=self.confirmation_agent(),
+            name="confirm_time_task",
+            agent_name="confirmation_agent",
+            checkpoint=self.checkpoint,
         )
 
     @task
     def create_event_task(self) -> Task:
-        return Task(
-            config=self.tasks_config["create_event_task"],
+        return TracedTask(
+            **self._task_options("create_event_task"),
             agent=self.booking_agent(),
+            name="create_event_task",
+            agent_name="booking_agent",
+            checkpoint=self.checkpoint,
+        )
+
+    def stage_crew(self, task_name: str, context: str = None) -> Crew:
+        """
+        Creates a single-task crew for one stage of the workflow, with the
+        previous stage's output appended to the task description. The
+        stage's task and agent are reused by later crews of the stage, so
+        a SchedulingCrew must only run one stage crew at a time.
+        """
+        if task_name not in self._stage_tasks:
+            stage_task = getattr(self, task_name)()
+            self._stage_tasks[task_name] = (stage_task, stage_task.description)
+        stage_task, description = self._stage_tasks[task_name]
+        stage_task.description = (
+            f"{description}\n\nInput:\n{context}" if context else description
+        )
+        return Crew(
+            agents=[stage_task.agent],
+            tasks=[stage_task],
+            process=Process.sequential,
+            verbose=True,
         )
 
     @crew
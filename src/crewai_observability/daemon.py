@@ -0,0 +1,355 @@
+"""
+Long-running service mode.
+
+The daemon keeps the crew configuration, Google clients and telemetry
+initialized for the lifetime of the process. A poller thread reads only
+the messages added to the inbox since the stored Gmail historyId, either
+every DAEMON_POLL_INTERVAL seconds or as soon as a notification arrives on
+the local webhook (a stand-in for Gmail Pub/Sub push). New messages go
+through a bounded queue to worker threads that run the scheduling
+pipeline; when the queue is full the poller blocks, which keeps it from
+reading mail faster than it can be processed. The stored checkpoint only
+moves past a poll's messages once all of them have been processed, so
+mail still queued or in flight at shutdown is read again on restart.
+"""
+
+import collections
+import contextvars
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from googleapiclient.errors import HttpError
+
+from .accounts import account_key
+from .clients import get_http, get_service
+from .pipeline import (
+    MESSAGE_TRIAGE_STAGE,
+    SchedulingPipeline,
+    split_requests,
+)
+from .state import get_state_store
+from .telemetry import meter
+from .tools.google_tools import (
+    _format_parsed,
+    _parsed_candidate,
+    _read_message,
+    fetch_messages,
+    list_history_message_ids,
+)
+from .usage import run_span
+
+logger = logging.getLogger(__name__)
+
+# The daemon's own Gmail checkpoint: the Gmail reader tool keeps another
+# under GMAIL_HISTORY_KEY, and neither may move the other.
+DAEMON_HISTORY_KEY = "daemon.gmail.history_id"
+
+DAEMON_POLL_INTERVAL = float(os.getenv("DAEMON_POLL_INTERVAL", "60"))
+DAEMON_QUEUE_SIZE = int(os.getenv("DAEMON_QUEUE_SIZE", "20"))
+DAEMON_WORKERS = int(os.getenv("DAEMON_WORKERS", "2"))
+DAEMON_WEBHOOK_HOST = os.getenv("DAEMON_WEBHOOK_HOST", "127.0.0.1")
+# 0 disables the webhook and leaves polling as the only trigger.
+DAEMON_WEBHOOK_PORT = int(os.getenv("DAEMON_WEBHOOK_PORT", "0"))
+
+queue_depth = meter.create_up_down_counter(
+    "assistant.daemon.queue_depth",
+    unit="{message}",
+    description="Messages waiting to be processed.",
+)
+processing_lag = meter.create_histogram(
+    "assistant.daemon.processing_lag",
+    unit="s",
+    description="Time from a message arriving in Gmail to it being processed.",
+)
+processed_messages = meter.create_counter(
+    "assistant.daemon.messages",
+    unit="{message}",
+    description="Messages processed by the daemon, by outcome.",
+)
+
+
+class WorkItem:
+    """A new inbox message waiting to be processed."""
+
+    def __init__(self, message_id, text, received_at, batch=None):
+        self.message_id = message_id
+        self.text = text
+        self.received_at = received_at
+        # The _Batch of the poll that read the message.
+        self.batch = batch
+
+
+class _Batch:
+    """The messages one poll read, up to ``history_id``."""
+
+    def __init__(self, history_id):
+        self.history_id = history_id
+        self.pending = 0
+        # Whether every message of the poll was queued.
+        self.queued = False
+
+
+class AssistantDaemon:
+    """
+    Polls Gmail for new messages and processes them until stopped, for
+    the account being served when it is created.
+    """
+
+    def __init__(
+        self,
+        pipeline=None,
+        poll_interval=DAEMON_POLL_INTERVAL,
+        queue_size=DAEMON_QUEUE_SIZE,
+        workers=DAEMON_WORKERS,
+        webhook_port=DAEMON_WEBHOOK_PORT,
+        webhook_host=DAEMON_WEBHOOK_HOST,
+    ):
+        self.pipeline = pipeline or SchedulingPipeline()
+        self.history_key = account_key(DAEMON_HISTORY_KEY)
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.webhook_port = webhook_port
+        self.webhook_host = webhook_host
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        # Set once the stop timeout expires: workers leave the rest of the
+        # queue to the next start.
+        self._abandon = threading.Event()
+        self._wake = threading.Event()
+        # The historyId polled up to, ahead of the stored checkpoint while
+        # messages are being processed.
+        self._cursor = None
+        # Polls whose messages are not all processed yet, oldest first.
+        self._batches = collections.deque()
+        self._batches_lock = threading.Lock()
+        self._threads = []
+        self._webhook = None
+
+    # Polling ------------------------------------------------------------
+
+    def poll_once(self):
+        """
+        Enqueues the messages added since the last poll, or since the
+        stored checkpoint on the first one. The checkpoint advances once
+        they are processed. Returns the number of messages enqueued.
+        """
+        service = get_service("gmail", "v1")
+        store = get_state_store()
+        start_history_id = self._cursor or store.get(self.history_key)
+        message_ids = []
+        history_id = None
+        if start_history_id:
+            try:
+                message_ids, history_id = list_history_message_ids(
+                    service, start_history_id
+                )
+            except HttpError as exc:
+                if exc.resp.status != 404:
+                    raise
+        if history_id is None:
+            # First start, or an expired checkpoint: begin from now.
+            profile = service.users().getProfile(userId="me").execute()
+            with self._batches_lock:
+                self._batches.clear()
+                store.set(self.history_key, profile["historyId"])
+            self._cursor = profile["historyId"]
+            return 0
+
+        fetched = fetch_messages(service, message_ids, http_factory=get_http)
+        batch = _Batch(history_id)
+        with self._batches_lock:
+            self._batches.append(batch)
+        enqueued = 0
+        for message_id in message_ids:
+            message = fetched.get(message_id)
+            if message is None:
+                # Deleted before we got to it.
+                continue
+            parsed = _read_message(message)
+            if not _parsed_candidate(parsed):
+                # Newsletters and notifications never reach triage.
+                continue
+            received_at = int(message.get("internalDate", 0)) / 1000
+            thread_id = message.get("threadId", message_id)
+            item = WorkItem(
+                message_id,
+                f"Thread ID: {thread_id}\n"
+                f"{_format_parsed(message_id, parsed)}",
+                received_at or time.time(),
+                batch,
+            )
+            with self._batches_lock:
+                batch.pending += 1
+            if not self._put(item):
+                # Shutting down; leave the checkpoint before this poll.
+                return enqueued
+            enqueued += 1
+        self._cursor = history_id
+        with self._batches_lock:
+            batch.queued = True
+        self._advance_checkpoint()
+        return enqueued
+
+    def _advance_checkpoint(self):
+        # Past every poll, oldest first, whose messages are all processed.
+        store = get_state_store()
+        with self._batches_lock:
+            while self._batches and self._batches[0].queued:
+                if self._batches[0].pending:
+                    break
+                batch = self._batches.popleft()
+                store.set(self.history_key, batch.history_id)
+
+    def _put(self, item):
+        # Blocking here is the backpressure: no new mail is read while the
+        # workers are saturated.
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+            except queue.Full:
+                continue
+            queue_depth.add(1)
+            return True
+        return False
+
+    def notify(self):
+        """Wakes the poller immediately, e.g. on a push notification."""
+        self._wake.set()
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Polling Gmail failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    # Processing ---------------------------------------------------------
+
+    def process(self, item):
+        """
+        Triages one new message, on its own rather than by scanning the
+        inbox, and runs a pipeline per request in it.
+        """
+        with run_span("triage"):
+            triage_output = self.pipeline.run_stage(
+                MESSAGE_TRIAGE_STAGE, item.text
+            )
+        return list(self.pipeline.run(split_requests(triage_output)))
+
+    def _work_loop(self):
+        while not self._abandon.is_set():
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    # Stopping and drained.
+                    return
+                continue
+            queue_depth.add(-1)
+            try:
+                self._handle(item)
+            finally:
+                self.queue.task_done()
+
+    def _handle(self, item):
+        outcome = "ok"
+        try:
+            results = self.process(item)
+            if any(not result.ok for result in results):
+                outcome = "error"
+        except Exception:
+            outcome = "error"
+            logger.exception("Processing message %s failed", item.message_id)
+        finally:
+            processing_lag.record(time.time() - item.received_at)
+            processed_messages.add(1, {"outcome": outcome})
+            if item.batch is not None:
+                with self._batches_lock:
+                    item.batch.pending -= 1
+                self._advance_checkpoint()
+
+    # Lifecycle ----------------------------------------------------------
+
+    def start(self):
+        """Starts the poller, the workers and the optional webhook."""
+        for _ in range(self.workers):
+            self._spawn(self._work_loop, "assistant-worker")
+        self._spawn(self._poll_loop, "assistant-poller")
+        if self.webhook_port:
+            self._webhook = ThreadingHTTPServer(
+                (self.webhook_host, self.webhook_port),
+                _make_webhook_handler(self),
+            )
+            self._spawn(self._webhook.serve_forever, "assistant-webhook")
+        return self
+
+    def _spawn(self, target, name):
+        # Threads serve the account the daemon was started for.
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(target,),
+            name=name,
+            daemon=True,
+        )
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=30):
+        """
+        Stops polling and lets the workers drain the queue, waiting up to
+        ``timeout`` seconds. Workers still busy then finish their current
+        message and leave the rest of the queue unprocessed.
+        """
+        deadline = time.monotonic() + timeout
+        self._stop.set()
+        self._wake.set()
+        if self._webhook is not None:
+            self._webhook.shutdown()
+            self._webhook.server_close()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._abandon.set()
+
+    def serve_forever(self):
+        """Runs until SIGINT or SIGTERM, then shuts down gracefully."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def _make_webhook_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            try:
+                # Pub/Sub push bodies are JSON; the content is not needed
+                # because the poller reads history from its own checkpoint.
+                json.loads(body or b"{}")
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            daemon.notify()
+            self.send_response(204)
+            self.end_headers()
+
+    return Handler
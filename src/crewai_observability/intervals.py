@@ -0,0 +1,84 @@
+"""
+Helpers for half-open ``[start, end)`` time intervals.
+
+Intervals are ``(start, end)`` tuples of integer epoch seconds, which keeps
+comparisons cheap and independent of time zones. Functions that take
+"merged" intervals expect them sorted and non-overlapping, as returned by
+merge_intervals().
+"""
+
+import datetime
+
+
+def to_epoch(value):
+    """Converts an RFC 3339 timestamp or a date to epoch seconds (UTC)."""
+    if isinstance(value, datetime.datetime):
+        moment = value
+    else:
+        text = value.strip()
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"
+        moment = datetime.datetime.fromisoformat(text)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return int(moment.timestamp())
+
+
+def to_rfc3339(epoch):
+    """Formats epoch seconds as an RFC 3339 UTC timestamp."""
+    moment = datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def event_interval(event):
+    """Returns the ``(start, end)`` of a Calendar event resource."""
+    start, end = event["start"], event["end"]
+    if "dateTime" in start:
+        return to_epoch(start["dateTime"]), to_epoch(end["dateTime"])
+    # All-day events carry plain dates and are treated as UTC days.
+    return (
+        to_epoch(datetime.datetime.fromisoformat(start["date"])),
+        to_epoch(datetime.datetime.fromisoformat(end["date"])),
+    )
+
+
+def merge_intervals(intervals):
+    """Sorts intervals and coalesces the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(intervals, removed):
+    """Returns the parts of merged ``intervals`` not in merged ``removed``."""
+    result = []
+    j = 0
+    for start, end in intervals:
+        while j < len(removed) and removed[j][1] <= start:
+            j += 1
+        k = j
+        cursor = start
+        while k < len(removed) and removed[k][0] < end:
+            if removed[k][0] > cursor:
+                result.append((cursor, removed[k][0]))
+            cursor = max(cursor, removed[k][1])
+            k += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def clip_intervals(intervals, start, end):
+    """Returns merged ``intervals`` cut down to the window [start, end)."""
+    return [
+        (max(s, start), min(e, end))
+        for s, e in intervals
+        if s < end and e > start
+    ]
@@ -0,0 +1,210 @@
+"""
+Persistent LLM response cache for the crew's agents.
+
+Reprocessing the same email, or retrying a run after the approval step
+timed out, replays exactly the same prompts. With LLM_CACHE_ENABLED the
+agents' chat models look their responses up in a SQLite table first, so
+replays cost no tokens. Entries are keyed on the model settings (model
+name, temperature, stop words...) and the prompt, which already embeds
+the tool outputs the agent has seen; whitespace is normalized so that
+formatting noise in tool outputs does not cause misses. Entries expire
+after LLM_CACHE_TTL seconds and the least recently used ones are evicted
+beyond LLM_CACHE_MAX_ENTRIES.
+"""
+
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from .telemetry import meter
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Rough conversion used to report tokens saved without a tokenizer.
+CHARS_PER_TOKEN = 4
+
+# Runs of whitespace, including the escaped newlines and tabs of the
+# JSON-serialized prompt.
+_WHITESPACE = re.compile(r"(?:\\[nrt]|\s)+")
+# Object addresses in reprs, which LangChain's model settings string
+# includes for the cache itself and which change with every process.
+_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+cache_requests = meter.create_counter(
+    "assistant.llm_cache.requests",
+    unit="{request}",
+    description="LLM cache lookups, by result (hit or miss).",
+)
+tokens_saved = meter.create_counter(
+    "assistant.llm_cache.tokens_saved",
+    unit="{token}",
+    description="Estimated prompt and completion tokens served from cache.",
+)
+
+
+def cache_key(prompt, llm_string):
+    """Returns the cache key for a serialized prompt and model settings."""
+    normalized = _WHITESPACE.sub(" ", prompt).strip()
+    digest = hashlib.sha256()
+    digest.update(_ADDRESS.sub("", llm_string).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalized.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """A LangChain cache backed by SQLite, with a TTL and an LRU cap."""
+
+    def __init__(
+        self,
+        path=LLM_CACHE_PATH,
+        ttl=LLM_CACHE_TTL,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        clock=time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "tokens INTEGER NOT NULL, created_at REAL NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_last_used "
+            "ON llm_cache (last_used)"
+        )
+        self._conn.commit()
+
+    def lookup(self, prompt, llm_string):
+        key = cache_key(prompt, llm_string)
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, tokens, created_at FROM llm_cache "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row and now - row[2] > self.ttl:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key = ?", (key,)
+                )
+                self._conn.commit()
+                row = None
+            if row:
+                self._conn.execute(
+                    "UPDATE llm_cache SET last_used = ? WHERE key = ?",
+                    (now, key),
+                )
+                self._conn.commit()
+        if not row:
+            cache_requests.add(1, {"result": "miss"})
+            return None
+        cache_requests.add(1, {"result": "hit"})
+        tokens_saved.add(row[1])
+        return loads(row[0])
+
+    def update(self, prompt, llm_string, return_val):
+        key = cache_key(prompt, llm_string)
+        completion = "".join(generation.text for generation in return_val)
+        tokens = (len(prompt) + len(completion)) // CHARS_PER_TOKEN
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, value, tokens, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, dumps(list(return_val)), tokens, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_chat_openai():
+    # langchain_openai loads the OpenAI SDK, which takes about a second;
+    # only pay for it once an agent model is needed.
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_openai import ChatOpenAI
+
+    class CachedChatOpenAI(ChatOpenAI):
+        """
+        ChatOpenAI without token streaming. crewAI's agents call
+        ``stream()``, which bypasses LangChain caches for models that
+        implement streaming; falling back to the base implementation
+        routes it through ``invoke()`` and therefore through the cache.
+        """
+
+        _stream = BaseChatModel._stream
+
+    return CachedChatOpenAI
+
+
+def __getattr__(name):
+    if name == "CachedChatOpenAI":
+        return _cached_chat_openai()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the process-wide LLM response cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
+
+
+def agent_llm(cache=None, **kwargs):
+    """
+    Returns the chat model for an agent, answering from ``cache`` or, when
+    LLM_CACHE_ENABLED, from the response cache. Returns None when neither
+    applies, to keep crewAI's default model.
+    """
+    if cache is None:
+        if not LLM_CACHE_ENABLED:
+            return None
+        cache = get_llm_cache()
+    # Same model choice as crewAI's default agent LLM.
+    return _cached_chat_openai()(
+        model=os.environ.get("OPENAI_MODEL_NAME", "gpt-4"),
+        cache=cache,
+        **kwargs,
+    )
@@ -0,0 +1,369 @@
+"""
+Index of the Gmail messages already handed to triage.
+
+Without it every inbox scan sends the same threads to the LLM again, and a
+reply chain is triaged once per message in it. With MESSAGE_INDEX_ENABLED
+the Gmail reader tool records every message it hands to the agent, by
+message ID, by thread and by a hash of its content, in a SQLite table of
+the state database, and the messages the pre-filter drops by message ID.
+Later scans then skip:
+
+- messages already seen or dropped, before they are even fetched;
+- copies of a message already seen under another ID (the same mail
+  delivered to two aliases, or re-labelled), by content hash;
+- older messages of a thread, so each thread reaches triage once, as its
+  newest actionable message.
+
+Messages are only recorded once the task that scanned them completes:
+if triage fails after the scan, they reach triage again next time.
+
+Lookups go through an in-memory Bloom filter of the indexed keys first,
+so new mail, which is most of what an incremental scan reads, never
+touches SQLite. Entries are kept for MESSAGE_INDEX_RETENTION_DAYS after a
+message or thread was last seen; expired ones are purged, and the filter
+rebuilt, every MESSAGE_INDEX_COMPACT_INTERVAL seconds.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from .accounts import account_key
+from .state import STATE_DB_PATH
+from .telemetry import meter
+
+MESSAGE_INDEX_ENABLED = os.getenv(
+    "MESSAGE_INDEX_ENABLED", "false"
+).lower() in ("1", "true", "yes")
+MESSAGE_INDEX_RETENTION_DAYS = float(
+    os.getenv("MESSAGE_INDEX_RETENTION_DAYS", "30")
+)
+MESSAGE_INDEX_COMPACT_INTERVAL = float(
+    os.getenv("MESSAGE_INDEX_COMPACT_INTERVAL", "86400")
+)
+# Keys the Bloom filter is sized for at a 1% false-positive rate; it
+# grows to twice the indexed keys when compacted.
+MESSAGE_INDEX_BLOOM_CAPACITY = int(
+    os.getenv("MESSAGE_INDEX_BLOOM_CAPACITY", "100000")
+)
+
+skipped_messages = meter.create_counter(
+    "assistant.message_index.skipped",
+    unit="{message}",
+    description=(
+        "Messages kept from triage by the message index, by reason "
+        "(seen, dropped, duplicate or thread)."
+    ),
+)
+bytes_saved = meter.create_counter(
+    "assistant.message_index.bytes_saved",
+    unit="By",
+    description="Tool output bytes not handed to triage again.",
+)
+
+# Scans waiting for the task that ran them to complete, or None outside a
+# task.
+_uncommitted = contextvars.ContextVar("uncommitted_scans", default=None)
+
+
+@contextlib.contextmanager
+def commit_on_success():
+    """
+    Defers recording the scans made in this context until it exits
+    without an error, and drops them otherwise.
+    """
+    scans = []
+    token = _uncommitted.set(scans)
+    try:
+        yield
+    finally:
+        _uncommitted.reset(token)
+    for scan in scans:
+        scan.commit()
+
+
+def content_digest(headers, subject, body):
+    """
+    Returns the hash identifying a message's content: its sender, date,
+    subject and body. Copies of one mail share it; a message sent again
+    later does not.
+    """
+    digest = hashlib.sha256()
+    for part in (
+        headers.get("from", ""),
+        headers.get("date", ""),
+        subject,
+        " ".join(body.split()),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class BloomFilter:
+    """
+    A Bloom filter of strings, with a 1% false-positive rate (by default)
+    at ``capacity`` keys.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit hashes.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + i * second) % self.size for i in range(self.hashes)
+        )
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class MessageIndex:
+    """
+    Processed messages, threads and contents by key, backed by SQLite with
+    a Bloom filter in front. Keys are kept per account.
+    """
+
+    def __init__(
+        self,
+        path=STATE_DB_PATH,
+        retention_days=MESSAGE_INDEX_RETENTION_DAYS,
+        compact_interval=MESSAGE_INDEX_COMPACT_INTERVAL,
+        bloom_capacity=MESSAGE_INDEX_BLOOM_CAPACITY,
+        clock=time.time,
+    ):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.compact_interval = compact_interval
+        self.bloom_capacity = bloom_capacity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # ``received_at`` is the Gmail arrival time (ms) of the message, or
+        # of the newest message handed on for a thread; ``bytes`` is the
+        # size of the text that was handed on.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS message_index ("
+            "key TEXT PRIMARY KEY, received_at INTEGER NOT NULL, "
+            "bytes INTEGER NOT NULL, seen_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS message_index_seen_at "
+            "ON message_index (seen_at)"
+        )
+        self._conn.commit()
+        self.compact()
+
+    def _lookup(self, key):
+        key = account_key(key)
+        if key not in self._bloom:
+            return None
+        with self._lock:
+            return self._conn.execute(
+                "SELECT received_at, bytes FROM message_index WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def seen(self, message_id):
+        """
+        Returns the bytes of text handed on for ``message_id``, 0 if the
+        pre-filter dropped it, or None if it was never seen.
+        """
+        row = self._lookup(f"message:{message_id}")
+        return row[1] if row else None
+
+    def has_content(self, digest):
+        return self._lookup(f"content:{digest}") is not None
+
+    def thread_received(self, thread_id):
+        """Returns the arrival time of the thread's newest message seen."""
+        row = self._lookup(f"thread:{thread_id}")
+        return row[0] if row else None
+
+    def record(self, entries):
+        """
+        Records handed-on messages, given as ``(message_id, thread_id,
+        received_at, digest, size)`` tuples. Dropped messages have no
+        thread ID or digest and a size of 0; only their ID is recorded.
+        """
+        now = self._clock()
+        rows = []
+        for message_id, thread_id, received_at, digest, size in entries:
+            rows.append((f"message:{message_id}", received_at, size))
+            if digest is not None:
+                rows.append((f"content:{digest}", received_at, size))
+            if thread_id is not None:
+                rows.append((f"thread:{thread_id}", received_at, 0))
+        rows = [(account_key(key), r, s, now) for key, r, s in rows]
+        with self._lock:
+            # A thread keeps the arrival time of its newest message.
+            self._conn.executemany(
+                "INSERT INTO message_index "
+                "(key, received_at, bytes, seen_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "received_at = MAX(received_at, excluded.received_at), "
+                "seen_at = excluded.seen_at",
+                rows,
+            )
+            self._conn.commit()
+            for key, *_ in rows:
+                self._bloom.add(key)
+        if now - self._compacted_at >= self.compact_interval:
+            self.compact()
+
+    def compact(self):
+        """
+        Drops the entries not seen within the retention period and
+        rebuilds the Bloom filter from the rest.
+        """
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM message_index WHERE seen_at < ?",
+                (now - self.retention,),
+            )
+            self._conn.commit()
+            keys = [
+                row[0]
+                for row in self._conn.execute("SELECT key FROM message_index")
+            ]
+            bloom = BloomFilter(max(self.bloom_capacity, 2 * len(keys)))
+            for key in keys:
+                bloom.add(key)
+            self._bloom = bloom
+            self._compacted_at = now
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ScanDedupe:
+    """
+    Keeps one inbox scan from handing on messages that were already
+    handed on, or that another message of the scan supersedes.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        # thread ID -> (received_at, slot, message_id, digest, size) of
+        # the message kept for it.
+        self._threads = {}
+        self._contents = set()
+        self._seen = []
+
+    def _skip(self, reason, size):
+        skipped_messages.add(1, {"reason": reason})
+        bytes_saved.add(size)
+
+    def unseen(self, message_ids):
+        """Yields the IDs of ``message_ids`` never handed on before."""
+        for message_id in message_ids:
+            size = self.index.seen(message_id)
+            if size is None:
+                yield message_id
+            else:
+                self._skip("seen" if size else "dropped", size)
+
+    def drop(self, message_id, received_at):
+        """
+        Records that the pre-filter dropped the message, so it is not
+        fetched again. Its thread and content stay unknown: another
+        message of the thread may still be a meeting request.
+        """
+        self._seen.append((message_id, None, received_at, None, 0))
+
+    def slot(self, message_id, identity, size, default):
+        """
+        Returns where the scan's output should hold a message: ``default``
+        for a message to add, the slot of an older message of its thread
+        that it supersedes, or None for a message to skip. ``identity`` is
+        ``(thread_id, received_at, digest)``.
+        """
+        thread_id, received_at, digest = identity
+        kept = self._threads.get(thread_id)
+        newest = self.index.thread_received(thread_id)
+        if digest in self._contents or self.index.has_content(digest):
+            reason = "duplicate"
+        elif (newest is not None and received_at <= newest) or (
+            kept is not None and received_at <= kept[0]
+        ):
+            reason = "thread"
+        else:
+            return default if kept is None else kept[1]
+        self._skip(reason, size)
+        self._seen.append((message_id, thread_id, received_at, digest, size))
+        return None
+
+    def keep(self, message_id, identity, size, slot):
+        """Records that the message was handed on in ``slot``."""
+        thread_id, received_at, digest = identity
+        superseded = self._threads.get(thread_id)
+        if superseded is not None and superseded[1] == slot:
+            # The older message of the thread is dropped from the output.
+            older_at, _, older_id, older_digest, older_size = superseded
+            self._skip("thread", older_size)
+            self._seen.append(
+                (older_id, thread_id, older_at, older_digest, older_size)
+            )
+        self._threads[thread_id] = (
+            received_at, slot, message_id, digest, size
+        )
+        self._contents.add(digest)
+
+    def handed_on(self):
+        """
+        Records every message the scan handed on or skipped, once the
+        task it runs in completes, if it runs in one.
+        """
+        scans = _uncommitted.get()
+        if scans is None:
+            self.commit()
+        else:
+            scans.append(self)
+
+    def commit(self):
+        """Records every message the scan handed on or skipped."""
+        seen = self._seen + [
+            (message_id, thread_id, received_at, digest, size)
+            for thread_id, (
+                received_at, _, message_id, digest, size
+            ) in self._threads.items()
+        ]
+        if seen:
+            self.index.record(seen)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_message_index():
+    """Returns the process-wide message index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MessageIndex()
+        return _index
@@ -0,0 +1,182 @@
+"""
+Bounded text extraction from Gmail message payloads.
+
+Gmail returns a message as a tree of MIME parts with base64url-encoded
+bodies. The helpers here walk the whole tree, pick the text/plain body
+(or convert the text/html one when there is none), and decode it in
+chunks that stop as soon as the byte budget is reached, so a long body is
+never decoded in full and attachments are never decoded at all. Quoted
+replies and signatures are stripped, since the agent only needs what the
+sender wrote.
+"""
+
+import base64
+import codecs
+import re
+from html.parser import HTMLParser
+
+from .tool_metrics import current_call
+
+# Decoded bytes per chunk; a multiple of 3 so chunks end on base64
+# quantum boundaries.
+DECODE_CHUNK_BYTES = 48 * 1024
+# HTML carries far more markup than text, so more of it is decoded to
+# yield the same amount of text.
+HTML_BUDGET_FACTOR = 4
+TRUNCATION_MARKER = "\n[truncated]"
+
+_ORIGINAL_MESSAGE = re.compile(
+    r"^-{2,}\s*(?:original message|forwarded message)\s*-{2,}$",
+    re.IGNORECASE,
+)
+_REPLY_HEADER = re.compile(r"^on\b.*\bwrote:$", re.IGNORECASE)
+_MOBILE_SIGNATURE = re.compile(r"^sent from my \w+", re.IGNORECASE)
+
+
+def walk_parts(payload):
+    """Yields ``payload`` and every nested MIME part, depth first."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        yield part
+        stack.extend(reversed(part.get("parts") or []))
+
+
+def iter_decoded(data, limit, chunk_bytes=DECODE_CHUNK_BYTES):
+    """
+    Yields the bytes of a base64url-encoded body chunk by chunk, stopping
+    once ``limit`` bytes have been produced.
+    """
+    chunk_chars = chunk_bytes // 3 * 4
+    remaining = limit
+    for start in range(0, len(data), chunk_chars):
+        if remaining <= 0:
+            return
+        piece = data[start:start + chunk_chars]
+        piece += "=" * (-len(piece) % 4)
+        decoded = base64.urlsafe_b64decode(piece)[:remaining]
+        remaining -= len(decoded)
+        current_call().add(bytes_decoded=len(decoded))
+        yield decoded
+
+
+def _iter_text(data, limit):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    # The decoder is never finalized, so a multi-byte character cut in
+    # half by the limit is dropped rather than replaced.
+    for chunk in iter_decoded(data, limit):
+        yield decoder.decode(chunk)
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document."""
+
+    BLOCK_TAGS = {
+        "p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+        "blockquote", "table",
+    }
+    HIDDEN_TAGS = {"script", "style", "head", "title"}
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.HIDDEN_TAGS:
+            self._hidden += 1
+        elif tag in self.BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.HIDDEN_TAGS:
+            self._hidden = max(0, self._hidden - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self._hidden:
+            self.chunks.append(data)
+
+    def text(self):
+        text = "".join(self.chunks)
+        lines = (" ".join(line.split()) for line in text.splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def html_to_text(chunks):
+    """Converts HTML, given as an iterable of string chunks, to text."""
+    parser = _TextExtractor()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.text()
+
+
+def strip_quoted(text):
+    """
+    Removes quoted replies, forwarded history and signatures, keeping
+    what the sender wrote in this message.
+    """
+    lines = text.splitlines()
+    kept = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if line.rstrip("\r") in ("-- ", "--"):
+            break
+        if _ORIGINAL_MESSAGE.match(stripped):
+            break
+        if _MOBILE_SIGNATURE.match(stripped):
+            break
+        if _REPLY_HEADER.match(stripped):
+            break
+        # Mail clients often wrap "On <date>, <name> wrote:" onto two lines
+        if (
+            stripped.lower().startswith("on ")
+            and index + 1 < len(lines)
+            and lines[index + 1].strip().lower().endswith("wrote:")
+        ):
+            break
+        if stripped.startswith(">"):
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def truncate(text, max_bytes):
+    """Caps ``text`` at ``max_bytes`` of UTF-8, marking any cut."""
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    cut = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+def extract_body(payload, max_bytes):
+    """
+    Returns the cleaned text body of a Gmail message payload, cut to
+    ``max_bytes`` plus a truncation marker. Prefers text/plain and falls
+    back to text/html; parts carrying a filename are attachments and are
+    skipped.
+    """
+    plain = html = None
+    for part in walk_parts(payload):
+        if part.get("filename") or not (part.get("body") or {}).get("data"):
+            continue
+        mime_type = part.get("mimeType", "")
+        if mime_type == "text/plain" and plain is None:
+            plain = part
+        elif mime_type == "text/html" and html is None:
+            html = part
+
+    if plain is not None:
+        # Decode past the budget so that stripping quoted text can still
+        # leave a full budget of new text.
+        text = "".join(_iter_text(plain["body"]["data"], max_bytes * 2))
+    elif html is not None:
+        text = html_to_text(
+            _iter_text(html["body"]["data"], max_bytes * HTML_BUDGET_FACTOR)
+        )
+    else:
+        return ""
+    return truncate(strip_quoted(text), max_bytes)
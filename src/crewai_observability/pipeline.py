@@ -0,0 +1,216 @@
+"""
+Concurrent processing of several meeting requests per run.
+
+The inbox is triaged once, then every meeting request found is pushed
+through its own find-slots / confirm / book pipeline on a bounded worker
+pool. Each stage runs as a single-task crew behind a semaphore, so stages
+have independent concurrency limits; the human approval stage defaults to
+one at a time so console prompts never interleave, and to the worker count
+with APPROVAL_MODE=broker, where waiting for an answer only parks its own
+pipeline.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .approvals import APPROVAL_MODE
+from .checkpoints import (
+    CHECKPOINT_RESUME,
+    StageCheckpoint,
+    get_checkpoint_store,
+    thread_scope,
+)
+from .prefetch import calendar_prefetch
+from .structured import extract_json
+from .usage import run_span
+
+TRIAGE_STAGE = "scan_inbox_task"
+# Triage of one message given as its input, rather than of the inbox.
+MESSAGE_TRIAGE_STAGE = "triage_message_task"
+REQUEST_STAGES = ("find_slots_task", "confirm_time_task", "create_event_task")
+
+
+def default_stage_limits(approval_mode=APPROVAL_MODE):
+    """
+    Returns the default per-stage limits. Stages left out are limited by
+    the number of workers only.
+    """
+    if approval_mode == "broker":
+        return "find_slots_task=4,create_event_task=2"
+    return "find_slots_task=4,confirm_time_task=1,create_event_task=2"
+
+
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "4"))
+PIPELINE_STAGE_LIMITS = os.getenv(
+    "PIPELINE_STAGE_LIMITS", default_stage_limits()
+)
+
+
+def parse_stage_limits(spec):
+    """Parses ``stage=limit`` pairs separated by commas."""
+    limits = {}
+    for pair in spec.split(","):
+        if pair.strip():
+            stage, limit = pair.split("=", 1)
+            limits[stage.strip()] = int(limit)
+    return limits
+
+
+def split_requests(triage_output):
+    """
+    Extracts the individual meeting requests from the scan_inbox_task
+    output, which is expected to hold a JSON list (possibly wrapped in an
+    object or surrounded by prose). Returns an empty list if there is none.
+    """
+    data = extract_json(triage_output)
+    if isinstance(data, dict):
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+    if not isinstance(data, list):
+        return []
+    return [
+        json.dumps(item) if isinstance(item, (dict, list)) else str(item)
+        for item in data
+    ]
+
+
+class PipelineResult:
+    """The outcome of one meeting request's pipeline."""
+
+    def __init__(self, request):
+        self.request = request
+        self.outputs = {}
+        self.error = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def output(self):
+        """The output of the last stage that completed."""
+        return self.outputs[list(self.outputs)[-1]] if self.outputs else None
+
+
+class SchedulingPipeline:
+    """Fans meeting requests out to concurrent per-request crews."""
+
+    def __init__(
+        self,
+        crew_factory=None,
+        max_workers=PIPELINE_MAX_WORKERS,
+        stage_limits=None,
+        resume=CHECKPOINT_RESUME,
+    ):
+        if crew_factory is None:
+            # crewAI takes seconds to import; only pay for it once a
+            # pipeline is actually set up.
+            from .crew import SchedulingCrew
+
+            crew_factory = SchedulingCrew
+        self.crew_factory = crew_factory
+        # Idle crews: building one parses the YAML configuration and
+        # creates every agent and LLM client, so they are reused by later
+        # stages and runs, one stage at a time each.
+        self._crews = queue.SimpleQueue()
+        self.max_workers = max_workers
+        self.resume = resume
+        limits = parse_stage_limits(PIPELINE_STAGE_LIMITS)
+        limits.update(stage_limits or {})
+        stages = (TRIAGE_STAGE, MESSAGE_TRIAGE_STAGE) + REQUEST_STAGES
+        self._semaphores = {
+            stage: threading.BoundedSemaphore(limits.get(stage, max_workers))
+            for stage in stages
+        }
+
+    def run_stage(self, stage, context=None):
+        """Runs one stage as a single-task crew within its limit."""
+        with self._semaphores[stage], self._crew() as crews:
+            crew = crews.stage_crew(stage, context)
+            return str(crew.kickoff())
+
+    @contextlib.contextmanager
+    def _crew(self):
+        """Lends out an idle crew, building one only if all are busy."""
+        try:
+            crews = self._crews.get_nowait()
+        except queue.Empty:
+            crews = self.crew_factory()
+        try:
+            yield crews
+        finally:
+            self._crews.put(crews)
+
+    def process_request(self, request):
+        """
+        Runs every request stage in order for one meeting request. Stages
+        are checkpointed under the request's thread, when it names one.
+        """
+        result = PipelineResult(request)
+        started = time.perf_counter()
+        context = request
+        scope = thread_scope(request)
+        checkpoint = (
+            StageCheckpoint(get_checkpoint_store(), self.resume, scope)
+            if scope
+            else None
+        )
+        try:
+            with run_span("request"):
+                for stage in REQUEST_STAGES:
+                    execute = functools.partial(self.run_stage, stage, context)
+                    if checkpoint is None:
+                        context = execute()
+                    else:
+                        context, _ = checkpoint.run(stage, execute)
+                    result.outputs[stage] = context
+        except Exception as exc:
+            result.error = exc
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def run(self, requests):
+        """Processes requests concurrently, yielding results as they finish."""
+        if not requests:
+            return
+        workers = min(self.max_workers, len(requests))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Requests are processed in the caller's context, so for the
+            # account it serves.
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self.process_request,
+                    request,
+                )
+                for request in requests
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def kickoff(self):
+        """
+        Triages the inbox and processes every request found, yielding each
+        result as soon as its pipeline finishes.
+        """
+        checkpoint = StageCheckpoint(get_checkpoint_store(), self.resume)
+        # The calendar is read while the triage LLM works, not after.
+        with calendar_prefetch():
+            with run_span("triage"):
+                triage_output, _ = checkpoint.run(
+                    TRIAGE_STAGE,
+                    functools.partial(self.run_stage, TRIAGE_STAGE),
+                )
+            ok = True
+            for result in self.run(split_requests(triage_output)):
+                ok = ok and result.ok
+                yield result
+        if ok:
+            checkpoint.finish()
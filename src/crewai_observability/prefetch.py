@@ -0,0 +1,192 @@
+"""
+Speculative free/busy prefetch, overlapping the inbox triage.
+
+A run spends its first seconds, often much longer, waiting for the triage
+LLM, and only then does the slot search read any calendar. With
+CALENDAR_PREFETCH the run instead starts reading the user's own calendar
+(CALENDAR_PREFETCH_IDS) over the default search window as soon as it
+begins, on a background thread, into the busy cache. By the time the slot
+search runs, those ranges are cached and only the attendees' calendars
+are left to fetch.
+
+The prefetch shows up in traces as its own ``prefetch calendar`` span,
+next to the triage, and the calendar search tool's span records how long
+it still waited for the prefetch and how much fetch time the prefetch
+took off the critical path.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import logging
+import os
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from opentelemetry import trace
+
+from .calendar_cache import get_busy_cache
+from .clients import get_service
+from .scheduling import SCHEDULING_TIME_ZONE, WORKING_DAYS
+from .telemetry import tracer
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_PREFETCH = os.getenv("CALENDAR_PREFETCH", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# The slot search looks this many working days ahead.
+CALENDAR_PREFETCH_DAYS = int(os.getenv("CALENDAR_PREFETCH_DAYS", "5"))
+CALENDAR_PREFETCH_IDS = [
+    calendar_id.strip()
+    for calendar_id in os.getenv("CALENDAR_PREFETCH_IDS", "primary").split(
+        ","
+    )
+    if calendar_id.strip()
+]
+
+_current = contextvars.ContextVar("calendar_prefetch", default=None)
+
+
+def prefetch_window(
+    now=None,
+    working_days=CALENDAR_PREFETCH_DAYS,
+    time_zone=SCHEDULING_TIME_ZONE,
+    days=WORKING_DAYS,
+):
+    """
+    Returns the epoch-second range the slot search will most likely ask
+    for: from the start of today to the end of the ``working_days``-th
+    working day after it, plus a day of slack for searches that start
+    tomorrow or run a day long.
+    """
+    zone = ZoneInfo(time_zone)
+    now = now if now is not None else time.time()
+    today = datetime.datetime.fromtimestamp(now, zone).date()
+    day, remaining = today, working_days
+    while remaining > 0:
+        day += datetime.timedelta(days=1)
+        if day.weekday() in days:
+            remaining -= 1
+    last = day + datetime.timedelta(days=2)
+
+    def _midnight(date):
+        return datetime.datetime.combine(date, datetime.time(), zone)
+
+    return _midnight(today).timestamp(), _midnight(last).timestamp()
+
+
+class CalendarPrefetch:
+    """One background read of calendars into the busy cache."""
+
+    def __init__(
+        self, calendar_ids=None, window=None, cache=None, service=None
+    ):
+        self.calendar_ids = list(calendar_ids or CALENDAR_PREFETCH_IDS)
+        self.window = window or prefetch_window()
+        self.cache = cache
+        self.service = service
+        self.duration = None
+        self.error = None
+        self._done = threading.Event()
+
+    def start(self):
+        """Starts the prefetch in a copy of the current context."""
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run,
+            args=(self._run,),
+            name="calendar-prefetch",
+            daemon=True,
+        ).start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(
+                "prefetch calendar",
+                attributes={
+                    "calendar.prefetch.calendars": self.calendar_ids,
+                    "calendar.prefetch.start": self.window[0],
+                    "calendar.prefetch.end": self.window[1],
+                },
+            ):
+                cache = self.cache or get_busy_cache()
+                service = self.service or get_service("calendar", "v3")
+                cache.busy(service, self.calendar_ids, *self.window)
+        except Exception as exc:
+            # Speculative: the slot search fetches for itself instead.
+            self.error = exc
+            logger.warning("Calendar prefetch failed: %s", exc)
+        finally:
+            self.duration = time.perf_counter() - started
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def covers(self, calendar_id, start, end):
+        """Tells whether the prefetch read ``calendar_id`` over the range."""
+        return (
+            calendar_id in self.calendar_ids
+            and self.window[0] <= start
+            and end <= self.window[1]
+        )
+
+    def wait(self, timeout=None):
+        """Waits for the prefetch to finish; returns the seconds waited."""
+        started = time.perf_counter()
+        self._done.wait(timeout)
+        return time.perf_counter() - started
+
+
+def current_prefetch():
+    """Returns the prefetch of the running workflow, if one was started."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def calendar_prefetch(enabled=None, **options):
+    """
+    Starts a calendar prefetch, when enabled (default: CALENDAR_PREFETCH),
+    for the work done in this context.
+    """
+    if not (CALENDAR_PREFETCH if enabled is None else enabled):
+        yield None
+        return
+    prefetch = CalendarPrefetch(**options).start()
+    token = _current.set(prefetch)
+    try:
+        yield prefetch
+    finally:
+        _current.reset(token)
+
+
+def await_prefetch(calendar_ids, start, end):
+    """
+    Waits for the current prefetch, if it read any of ``calendar_ids``
+    over [start, end), and records on the current span how long that took
+    and how much fetch time the prefetch saved.
+    """
+    prefetch = current_prefetch()
+    if prefetch is None:
+        return
+    prefetched = [c for c in calendar_ids if prefetch.covers(c, start, end)]
+    span = trace.get_current_span()
+    span.set_attribute("calendar.prefetch.hit", bool(prefetched))
+    if not prefetched:
+        return
+    waited = prefetch.wait()
+    saved = 0.0 if prefetch.error else max(prefetch.duration - waited, 0.0)
+    span.set_attributes(
+        {
+            "calendar.prefetch.calendars": prefetched,
+            "calendar.prefetch.wait": waited,
+            "calendar.prefetch.saved": saved,
+        }
+    )
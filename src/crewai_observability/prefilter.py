@@ -0,0 +1,117 @@
+"""
+Local pre-filter for inbox triage.
+
+Every message handed to scan_inbox_task costs LLM tokens, including the
+newsletters and notifications that make up most of an inbox. This module
+scores messages with precompiled patterns for meeting language and with
+the headers that mailing lists and automated senders set, so obvious
+non-candidates can be dropped before the LLM sees them.
+
+Scores are additive: meeting language counts up, bulk-mail headers count
+down, and a message is kept when its score reaches PREFILTER_THRESHOLD.
+The default of 0 only drops mail whose bulk signals outweigh any meeting
+language; raise it to 1 to also drop personal mail that never mentions
+meeting.
+"""
+
+import os
+import re
+
+from .telemetry import meter
+
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PREFILTER_THRESHOLD = float(os.getenv("PREFILTER_THRESHOLD", "0"))
+# Meeting requests state their intent early; scanning a bounded prefix
+# keeps the cost flat for long bodies.
+PREFILTER_SCAN_CHARS = int(os.getenv("PREFILTER_SCAN_CHARS", "4000"))
+
+# (pattern, weight); each pattern counts at most once per message.
+MEETING_PATTERNS = [
+    (
+        re.compile(
+            r"\b(?:let'?s|can we|could we|shall we|would like to|want to)"
+            r"\s+(?:meet|talk|chat|sync|catch up|connect|hop on)",
+            re.IGNORECASE,
+        ),
+        2.0,
+    ),
+    (
+        re.compile(
+            r"\b(?:meeting|call|sync|catch[- ]up|1:1|one-on-one|interview"
+            r"|demo|coffee)\b",
+            re.IGNORECASE,
+        ),
+        1.0,
+    ),
+    (
+        re.compile(
+            r"\b(?:schedule|reschedule|availability|available|free slot"
+            r"|time slot|works for you|calendar invite)\b",
+            re.IGNORECASE,
+        ),
+        1.0,
+    ),
+    (
+        re.compile(
+            r"\b(?:mon|tues|wednes|thurs|fri|satur|sun)day\b|\btomorrow\b"
+            r"|\bnext week\b|\b\d{1,2}(?::\d{2})?\s?(?:am|pm)\b",
+            re.IGNORECASE,
+        ),
+        1.0,
+    ),
+]
+
+BULK_PRECEDENCE = {"bulk", "list", "junk"}
+AUTOMATED_SENDER = re.compile(
+    r"\b(?:no-?reply|do-?not-?reply|notifications?|newsletter|mailer-daemon)"
+    r"@",
+    re.IGNORECASE,
+)
+
+prefilter_messages = meter.create_counter(
+    "assistant.prefilter.messages",
+    unit="{message}",
+    description="Messages seen by the triage pre-filter, by decision.",
+)
+
+
+def score_message(headers, subject, body):
+    """
+    Scores how likely a message is to be a meeting request.
+
+    ``headers`` maps lower-cased header names to values.
+    """
+    text = f"{subject}\n{body[:PREFILTER_SCAN_CHARS]}"
+    score = sum(
+        weight for pattern, weight in MEETING_PATTERNS if pattern.search(text)
+    )
+
+    if "list-unsubscribe" in headers:
+        score -= 2.0
+    if "list-id" in headers:
+        score -= 1.0
+    if headers.get("precedence", "").strip().lower() in BULK_PRECEDENCE:
+        score -= 3.0
+    if headers.get("auto-submitted", "no").strip().lower() != "no":
+        score -= 3.0
+    if AUTOMATED_SENDER.search(headers.get("from", "")):
+        score -= 2.0
+    return score
+
+
+def keep_message(headers, subject, body, threshold=None):
+    """
+    Returns whether a message should be passed on to triage, recording the
+    decision in the ``assistant.prefilter.messages`` counter.
+    """
+    if not PREFILTER_ENABLED:
+        return True
+    if threshold is None:
+        threshold = PREFILTER_THRESHOLD
+    keep = score_message(headers, subject, body) >= threshold
+    prefilter_messages.add(1, {"decision": "kept" if keep else "dropped"})
+    return keep
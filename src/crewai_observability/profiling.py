@@ -0,0 +1,303 @@
+"""
+Sampling profiler for runs, tasks and tool invocations.
+
+Spans show where a slow run spent its wall time, not why. With
+PROFILING_ENABLED (or ``main.py --profile``) every run, task and tool span
+is profiled while it is open: a single background thread samples the
+Python stacks every PROFILING_INTERVAL seconds, and each open profile
+counts the stacks it sees: all threads for a run, the thread that opened
+it for a task or tool. When the span ends, the profile is attached to it:
+
+- ``profile.samples`` and ``profile.stacks``, the most sampled stacks in
+  collapsed form (``thread;outer;...;inner count``), where parsing shows
+  up as Python frames and blocking I/O as frames waiting in socket, SSL
+  or lock calls;
+- ``profile.cpu_time``, CPU seconds used (by the process for a run, by
+  the thread otherwise), to compare with the span's wall time;
+- ``profile.gil_wait``, how late the sampler woke up, summed: sleeping
+  releases the GIL, so waking late mostly means waiting for other
+  threads to release it;
+- ``profile.overhead``, the seconds the sampler itself spent on samples.
+
+With PROFILING_OUTPUT_DIR set, every profile's stacks are also written
+there as a collapsed-stack file (``<trace id>-<span id>.folded``), which
+flamegraph.pl and speedscope read. With PROFILING_MEMORY, tracemalloc
+traces allocations while profiles are open, and ``profile.memory.delta``
+and ``profile.memory.top`` record the net bytes the process allocated
+while the span was open and the lines allocating the most. Tracing
+allocations slows Python down noticeably, so it is only meant for
+investigations.
+"""
+
+import collections
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.01"))
+PROFILING_MEMORY = os.getenv("PROFILING_MEMORY", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Empty: profiles are only attached to their spans.
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "")
+# Stacks and allocating lines attached to a span.
+PROFILING_TOP = int(os.getenv("PROFILING_TOP", "10"))
+
+_settings = contextvars.ContextVar("profiling", default=None)
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def collapse(frame, thread_name):
+    """Returns the stack of ``frame`` as a collapsed-stack line."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class Profile:
+    """The samples taken while one span was open."""
+
+    def __init__(self, interval, thread_id=None, memory=False):
+        self.interval = interval
+        # None: sample every thread.
+        self.thread_id = thread_id
+        self.memory = memory
+        self.samples = 0
+        self.stacks = collections.Counter()
+        self.gil_wait = 0.0
+        self.overhead = 0.0
+        self.cpu_time = 0.0
+        self.memory_top = []
+        self.memory_delta = 0
+
+    def _cpu_clock(self):
+        # thread_time() is only meaningful on the thread that opened it.
+        if self.thread_id is None:
+            return time.process_time()
+        return time.thread_time()
+
+    def start(self):
+        self._cpu_started = self._cpu_clock()
+        if self.memory:
+            _start_tracing()
+            self._snapshot = tracemalloc.take_snapshot()
+        _sampler.attach(self)
+        return self
+
+    def stop(self):
+        _sampler.detach(self)
+        self.cpu_time = self._cpu_clock() - self._cpu_started
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            _stop_tracing()
+            self._record_memory(snapshot)
+
+    def _record_memory(self, snapshot):
+        ignored = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        diff = snapshot.filter_traces(ignored).compare_to(
+            self._snapshot.filter_traces(ignored), "lineno"
+        )
+        self._snapshot = None
+        self.memory_delta = sum(stat.size_diff for stat in diff)
+        growth = sorted(diff, key=lambda stat: stat.size_diff, reverse=True)
+        self.memory_top = [
+            f"{frame.filename}:{frame.lineno} {stat.size_diff:+d} B"
+            for stat in growth[:PROFILING_TOP]
+            if stat.size_diff > 0
+            for frame in stat.traceback[:1]
+        ]
+
+    def folded(self):
+        """Returns the samples in collapsed-stack format."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.items()
+        )
+
+    def attributes(self, top=PROFILING_TOP):
+        attributes = {
+            "profile.samples": self.samples,
+            "profile.interval": self.interval,
+            "profile.stacks": [
+                f"{stack} {count}"
+                for stack, count in self.stacks.most_common(top)
+            ],
+            "profile.cpu_time": self.cpu_time,
+            "profile.gil_wait": self.gil_wait,
+            "profile.overhead": self.overhead,
+        }
+        if self.memory:
+            attributes["profile.memory.delta"] = self.memory_delta
+            attributes["profile.memory.top"] = self.memory_top
+        return attributes
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+# Whether the profiles started tracemalloc, rather than the application.
+_tracing_started = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+class _Sampler:
+    """
+    The thread sampling stacks for every open profile, at the shortest
+    of their intervals. It stops when the last profile is detached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = set()
+        self._thread = None
+
+    def attach(self, profile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profiler", daemon=True
+                )
+                self._thread.start()
+
+    def detach(self, profile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            interval = min(profile.interval for profile in profiles)
+            slept = time.perf_counter()
+            time.sleep(interval)
+            started = time.perf_counter()
+            late = max(started - slept - interval, 0.0)
+
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = {
+                thread_id: collapse(frame, names.get(thread_id, "thread"))
+                for thread_id, frame in sys._current_frames().items()
+                if thread_id != me
+            }
+            # Under the lock, so a detached profile is no longer updated.
+            with self._lock:
+                for profile in self._profiles:
+                    if profile.thread_id is None:
+                        profile.stacks.update(stacks.values())
+                    elif profile.thread_id in stacks:
+                        profile.stacks[stacks[profile.thread_id]] += 1
+                    profile.samples += 1
+                    profile.gil_wait += late
+                overhead = time.perf_counter() - started
+                for profile in self._profiles:
+                    profile.overhead += overhead
+
+
+_sampler = _Sampler()
+
+
+def _export(profile, span, directory):
+    context = span.get_span_context()
+    path = os.path.join(
+        directory, f"{context.trace_id:032x}-{context.span_id:016x}.folded"
+    )
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(profile.folded())
+    return path
+
+
+@contextlib.contextmanager
+def profiling(enabled=None, interval=None, memory=None, output_dir=None):
+    """
+    Overrides the profiling settings (PROFILING_ENABLED, PROFILING_INTERVAL,
+    PROFILING_MEMORY, PROFILING_OUTPUT_DIR) for the work done in this
+    context, e.g. to profile one run.
+    """
+    options = {
+        "enabled": enabled,
+        "interval": interval,
+        "memory": memory,
+        "output_dir": output_dir,
+    }
+    current = _settings.get() or {}
+    token = _settings.set(
+        {
+            **current,
+            **{k: v for k, v in options.items() if v is not None},
+        }
+    )
+    try:
+        yield
+    finally:
+        _settings.reset(token)
+
+
+def _setting(name, default):
+    return (_settings.get() or {}).get(name, default)
+
+
+@contextlib.contextmanager
+def profile_span(span, all_threads=False):
+    """
+    Profiles the work done while ``span`` is open, if profiling is
+    enabled, and attaches the profile to the span. ``all_threads`` samples
+    every thread rather than only the current one.
+    """
+    if not _setting("enabled", PROFILING_ENABLED) or not span.is_recording():
+        yield None
+        return
+    profile = Profile(
+        _setting("interval", PROFILING_INTERVAL),
+        thread_id=None if all_threads else threading.get_ident(),
+        memory=_setting("memory", PROFILING_MEMORY),
+    ).start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        span.set_attributes(profile.attributes())
+        directory = _setting("output_dir", PROFILING_OUTPUT_DIR)
+        if directory:
+            path = _export(profile, span, directory)
+            span.set_attribute("profile.file", path)
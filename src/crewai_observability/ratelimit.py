@@ -0,0 +1,335 @@
+"""
+Quota-aware execution of Google API requests.
+
+Every request goes through the ``RequestExecutor`` of its API, which:
+
+* throttles it with a token bucket sized to the API's per-user quota, in
+  quota units (Gmail charges 5 units for a message list or get, Calendar
+  one per request), so the assistant stays under quota instead of
+  bouncing off it;
+* retries rate-limit (429, 403 ``rateLimitExceeded``) and server (5xx)
+  errors and transport failures, waiting for the server's Retry-After or
+  an exponential backoff with full jitter;
+* stops calling an API that keeps failing: after
+  GOOGLE_CIRCUIT_THRESHOLD consecutive server or transport failures the
+  circuit opens and requests fail fast with ``CircuitOpenError`` for
+  GOOGLE_CIRCUIT_RESET seconds, after which one trial request is let
+  through.
+
+Throttled requests, retries and the time spent waiting for either are
+exported as metrics.
+"""
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from .accounts import current_account
+from .telemetry import meter
+
+# Gmail allows 250 quota units per user per second; Calendar's default
+# per-user quota works out to about 10 requests per second.
+GMAIL_QUOTA_UNITS_PER_SECOND = float(
+    os.getenv("GMAIL_QUOTA_UNITS_PER_SECOND", "250")
+)
+CALENDAR_QUOTA_UNITS_PER_SECOND = float(
+    os.getenv("CALENDAR_QUOTA_UNITS_PER_SECOND", "10")
+)
+GOOGLE_MAX_RETRIES = int(os.getenv("GOOGLE_MAX_RETRIES", "5"))
+GOOGLE_BACKOFF_BASE = float(os.getenv("GOOGLE_BACKOFF_BASE", "0.5"))
+GOOGLE_BACKOFF_MAX = float(os.getenv("GOOGLE_BACKOFF_MAX", "32"))
+GOOGLE_CIRCUIT_THRESHOLD = int(os.getenv("GOOGLE_CIRCUIT_THRESHOLD", "5"))
+GOOGLE_CIRCUIT_RESET = float(os.getenv("GOOGLE_CIRCUIT_RESET", "30"))
+
+QUOTA_UNITS_PER_SECOND = {
+    "gmail": GMAIL_QUOTA_UNITS_PER_SECOND,
+    "calendar": CALENDAR_QUOTA_UNITS_PER_SECOND,
+}
+# Quota units charged per method; unlisted methods cost DEFAULT_UNITS.
+QUOTA_UNITS = {
+    "gmail.users.messages.list": 5,
+    "gmail.users.messages.get": 5,
+    "gmail.users.history.list": 2,
+    "gmail.users.getProfile": 1,
+}
+DEFAULT_UNITS = 1
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Retry reasons that mean "slow down" rather than "down".
+RATE_LIMITED = {"429", "403"}
+
+throttled_requests = meter.create_counter(
+    "assistant.google_api.throttled",
+    unit="{request}",
+    description="Requests delayed by the local quota throttle, by API.",
+)
+retried_requests = meter.create_counter(
+    "assistant.google_api.retries",
+    unit="{request}",
+    description="Requests retried, by API and reason.",
+)
+wait_time = meter.create_histogram(
+    "assistant.google_api.wait_time",
+    unit="s",
+    description="Time requests waited before being sent, by API and cause "
+    "(throttle or backoff).",
+)
+circuit_opened = meter.create_counter(
+    "assistant.google_api.circuit_opened",
+    unit="{event}",
+    description="Times an API's circuit breaker opened, by API.",
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an API whose circuit breaker is open."""
+
+
+def quota_units(method_id):
+    """Returns the quota units a request to ``method_id`` costs."""
+    return QUOTA_UNITS.get(method_id, DEFAULT_UNITS)
+
+
+def api_of(method_id):
+    """Returns the API a method ID such as ``gmail.users.get`` belongs to."""
+    return (method_id or "").split(".", 1)[0]
+
+
+class TokenBucket:
+    """
+    Hands out up to ``capacity`` units at once, refilled at ``rate`` units
+    per second.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, units):
+        """
+        Takes ``units`` and returns how long the caller must wait before
+        using them (0 if they were available).
+        """
+        # A request larger than the bucket waits for a full bucket.
+        units = min(units, self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate,
+            )
+            self._updated = now
+            self._tokens -= units
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """Fails fast after ``threshold`` consecutive failures."""
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._clock() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("circuit open")
+            if self._trial:
+                # Another request is already probing the API.
+                raise CircuitOpenError("circuit half-open")
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        """Counts a failure; returns True if it opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            reopened = self._trial
+            self._trial = False
+            if reopened or (
+                self._opened_at is None and self._failures >= self.threshold
+            ):
+                self._opened_at = self._clock()
+                return True
+            return False
+
+
+def retry_reason(exc):
+    """
+    Returns why ``exc`` is worth retrying (the HTTP status, or
+    ``transport``), or None if it is not.
+    """
+    if isinstance(exc, HttpError):
+        status = exc.resp.status
+        if status in RETRYABLE_STATUSES:
+            return str(status)
+        if status == 403 and _error_reasons(exc) & RATE_LIMIT_REASONS:
+            return "403"
+        return None
+    if isinstance(exc, (ConnectionError, socket.timeout, TimeoutError)):
+        return "transport"
+    return None
+
+
+def _error_reasons(exc):
+    try:
+        error = json.loads(exc.content)["error"]
+        return {item.get("reason") for item in error.get("errors", [])}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+
+def retry_after(exc):
+    """Returns the Retry-After delay of an HTTP error in seconds, if any."""
+    resp = getattr(exc, "resp", None)
+    value = resp.get("retry-after") if resp is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        # HTTP dates are not worth parsing for Google APIs.
+        return None
+
+
+class RequestExecutor:
+    """Throttles, retries and circuit-breaks the requests of one API."""
+
+    def __init__(
+        self,
+        api,
+        bucket=None,
+        breaker=None,
+        max_retries=GOOGLE_MAX_RETRIES,
+        backoff_base=GOOGLE_BACKOFF_BASE,
+        backoff_max=GOOGLE_BACKOFF_MAX,
+        sleep=time.sleep,
+        jitter=random.random,
+    ):
+        self.api = api
+        self.bucket = bucket
+        self.breaker = breaker or CircuitBreaker(
+            GOOGLE_CIRCUIT_THRESHOLD, GOOGLE_CIRCUIT_RESET
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._jitter = jitter
+
+    def throttle(self, units):
+        """Waits until ``units`` quota units may be spent."""
+        if self.bucket is None:
+            return
+        delay = self.bucket.reserve(units)
+        if delay > 0:
+            throttled_requests.add(1, {"api": self.api})
+            wait_time.record(delay, {"api": self.api, "cause": "throttle"})
+            self._sleep(delay)
+
+    def backoff(self, attempt, exc=None):
+        """
+        Returns the delay before retry number ``attempt`` (from 0): the
+        server's Retry-After if given, else a fully jittered exponential
+        backoff.
+        """
+        delay = retry_after(exc) if exc is not None else None
+        if delay is None:
+            ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+            delay = ceiling * self._jitter()
+        return delay
+
+    def wait_to_retry(self, attempt, reason, exc=None):
+        delay = self.backoff(attempt, exc)
+        retried_requests.add(1, {"api": self.api, "reason": reason})
+        wait_time.record(delay, {"api": self.api, "cause": "backoff"})
+        self._sleep(delay)
+
+    def execute(self, call, units=DEFAULT_UNITS):
+        """Runs ``call()`` under the API's quota, retrying failures."""
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self.throttle(units)
+            try:
+                result = call()
+            except Exception as exc:
+                reason = retry_reason(exc)
+                if reason is None:
+                    # The API answered; the request itself was wrong.
+                    self.breaker.record_success()
+                    raise
+                if reason in RATE_LIMITED:
+                    # The API is up and only asking us to slow down; that
+                    # also settles a half-open trial.
+                    self.breaker.record_success()
+                elif self.breaker.record_failure():
+                    # Retrying into an open circuit would only fail fast.
+                    circuit_opened.add(1, {"api": self.api})
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+                self.wait_to_retry(attempt, reason, exc)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(api):
+    """
+    Returns the process-wide request executor of ``api`` for the account
+    being served, as Google meters quota per user.
+    """
+    key = (current_account(), api)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            rate = QUOTA_UNITS_PER_SECOND.get(api)
+            executor = RequestExecutor(
+                api, bucket=TokenBucket(rate) if rate else None
+            )
+            _executors[key] = executor
+        return executor
+
+
+def reset_executors():
+    """Drops the executors, with their buckets and breakers."""
+    with _executors_lock:
+        _executors.clear()
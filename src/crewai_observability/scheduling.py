@@ -0,0 +1,150 @@
+"""
+Deterministic free-slot computation.
+
+Busy intervals from any number of calendars are merged with a single
+sorted sweep, padded with a buffer, and subtracted from the working-hour
+windows of the search range. Candidate slots are then picked from the
+remaining gaps, so the scheduling agent gets concrete options instead of
+having to derive them from raw busy lists.
+"""
+
+import datetime
+import heapq
+import os
+from zoneinfo import ZoneInfo
+
+from .intervals import subtract_intervals
+
+WORKING_HOURS_START = int(os.getenv("WORKING_HOURS_START", "9"))
+WORKING_HOURS_END = int(os.getenv("WORKING_HOURS_END", "17"))
+WORKING_DAYS = tuple(
+    int(day) for day in os.getenv("WORKING_DAYS", "0,1,2,3,4").split(",")
+)
+SCHEDULING_TIME_ZONE = os.getenv("SCHEDULING_TIME_ZONE", "UTC")
+MEETING_BUFFER_MINUTES = int(os.getenv("MEETING_BUFFER_MINUTES", "0"))
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "30"))
+SLOT_CANDIDATES = int(os.getenv("SLOT_CANDIDATES", "3"))
+
+
+def merge_busy(busy_by_calendar, buffer=0):
+    """
+    Merges the busy intervals of several calendars into one sorted list.
+
+    Each calendar's intervals are sorted on their own and combined with a
+    k-way heap merge, so the cost is O(n log k) for n intervals across k
+    calendars. ``buffer`` seconds are added on both sides of every block.
+    """
+    streams = [sorted(busy) for busy in busy_by_calendar.values()]
+    merged = []
+    for start, end in heapq.merge(*streams):
+        start, end = start - buffer, end + buffer
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_windows(
+    start,
+    end,
+    time_zone=SCHEDULING_TIME_ZONE,
+    hours=(WORKING_HOURS_START, WORKING_HOURS_END),
+    days=WORKING_DAYS,
+):
+    """
+    Returns the working-hour windows inside [start, end) as epoch seconds.
+
+    Windows are built per local calendar day in ``time_zone``, so daylight
+    saving transitions shift them correctly.
+    """
+    tz = ZoneInfo(time_zone)
+    day = datetime.datetime.fromtimestamp(start, tz).date()
+    last = datetime.datetime.fromtimestamp(end, tz).date()
+    windows = []
+    while day <= last:
+        if day.weekday() in days:
+            open_at = datetime.datetime.combine(
+                day, datetime.time(hours[0]), tzinfo=tz
+            )
+            close_at = datetime.datetime.combine(
+                day, datetime.time(0), tzinfo=tz
+            ) + datetime.timedelta(hours=hours[1])
+            window = (
+                max(int(open_at.timestamp()), start),
+                min(int(close_at.timestamp()), end),
+            )
+            if window[0] < window[1]:
+                windows.append(window)
+        day += datetime.timedelta(days=1)
+    return windows
+
+
+def _first_start(gap_start, step, tz):
+    # Aligned on the local wall clock: from the epoch, a 30-minute step
+    # would start slots at :15 and :45 in +05:45 zones.
+    offset = int(
+        datetime.datetime.fromtimestamp(gap_start, tz)
+        .utcoffset()
+        .total_seconds()
+    )
+    return -(-(gap_start + offset) // step) * step - offset
+
+
+def pick_slots(free, duration, step, count, time_zone=SCHEDULING_TIME_ZONE):
+    """
+    Picks up to ``count`` slots of ``duration`` seconds from merged free
+    gaps, with starts aligned to ``step`` seconds of local time in
+    ``time_zone``.
+
+    The earliest slot of each distinct gap is preferred, which spreads the
+    options across the range; remaining picks fall back to later,
+    non-overlapping starts within the gaps. Results are chronological.
+    """
+    tz = ZoneInfo(time_zone)
+    slots = []
+    for gap_start, gap_end in free:
+        slot_start = _first_start(gap_start, step, tz)
+        if slot_start + duration <= gap_end:
+            slots.append((slot_start, slot_start + duration))
+            if len(slots) == count:
+                return slots
+
+    chosen = set(slots)
+    for gap_start, gap_end in free:
+        slot_start = _first_start(gap_start, step, tz)
+        while slot_start + duration <= gap_end:
+            slot = (slot_start, slot_start + duration)
+            if slot not in chosen:
+                slots.append(slot)
+                chosen.add(slot)
+                if len(slots) == count:
+                    return sorted(slots)
+            slot_start = _first_start(slot_start + duration, step, tz)
+    return sorted(slots)
+
+
+def find_free_slots(
+    busy_by_calendar,
+    start,
+    end,
+    duration_minutes,
+    count=SLOT_CANDIDATES,
+    time_zone=SCHEDULING_TIME_ZONE,
+    hours=(WORKING_HOURS_START, WORKING_HOURS_END),
+    days=WORKING_DAYS,
+    buffer_minutes=MEETING_BUFFER_MINUTES,
+    step_minutes=SLOT_STEP_MINUTES,
+):
+    """
+    Returns up to ``count`` ``(start, end)`` slots of ``duration_minutes``
+    inside [start, end) that are free in every calendar and fall within
+    working hours.
+    """
+    busy = merge_busy(busy_by_calendar, buffer=buffer_minutes * 60)
+    windows = working_windows(start, end, time_zone, hours, days)
+    free = subtract_intervals(windows, busy)
+    return pick_slots(
+        free, duration_minutes * 60, step_minutes * 60, count, time_zone
+    )
@@ -0,0 +1,65 @@
+"""
+Small persistent key-value store for local state such as sync checkpoints.
+
+Values are stored as JSON in a single SQLite table, so the store survives
+restarts and can be shared by the threads of one process.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+STATE_DB_PATH = os.getenv("ASSISTANT_STATE_DB", ".assistant_state.db")
+
+
+class StateStore:
+    """A JSON key-value store backed by SQLite."""
+
+    def __init__(self, path=STATE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store():
+    """Returns the process-wide state store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore()
+        return _store
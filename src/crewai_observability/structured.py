@@ -0,0 +1,174 @@
+"""
+Structured, compact tool and task outputs.
+
+By default the Google tools answer in prose and every task hands the next
+one free text, which its agent has to read the data back out of. With
+STRUCTURED_OUTPUTS the tools return compact JSON instead: short keys,
+absent fields left out, and busy periods as minute offsets from the start
+of the searched range rather than pairs of timestamps. The tasks then
+declare Pydantic output models, so one task's answer is validated and
+passed on to the next as JSON, without asking the LLM to convert it.
+"""
+
+import json
+import os
+from typing import List, Optional, Tuple, get_args, get_origin
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+STRUCTURED_OUTPUTS = os.getenv("STRUCTURED_OUTPUTS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+class _Compact(BaseModel):
+    """A tool result, serialized with its short field aliases."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class InboxMessage(_Compact):
+    thread_id: Optional[str] = Field(None, alias="t")
+    subject: Optional[str] = Field(None, alias="s")
+    body: Optional[str] = Field(None, alias="b")
+    # Only set, with the message ID, when the message could not be
+    # fetched or parsed.
+    id: Optional[str] = None
+    error: Optional[str] = Field(None, alias="e")
+
+
+class InboxScan(_Compact):
+    messages: List[InboxMessage] = Field(alias="m")
+    # Set when the output budget stopped the scan early.
+    truncated: Optional[bool] = Field(None, alias="more")
+
+
+class Availability(_Compact):
+    start: str = Field(alias="t0")
+    duration: int = Field(alias="d")
+    # Merged busy periods, as minutes from ``start``.
+    busy: List[Tuple[int, int]] = Field(alias="b")
+    # Start times of the best free slots of ``duration`` minutes.
+    slots: List[str] = Field(alias="s")
+    unavailable: Optional[List[str]] = Field(None, alias="na")
+
+
+class Booking(_Compact):
+    id: str
+    status: str = Field(alias="st")
+    summary: Optional[str] = Field(None, alias="s")
+    link: Optional[str] = Field(None, alias="l")
+    # Busy periods a conflicting event overlaps, as start/end pairs.
+    busy: Optional[List[Tuple[str, str]]] = Field(None, alias="b")
+    error: Optional[str] = Field(None, alias="e")
+
+
+class Bookings(_Compact):
+    created: int = Field(alias="ok")
+    results: List[Booking] = Field(alias="r")
+
+
+class MeetingRequest(BaseModel):
+    thread_id: str
+    body: str
+
+
+class MeetingRequests(BaseModel):
+    requests: List[MeetingRequest]
+
+
+class ProposedSlots(BaseModel):
+    topic: str
+    attendees: List[str]
+    duration_minutes: int
+    slots: List[str]
+
+
+class ConfirmedSlot(BaseModel):
+    topic: str
+    attendees: List[str]
+    start: str
+    end: str
+
+
+class BookedEvent(BaseModel):
+    event_id: str
+    status: str
+    link: Optional[str] = None
+
+
+# Output models of the tasks, by task name.
+TASK_OUTPUTS = {
+    "scan_inbox_task": MeetingRequests,
+    "triage_message_task": MeetingRequests,
+    "find_slots_task": ProposedSlots,
+    "confirm_time_task": ConfirmedSlot,
+    "create_event_task": BookedEvent,
+}
+
+
+def encode(result):
+    """Serializes a result model as compact JSON."""
+    return result.model_dump_json(by_alias=True, exclude_none=True)
+
+
+def minutes_between(start, end):
+    """Returns the whole minutes from epoch second ``start`` to ``end``."""
+    return int(end - start) // 60
+
+
+def _shape(annotation):
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: _shape(field.annotation)
+            for name, field in annotation.model_fields.items()
+        }
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return [_shape(get_args(annotation)[0])]
+    if origin is not None:
+        # Optional[X]: describe X.
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return _shape(args[0])
+    return annotation.__name__
+
+
+def output_format(model):
+    """
+    Returns a one-line description of ``model``'s JSON, as in
+    ``{"slot":"str"}``, for the expected output of a task.
+    """
+    shape = json.dumps(_shape(model), separators=(",", ":"))
+    return f"Answer with JSON only: {shape}"
+
+
+def extract_json(text):
+    """
+    Returns the first JSON object or array in ``text``, which may be
+    surrounded by prose, or None if there is none.
+    """
+    text = str(text)
+    decoder = json.JSONDecoder()
+    for index, char in enumerate(text):
+        if char in "[{":
+            try:
+                return decoder.raw_decode(text, index)[0]
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def parse_output(model, text):
+    """
+    Returns ``text`` validated as ``model``, or None if it holds no JSON
+    object that fits.
+    """
+    data = extract_json(text)
+    if not isinstance(data, dict):
+        return None
+    try:
+        return model.model_validate(data)
+    except ValidationError:
+        return None
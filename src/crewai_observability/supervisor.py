@@ -0,0 +1,194 @@
+"""
+Serves many accounts from a pool of worker processes.
+
+Accounts are sharded across SUPERVISOR_SHARDS worker processes by a
+stable hash of the account, so an account is always served by the same
+shard and its OAuth token is only ever refreshed from one place. Each
+worker serves its accounts one after another in an
+``accounts.account_scope()``, which keeps the Google service objects, the
+scheduling pipeline and its crews, the LLM cache and the telemetry
+pipeline of the process warm from one account to the next; only
+credentials, transports, quota throttles and busy caches are per account.
+
+Each shard reports how many accounts and meeting requests it got through
+and how fast, which main.py prints once the shard finishes.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from opentelemetry import metrics, trace
+
+from .accounts import account_scope, get_credential_store
+from .telemetry import meter
+
+SUPERVISOR_SHARDS = int(
+    os.getenv("SUPERVISOR_SHARDS", str(min(4, os.cpu_count() or 1)))
+)
+
+shard_accounts = meter.create_counter(
+    "assistant.shard.accounts",
+    unit="{account}",
+    description="Accounts served by the shard workers, by shard and "
+    "outcome (ok or failed).",
+)
+account_duration = meter.create_histogram(
+    "assistant.shard.account_duration",
+    unit="s",
+    description="Time taken to serve one account, by shard.",
+)
+
+
+def shard_of(account, shards):
+    """Returns the shard serving ``account``; stable across processes."""
+    return zlib.crc32(account.encode("utf-8")) % shards
+
+
+def plan_shards(accounts, shards):
+    """Returns ``{shard: [account, ...]}`` for the non-empty shards."""
+    plan = {}
+    for account in accounts:
+        plan.setdefault(shard_of(account, shards), []).append(account)
+    return dict(sorted(plan.items()))
+
+
+class ShardReport:
+    """What one shard got through."""
+
+    def __init__(self, shard, accounts):
+        self.shard = shard
+        self.pid = os.getpid()
+        self.accounts = list(accounts)
+        self.processed = 0
+        self.failed = 0
+        self.requests = 0
+        # Error messages by account; exceptions may not survive pickling.
+        self.errors = {}
+        self.elapsed = 0.0
+
+    @property
+    def accounts_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def requests_per_second(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            "shard": self.shard,
+            "pid": self.pid,
+            "accounts": len(self.accounts),
+            "processed": self.processed,
+            "failed": self.failed,
+            "requests": self.requests,
+            "elapsed": self.elapsed,
+            "accounts_per_second": self.accounts_per_second,
+            "requests_per_second": self.requests_per_second,
+        }
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def process_account(account, **pipeline_options):
+    """
+    Triages the account's inbox and processes every meeting request
+    found, on the worker's one scheduling pipeline (set up with
+    ``pipeline_options`` on first use). Returns the number of requests
+    processed.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            from .pipeline import SchedulingPipeline
+
+            _pipeline = SchedulingPipeline(**pipeline_options)
+        pipeline = _pipeline
+    return sum(1 for _ in pipeline.kickoff())
+
+
+def _flush_telemetry():
+    # Worker processes may be torn down without running exit handlers.
+    providers = (trace.get_tracer_provider(), metrics.get_meter_provider())
+    for provider in providers:
+        flush = getattr(provider, "force_flush", None)
+        if flush is not None:
+            flush()
+
+
+def run_shard(shard, accounts, work=process_account):
+    """
+    Serves ``accounts`` one after another with ``work(account)``, which
+    returns the number of requests it processed. A failing account is
+    reported and does not stop the others.
+    """
+    report = ShardReport(shard, accounts)
+    started = time.perf_counter()
+    for account in accounts:
+        account_started = time.perf_counter()
+        try:
+            with account_scope(account):
+                report.requests += work(account) or 0
+        except Exception as exc:
+            report.failed += 1
+            report.errors[account] = f"{type(exc).__name__}: {exc}"
+            outcome = "failed"
+        else:
+            report.processed += 1
+            outcome = "ok"
+        shard_accounts.add(1, {"shard": shard, "outcome": outcome})
+        account_duration.record(
+            time.perf_counter() - account_started, {"shard": shard}
+        )
+    report.elapsed = time.perf_counter() - started
+    _flush_telemetry()
+    return report
+
+
+class Supervisor:
+    """Shards accounts across worker processes and collects reports."""
+
+    def __init__(
+        self,
+        accounts=None,
+        shards=SUPERVISOR_SHARDS,
+        work=process_account,
+        initializer=None,
+        store=None,
+    ):
+        if accounts is None:
+            accounts = (store or get_credential_store()).accounts()
+        self.accounts = list(accounts)
+        self.shards = max(1, shards)
+        # Both are sent to the workers, so they must be picklable.
+        self.work = work
+        self.initializer = initializer
+
+    def plan(self):
+        return plan_shards(self.accounts, self.shards)
+
+    def run(self):
+        """Serves every account, yielding shard reports as they finish."""
+        plan = self.plan()
+        if not plan:
+            return
+        # Workers are spawned rather than forked: the parent may hold
+        # locks, connections and exporter threads that a fork would copy
+        # in an unusable state.
+        with ProcessPoolExecutor(
+            max_workers=len(plan),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+        ) as pool:
+            futures = [
+                pool.submit(run_shard, shard, accounts, self.work)
+                for shard, accounts in plan.items()
+            ]
+            for future in as_completed(futures):
+                yield future.result()
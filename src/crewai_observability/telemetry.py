@@ -0,0 +1,52 @@
+"""
+OpenTelemetry instruments shared across the application.
+
+The meter and tracer are obtained through the OTel API, so they are no-ops
+until Traceloop.init() (or another SDK setup) installs real providers, and
+start recording as soon as it does.
+
+Spans are shipped to the collector by the batch span processor returned by
+``span_processor()``, whose queue and export schedule can be tuned with
+the TRACE_EXPORT_* settings.
+"""
+
+import os
+
+from opentelemetry import metrics, trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter,
+)
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+INSTRUMENTATION_NAME = "crewai_observability"
+
+# Spans buffered for export; once the queue is full, new spans are dropped
+# rather than slowing the application down.
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "2048"))
+TRACE_EXPORT_BATCH_SIZE = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "512"))
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "5"))
+TRACE_EXPORT_TIMEOUT = float(os.getenv("TRACE_EXPORT_TIMEOUT", "30"))
+
+meter = metrics.get_meter(INSTRUMENTATION_NAME)
+tracer = trace.get_tracer(INSTRUMENTATION_NAME)
+
+
+def span_processor(
+    exporter=None,
+    queue_size=TRACE_EXPORT_QUEUE_SIZE,
+    batch_size=TRACE_EXPORT_BATCH_SIZE,
+    interval=TRACE_EXPORT_INTERVAL,
+    timeout=TRACE_EXPORT_TIMEOUT,
+):
+    """
+    Returns a batch span processor that exports through ``exporter``, by
+    default OTLP over HTTP to OTEL_EXPORTER_OTLP_ENDPOINT, every
+    ``interval`` seconds or whenever ``batch_size`` spans are waiting.
+    """
+    return BatchSpanProcessor(
+        exporter or OTLPSpanExporter(),
+        max_queue_size=queue_size,
+        schedule_delay_millis=interval * 1000,
+        max_export_batch_size=min(batch_size, queue_size),
+        export_timeout_millis=timeout * 1000,
+    )
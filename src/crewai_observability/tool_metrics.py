@@ -0,0 +1,173 @@
+"""
+Request, error and duration (RED) metrics for the agent tools and the
+Google API calls they make.
+
+Every tool invocation runs inside a ``ToolCall``, which times it, counts
+it and its failures by tool name, and accumulates the work it did: result
+pages read, messages fetched and message body bytes decoded. Those
+amounts are recorded as per-invocation histograms and as attributes of
+the invocation's span, where unbounded values are harmless; the metric
+attributes stay low-cardinality (tool name, API method, error type).
+
+Google API round trips are recorded separately by ``api_call()``, by API
+method (e.g. ``gmail.users.messages.list``) and by the tool that made
+them.
+"""
+
+import contextlib
+import contextvars
+import functools
+import time
+
+from .profiling import profile_span
+from .telemetry import meter, tracer
+
+# Bucket boundaries of the duration histograms, in seconds: the SDK's
+# default boundaries are scaled for milliseconds.
+DURATION_BUCKETS = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+tool_requests = meter.create_counter(
+    "assistant.tool.requests",
+    unit="{request}",
+    description="Agent tool invocations, by tool.",
+)
+tool_errors = meter.create_counter(
+    "assistant.tool.errors",
+    unit="{error}",
+    description="Agent tool invocations that raised, by tool and error.",
+)
+tool_duration = meter.create_histogram(
+    "assistant.tool.duration",
+    unit="s",
+    description="Duration of agent tool invocations, by tool.",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+tool_pages = meter.create_histogram(
+    "assistant.tool.pages",
+    unit="{page}",
+    description="API result pages read per tool invocation.",
+)
+tool_messages = meter.create_histogram(
+    "assistant.tool.messages",
+    unit="{message}",
+    description="Gmail messages fetched per tool invocation.",
+)
+tool_bytes_decoded = meter.create_histogram(
+    "assistant.tool.bytes_decoded",
+    unit="By",
+    description="Message body bytes decoded per tool invocation.",
+)
+api_requests = meter.create_counter(
+    "assistant.google_api.requests",
+    unit="{request}",
+    description="Google API requests, by API method and tool.",
+)
+api_errors = meter.create_counter(
+    "assistant.google_api.errors",
+    unit="{error}",
+    description="Failed Google API requests, by API method, tool and error.",
+)
+api_duration = meter.create_histogram(
+    "assistant.google_api.duration",
+    unit="s",
+    description="Duration of Google API requests, by API method and tool.",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+
+_current = contextvars.ContextVar("tool_call", default=None)
+
+
+class ToolCall:
+    """The work done by one tool invocation."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.pages = 0
+        self.messages = 0
+        self.bytes_decoded = 0
+        self.api_methods = set()
+
+    def add(self, pages=0, messages=0, bytes_decoded=0):
+        self.pages += pages
+        self.messages += messages
+        self.bytes_decoded += bytes_decoded
+
+
+def current_call():
+    """
+    Returns the invocation running in this context. Outside of a tool, the
+    returned call is not recorded anywhere.
+    """
+    call = _current.get()
+    return call if call is not None else ToolCall(None)
+
+
+def _error_type(exc):
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    return str(status) if status else type(exc).__name__
+
+
+def instrumented(tool):
+    """Decorates a tool function to record its metrics and span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = ToolCall(tool)
+            token = _current.set(call)
+            attributes = {"tool": tool}
+            started = time.perf_counter()
+            with tracer.start_as_current_span(f"tool {tool}") as span:
+                try:
+                    with profile_span(span):
+                        return func(*args, **kwargs)
+                except Exception as exc:
+                    tool_errors.add(
+                        1, {**attributes, "error.type": _error_type(exc)}
+                    )
+                    raise
+                finally:
+                    _current.reset(token)
+                    tool_requests.add(1, attributes)
+                    tool_duration.record(
+                        time.perf_counter() - started, attributes
+                    )
+                    tool_pages.record(call.pages, attributes)
+                    tool_messages.record(call.messages, attributes)
+                    tool_bytes_decoded.record(call.bytes_decoded, attributes)
+                    span.set_attributes(
+                        {
+                            "tool.pages": call.pages,
+                            "tool.messages": call.messages,
+                            "tool.bytes_decoded": call.bytes_decoded,
+                            "tool.api_methods": sorted(call.api_methods),
+                        }
+                    )
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def api_call(api_method, call=None):
+    """
+    Records one Google API round trip made on behalf of ``call`` (by
+    default the current tool invocation).
+    """
+    call = call if call is not None else current_call()
+    call.api_methods.add(api_method)
+    attributes = {"api_method": api_method}
+    if call.tool is not None:
+        attributes["tool"] = call.tool
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        api_errors.add(1, {**attributes, "error.type": _error_type(exc)})
+        raise
+    finally:
+        api_requests.add(1, attributes)
+        api_duration.record(time.perf_counter() - started, attributes)
@@ -1,111 +1,774 @@
-from crewai_tools import tool
+import contextvars
+import functools
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
 
-from googleapiclient.discovery import build
-from ..auth import get_google_credentials
+from googleapiclient.errors import HttpError
 
+from ..accounts import account_key
+from ..approvals import APPROVAL_MODE, get_approval_broker
+from ..calendar_cache import get_busy_cache
+from ..checkpoints import idempotency_key
+from ..clients import get_http, get_service
+from ..intervals import (
+    clip_intervals,
+    event_interval,
+    merge_intervals,
+    to_epoch,
+    to_rfc3339,
+)
+from ..message_index import (
+    MESSAGE_INDEX_ENABLED,
+    ScanDedupe,
+    content_digest,
+    get_message_index,
+)
+from ..mime import extract_body
+from ..prefetch import await_prefetch
+from ..prefilter import keep_message
+from ..ratelimit import get_executor, quota_units, retry_reason
+from ..scheduling import find_free_slots, merge_busy
+from ..state import get_state_store
+from ..structured import (
+    STRUCTURED_OUTPUTS,
+    Availability,
+    Booking,
+    Bookings,
+    InboxMessage,
+    InboxScan,
+    encode,
+    minutes_between,
+)
+from ..tool_metrics import api_call, current_call, instrumented
 
-@tool("Gmail Reader Tool")
-def gmail_reader_tool(query: str) -> str:
-    """Reads and searches for emails in a user's Gmail inbox."""
-    creds = get_google_credentials()
-    service = build("gmail", "v1", credentials=creds)
+# Gmail accepts up to 100 calls per batch, but recommends staying at or
+# below 50 to avoid per-user rate limiting.
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+GMAIL_MAX_CONCURRENCY = int(os.getenv("GMAIL_MAX_CONCURRENCY", "4"))
+GMAIL_PAGE_SIZE = int(os.getenv("GMAIL_PAGE_SIZE", "100"))
+GMAIL_MAX_MESSAGES = int(os.getenv("GMAIL_MAX_MESSAGES", "500"))
 
-    # Search for messages matching the query
-    result = service.users().messages().list(userId="me", q=query).execute()
-    messages = result.get("messages", [])
+# In incremental mode only messages added since the last stored Gmail
+# historyId are read; the query is only used for the very first scan.
+GMAIL_INCREMENTAL_SYNC = os.getenv(
+    "GMAIL_INCREMENTAL_SYNC", "false"
+).lower() in ("1", "true", "yes")
+GMAIL_HISTORY_KEY = "gmail.history_id"
+# Messages an incremental scan listed but left unread because of the
+# output budget; the next scan reads them first.
+GMAIL_PENDING_KEY = "gmail.pending_ids"
 
-    if not messages:
-        return "No messages found."
+# Budgets for the text handed to the agent: per message body, and for
+# the whole tool output.
+GMAIL_MAX_BODY_BYTES = int(os.getenv("GMAIL_MAX_BODY_BYTES", "4000"))
+GMAIL_MAX_OUTPUT_BYTES = int(os.getenv("GMAIL_MAX_OUTPUT_BYTES", "60000"))
+# Nesting depth of multipart parts requested from Gmail; partial
+# responses cannot express recursion, so the field mask is unrolled.
+GMAIL_MIME_DEPTH = 4
 
-    # Fetch and combine the content of the messages
-    email_content = []
-    for msg in messages:
-        txt = (
-            service.users().messages().get(userId="me", id=msg["id"]).execute()
+# Calendar accepts up to 1000 calls per batch; smaller batches keep a
+# single failure or throttle from holding up every booking.
+CALENDAR_BATCH_SIZE = int(os.getenv("CALENDAR_BATCH_SIZE", "50"))
+# Refuse to book over busy intervals already in the busy cache.
+CALENDAR_CONFLICT_CHECK = os.getenv(
+    "CALENDAR_CONFLICT_CHECK", "true"
+).lower() in ("1", "true", "yes")
+
+
+def _part_fields(depth):
+    fields = "mimeType,filename,body/data"
+    if depth:
+        fields += f",parts({_part_fields(depth - 1)})"
+    return fields
+
+
+# Partial response covering only what _format_message() parses, plus the
+# arrival time used to measure processing lag.
+GMAIL_MESSAGE_FIELDS = (
+    "id,threadId,internalDate,"
+    f"payload(headers(name,value),{_part_fields(GMAIL_MIME_DEPTH)})"
+)
+
+
+# Agent tools by module attribute name: (tool name, instrumented function).
+_AGENT_TOOLS = {}
+_agent_tools_lock = threading.Lock()
+
+
+def agent_tool(name):
+    """
+    Registers ``_<attribute>`` as the crewAI tool ``name``, published as
+    the module attribute ``<attribute>``. crewai_tools takes seconds to
+    import, so the tool objects are only built the first time one is
+    accessed, which keeps the helpers in this module cheap to import.
+    """
+
+    def register(func):
+        _AGENT_TOOLS[func.__name__.lstrip("_")] = (
+            name,
+            instrumented(name)(func),
+        )
+        return func
+
+    return register
+
+
+def iter_message_ids(
+    service, query, page_size=GMAIL_PAGE_SIZE, max_results=None
+):
+    """
+    Yields the IDs of messages matching ``query``.
+
+    Result pages are requested lazily by following ``nextPageToken``, so a
+    consumer that stops early never pays for the pages it did not read.
+    """
+    page_token = None
+    yielded = 0
+    while True:
+        response = (
+            service.users()
+            .messages()
+            .list(
+                userId="me",
+                q=query,
+                maxResults=page_size,
+                pageToken=page_token,
+                fields="messages(id),nextPageToken",
+            )
+            .execute()
+        )
+        current_call().add(pages=1)
+        for msg in response.get("messages", []):
+            if max_results is not None and yielded >= max_results:
+                return
+            yield msg["id"]
+            yielded += 1
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def list_history_message_ids(service, start_history_id):
+    """
+    Returns the IDs of inbox messages added since ``start_history_id``,
+    together with the mailbox's current historyId.
+
+    Raises HttpError with status 404 if the start ID is too old for Gmail
+    to replay.
+    """
+    message_ids = []
+    seen = set()
+    history_id = start_history_id
+    page_token = None
+    while True:
+        response = (
+            service.users()
+            .history()
+            .list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes="messageAdded",
+                labelId="INBOX",
+                pageToken=page_token,
+            )
+            .execute()
+        )
+        current_call().add(pages=1)
+        for record in response.get("history", []):
+            for added in record.get("messagesAdded", []):
+                message_id = added["message"]["id"]
+                if message_id not in seen:
+                    seen.add(message_id)
+                    message_ids.append(message_id)
+        history_id = response.get("historyId", history_id)
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return message_ids, history_id
+
+
+def _scan_message_ids(service, query):
+    """
+    Chooses the messages to read and the history checkpoint to store once
+    they have been read (None when not syncing incrementally). Messages a
+    previous incremental scan left unread come first.
+    """
+    if not GMAIL_INCREMENTAL_SYNC:
+        return (
+            iter_message_ids(service, query, max_results=GMAIL_MAX_MESSAGES),
+            None,
         )
+
+    store = get_state_store()
+    pending = store.get(account_key(GMAIL_PENDING_KEY)) or []
+
+    def _after_pending(message_ids):
+        yield from pending
+        yield from (m for m in message_ids if m not in pending)
+
+    start_history_id = store.get(account_key(GMAIL_HISTORY_KEY))
+    if start_history_id:
         try:
-            payload = txt["payload"]
-            headers = payload["headers"]
-            subject = next(
-                h["value"] for h in headers if h["name"] == "Subject"
+            message_ids, history_id = list_history_message_ids(
+                service, start_history_id
             )
+            return _after_pending(message_ids), history_id
+        except HttpError as exc:
+            if exc.resp.status != 404:
+                raise
+            # The checkpoint expired; fall through to a full rescan.
+
+    # Take the checkpoint before scanning so nothing arriving during the
+    # scan is missed by the next incremental run.
+    profile = service.users().getProfile(userId="me").execute()
+    return (
+        _after_pending(
+            iter_message_ids(service, query, max_results=GMAIL_MAX_MESSAGES)
+        ),
+        profile["historyId"],
+    )
+
+
+def execute_batched(
+    service,
+    requests,
+    http_factory,
+    batch_size,
+    max_concurrency=1,
+    executor=None,
+    api_method=None,
+):
+    """
+    Sends the requests built by the ``requests`` callables (a dict keyed
+    by request ID) as batch requests and returns a dict mapping each
+    request ID to ``(response, exception)``.
+
+    The IDs are split into batches of ``batch_size`` and up to
+    ``max_concurrency`` batches are sent at a time. httplib2 is not
+    thread-safe, so each batch is executed on the transport returned by
+    ``http_factory`` in the thread that sends it. Each call in a batch is
+    charged to the quota of ``executor`` as one ``api_method`` call, and
+    calls rate-limited inside a batch are sent again after a backoff.
+    """
+    executor = executor or get_executor(api_method.split(".", 1)[0])
+    units = quota_units(api_method)
+    batch_method = api_method.split(".", 1)[0] + ".batch"
+    results = {}
+    retryable = {}
+    # Batches may run on pool threads, outside the tool's context.
+    call = current_call()
 
-            parts = payload.get("parts", [])
-            body = ""
-            if parts:
-                # Find the plain text part
-                part = next(
-                    (p for p in parts if p["mimeType"] == "text/plain"),
-                    None,
-                )
-                if part:
-                    import base64
-
-                    data = part["body"]["data"]
-                    body = base64.urlsafe_b64decode(data).decode("utf-8")
-
-            email_content.append(f"Subject: {subject}\nBody: {body}\n---")
-        except (KeyError, StopIteration):
-            # Handle cases where email format is unexpected
-            email_content.append(
-                f"Could not parse email with ID: {msg['id']}\n---"
+    def _callback(request_id, response, exception):
+        results[request_id] = (response, exception)
+        if exception is not None and retry_reason(exception):
+            retryable[request_id] = exception
+
+    def _execute(ids):
+        batch = service.new_batch_http_request(callback=_callback)
+        for request_id in ids:
+            batch.add(requests[request_id](), request_id=request_id)
+        with api_call(batch_method, call):
+            executor.execute(
+                lambda: batch.execute(http=http_factory()),
+                units=units * len(ids),
             )
 
+    pending = list(requests)
+    attempt = 0
+    while pending:
+        chunks = [
+            pending[start:start + batch_size]
+            for start in range(0, len(pending), batch_size)
+        ]
+        retryable.clear()
+        if len(chunks) <= 1 or max_concurrency <= 1:
+            for chunk in chunks:
+                _execute(chunk)
+        else:
+            workers = min(max_concurrency, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Batches run in the caller's context, and so for its
+                # account.
+                futures = [
+                    pool.submit(contextvars.copy_context().run, _execute, c)
+                    for c in chunks
+                ]
+                # result() propagates transport errors raised by any batch.
+                for future in futures:
+                    future.result()
+        if not retryable or attempt >= executor.max_retries:
+            break
+        exc = next(iter(retryable.values()))
+        executor.wait_to_retry(attempt, retry_reason(exc), exc)
+        pending = [i for i in pending if i in retryable]
+        attempt += 1
+    return results
+
+
+def fetch_messages(
+    service,
+    message_ids,
+    http_factory,
+    batch_size=GMAIL_BATCH_SIZE,
+    max_concurrency=GMAIL_MAX_CONCURRENCY,
+    executor=None,
+):
+    """
+    Fetches Gmail messages through batch requests (see
+    ``execute_batched()``), charged to the Gmail quota of ``executor``
+    (by default the shared one). Returns a dict mapping message ID to the
+    message resource, or to None if that message could not be fetched.
+    """
+    messages = service.users().messages()
+    requests = {
+        message_id: functools.partial(
+            messages.get,
+            userId="me",
+            id=message_id,
+            format="full",
+            fields=GMAIL_MESSAGE_FIELDS,
+        )
+        for message_id in message_ids
+    }
+    results = execute_batched(
+        service,
+        requests,
+        http_factory,
+        batch_size,
+        max_concurrency,
+        executor,
+        api_method="gmail.users.messages.get",
+    )
+    fetched = {
+        message_id: response if exception is None else None
+        for message_id, (response, exception) in results.items()
+    }
+    current_call().add(
+        messages=sum(1 for m in fetched.values() if m is not None)
+    )
+    return fetched
+
+
+def _parse_message(message):
+    """
+    Returns the lower-cased headers, subject and cleaned, size-capped text
+    body of a fetched Gmail message.
+    """
+    payload = message["payload"]
+    headers = {h["name"].lower(): h["value"] for h in payload["headers"]}
+    subject = headers["subject"]
+    body = extract_body(payload, GMAIL_MAX_BODY_BYTES)
+    return headers, subject, body
+
+
+def _read_message(message):
+    """
+    Returns ``_parse_message(message)``, or None if the message cannot be
+    parsed (an unexpected format, or a failed fetch).
+    """
+    try:
+        return _parse_message(message)
+    except (KeyError, TypeError):
+        return None
+
+
+def _format_parsed(message_id, parsed):
+    """Renders a message read by _read_message() as agent text."""
+    if parsed is None:
+        return f"Could not parse email with ID: {message_id}\n---"
+    _, subject, body = parsed
+    return f"Subject: {subject}\nBody: {body}\n---"
+
+
+def _format_message(message_id, message):
+    """Renders a fetched Gmail message as the text handed to the agent."""
+    return _format_parsed(message_id, _read_message(message))
+
+
+def _message_entry(message_id, message, parsed):
+    """
+    Returns a fetched Gmail message, read by _read_message(), as a
+    structured inbox entry.
+    """
+    if parsed is None:
+        return InboxMessage(id=message_id, error="unreadable")
+    _, subject, body = parsed
+    return InboxMessage(
+        thread_id=message.get("threadId", message_id),
+        subject=subject,
+        # Line breaks cost two characters each once escaped in JSON.
+        body=" ".join(body.split()),
+    )
+
+
+def _message_identity(message, parsed):
+    """
+    Returns the ``(thread_id, received_at, content digest)`` the message
+    index knows a fetched message by, or None if it cannot be parsed.
+    """
+    if parsed is None or "threadId" not in message:
+        return None
+    headers, subject, body = parsed
+    return (
+        message["threadId"],
+        int(message.get("internalDate", 0)),
+        content_digest(headers, subject, body),
+    )
+
+
+def _parsed_candidate(parsed):
+    """Like is_triage_candidate(), for a message read by _read_message()."""
+    if parsed is None:
+        return True
+    return keep_message(*parsed)
+
+
+def is_triage_candidate(message):
+    """
+    Returns whether the pre-filter passes a fetched message on to triage.
+    Messages that cannot be parsed are kept so the agent still sees them.
+    """
+    return _parsed_candidate(_read_message(message))
+
+
+@agent_tool("Gmail Reader Tool")
+def _gmail_reader_tool(query: str) -> str:
+    """Reads and searches for emails in a user's Gmail inbox."""
+    service = get_service("gmail", "v1")
+    message_ids, history_id = _scan_message_ids(service, query)
+
+    dedupe = ScanDedupe(get_message_index()) if MESSAGE_INDEX_ENABLED else None
+    if dedupe is not None:
+        message_ids = dedupe.unseen(message_ids)
+
+    # Fetch messages a few batches at a time as result pages stream in
+    message_ids = iter(message_ids)
+    chunk_size = GMAIL_BATCH_SIZE * GMAIL_MAX_CONCURRENCY
+    email_content = []
+    sizes = []
+    output_bytes = 0
+    truncated = False
+    unread = []
+    while not truncated and (
+        chunk := list(itertools.islice(message_ids, chunk_size))
+    ):
+        fetched = fetch_messages(
+            service,
+            chunk,
+            http_factory=get_http,
+            batch_size=GMAIL_BATCH_SIZE,
+            max_concurrency=GMAIL_MAX_CONCURRENCY,
+        )
+        for position, message_id in enumerate(chunk):
+            message = fetched.get(message_id)
+            # Parsed once for the pre-filter, the output and the index.
+            parsed = _read_message(message)
+            if not _parsed_candidate(parsed):
+                if dedupe is not None:
+                    received_at = int(message.get("internalDate", 0))
+                    dedupe.drop(message_id, received_at)
+                continue
+            if STRUCTURED_OUTPUTS:
+                entry = _message_entry(message_id, message, parsed)
+                text = encode(entry)
+            else:
+                entry = text = _format_parsed(message_id, parsed)
+            size = len(text.encode("utf-8")) + 1
+            slot = len(email_content)
+            identity = dedupe and _message_identity(message, parsed)
+            if identity:
+                slot = dedupe.slot(message_id, identity, size, slot)
+                if slot is None:
+                    continue
+            replaced = sizes[slot] if slot < len(sizes) else 0
+            output_bytes += size - replaced
+            if email_content and output_bytes > GMAIL_MAX_OUTPUT_BYTES:
+                # Stop reading; later messages would not fit anyway.
+                truncated = True
+                unread = chunk[position:]
+                break
+            if slot < len(email_content):
+                # The newest message of a thread stands for all of it.
+                email_content[slot], sizes[slot] = entry, size
+            else:
+                email_content.append(entry)
+                sizes.append(size)
+            if identity:
+                dedupe.keep(message_id, identity, size, slot)
+
+    if dedupe is not None:
+        dedupe.handed_on()
+    if history_id is not None:
+        # The checkpoint moves past every listed message, so the ones the
+        # budget cut off are kept for the next scan.
+        unread += list(message_ids)
+        store = get_state_store()
+        store.set(account_key(GMAIL_PENDING_KEY), unread)
+        store.set(account_key(GMAIL_HISTORY_KEY), history_id)
+
+    if STRUCTURED_OUTPUTS:
+        return encode(
+            InboxScan(messages=email_content, truncated=truncated or None)
+        )
+
+    if not email_content:
+        return "No messages found."
+
+    if truncated:
+        email_content.append(
+            "[Output limit reached; further messages were not read.]"
+        )
     return "\n".join(email_content)
 
 
-@tool("Google Calendar Search Tool")
-def google_calendar_search_tool(start_time: str, end_time: str) -> str:
-    """Finds available time slots in a user's Google Calendar."""
-    creds = get_google_credentials()
-    service = build("calendar", "v3", credentials=creds)
+def _format_slots(slots, duration_minutes):
+    if not slots:
+        return (
+            f"No {duration_minutes}-minute slot is free within working "
+            "hours in this range."
+        )
+    lines = "\n".join(
+        f"- {to_rfc3339(start)} to {to_rfc3339(end)}" for start, end in slots
+    )
+    return f"Available {duration_minutes}-minute slots:\n{lines}"
 
-    body = {
-        "timeMin": start_time,
-        "timeMax": end_time,
-        "items": [{"id": "primary"}],
-    }
 
-    events_result = service.freebusy().query(body=body).execute()
-    calendars = events_result.get("calendars", {})
-    primary_calendar = calendars.get("primary", {})
-    busy_times = primary_calendar.get("busy", [])
+@agent_tool("Google Calendar Search Tool")
+def _google_calendar_search_tool(
+    start_time: str,
+    end_time: str,
+    duration_minutes: int = 30,
+    attendees: list = None,
+) -> str:
+    """
+    Finds available time slots in a user's Google Calendar. Returns the busy
+    periods between start_time and end_time (ISO 8601) and the best free
+    slots of duration_minutes within working hours. Pass the attendees'
+    email addresses to find slots that are free for everyone.
+    """
+    service = get_service("calendar", "v3")
+    start, end = to_epoch(start_time), to_epoch(end_time)
+    calendar_ids = ["primary"] + [
+        attendee for attendee in attendees or [] if attendee != "primary"
+    ]
+
+    # Served from the local interval cache where the window is covered,
+    # including what the run's prefetch read while triage was running
+    await_prefetch(calendar_ids, start, end)
+    busy_by_calendar = get_busy_cache().busy(
+        service, calendar_ids, start, end
+    )
+    busy_times = merge_busy(busy_by_calendar)
+    free = find_free_slots(busy_by_calendar, start, end, duration_minutes)
+    unavailable = [c for c in calendar_ids if c not in busy_by_calendar]
+
+    if STRUCTURED_OUTPUTS:
+        return encode(
+            Availability(
+                start=to_rfc3339(start),
+                duration=duration_minutes,
+                busy=[
+                    (minutes_between(start, s), minutes_between(start, e))
+                    for s, e in busy_times
+                ],
+                slots=[to_rfc3339(s) for s, _ in free],
+                unavailable=unavailable or None,
+            )
+        )
+
+    slots = _format_slots(free, duration_minutes)
+    if unavailable:
+        slots += (
+            "\nAvailability could not be read for: "
+            + ", ".join(unavailable)
+        )
 
     if not busy_times:
         return (
             f"The calendar is completely free between {start_time} "
-            f"and {end_time}."
+            f"and {end_time}.\n{slots}"
         )
 
-    # For simplicity, this tool will just return the busy times.
-    # A more advanced implementation would calculate the free slots.
     busy_slots_str = "\n".join(
-        [f"- From {slot['start']} to {slot['end']}" for slot in busy_times]
+        [
+            f"- From {to_rfc3339(start)} to {to_rfc3339(end)}"
+            for start, end in busy_times
+        ]
     )
-    return f"The following time slots are busy:\n{busy_slots_str}"
+    return f"The following time slots are busy:\n{busy_slots_str}\n{slots}"
+
+
+def create_events(
+    service,
+    events,
+    calendar_id="primary",
+    http_factory=None,
+    batch_size=CALENDAR_BATCH_SIZE,
+    conflict_check=CALENDAR_CONFLICT_CHECK,
+    executor=None,
+):
+    """
+    Creates ``events`` on a calendar through batch requests and returns
+    one result per event, in order: a dict with the event ``id`` and a
+    ``status`` of ``created``, ``exists``, ``conflict`` or ``failed``,
+    plus the ``event`` created, the conflicting ``busy`` intervals or the
+    ``error``.
+
+    Every event gets an idempotency key as its ID, so events that already
+    exist, in the calendar or earlier in the list, are not created twice.
+    Events overlapping busy intervals already known to the busy cache, or
+    an earlier event in the list, are not sent at all.
+    """
+    cache = get_busy_cache()
+    # Building a resource parses its discovery schema; do it once.
+    insert = service.events().insert
+    results = []
+    requests = {}
+    booked = []
+    for event in events:
+        # A client-chosen event ID makes the insert idempotent: booking
+        # the same meeting again, e.g. from a resumed run, conflicts
+        # instead of creating a duplicate.
+        event = {**event}
+        event.setdefault("id", idempotency_key(event))
+        result = {"id": event["id"], "event": event}
+        results.append(result)
+        known = cache.has_event(calendar_id, event["id"])
+        if known or event["id"] in requests:
+            result["status"] = "exists"
+            continue
+        if (
+            conflict_check
+            and "start" in event
+            and event.get("transparency") != "transparent"
+        ):
+            interval = event_interval(event)
+            busy = merge_intervals(
+                cache.conflicts(calendar_id, interval)
+                + clip_intervals(merge_intervals(booked), *interval)
+            )
+            if busy:
+                result.update(status="conflict", busy=busy)
+                continue
+            booked.append(interval)
+        requests[event["id"]] = functools.partial(
+            insert, calendarId=calendar_id, body=event
+        )
+
+    if len(requests) == 1:
+        # A batch of one would only add overhead.
+        [(event_id, request)] = requests.items()
+        try:
+            responses = {event_id: (request().execute(), None)}
+        except HttpError as exc:
+            responses = {event_id: (None, exc)}
+    elif requests:
+        responses = execute_batched(
+            service,
+            requests,
+            http_factory or get_http,
+            batch_size,
+            executor=executor,
+            api_method="calendar.events.insert",
+        )
+    else:
+        responses = {}
+
+    for result in results:
+        if "status" in result:
+            continue
+        response, exc = responses[result["id"]]
+        if exc is None:
+            event = {**result["event"], **response}
+            result.update(status="created", id=event["id"], event=event)
+            # Keep cached availability in step with the booking
+            cache.record_event(calendar_id, event)
+        elif isinstance(exc, HttpError) and exc.resp.status == 409:
+            result["status"] = "exists"
+        else:
+            result.update(status="failed", error=exc)
+    return results
 
 
-@tool("Google Calendar Writer Tool")
-def google_calendar_writer_tool(event_details: dict) -> str:
-    """Creates a new event in the user's Google Calendar."""
-    creds = get_google_credentials()
-    service = build("calendar", "v3", credentials=creds)
+def _format_booking(result):
+    status = result["status"]
+    if status == "created":
+        return f"Event created successfully. Event ID: {result['id']}"
+    if status == "exists":
+        return f"Event already exists. Event ID: {result['id']}"
+    if status == "conflict":
+        busy = ", ".join(
+            f"{to_rfc3339(start)} to {to_rfc3339(end)}"
+            for start, end in result["busy"]
+        )
+        return f"Event not created, the calendar is busy from {busy}."
+    return f"Event could not be created: {result['error']}"
+
 
-    event = (
-        service.events()
-        .insert(calendarId="primary", body=event_details)
-        .execute()
+def _booking_entry(result, summary=None):
+    return Booking(
+        id=result["id"],
+        status=result["status"],
+        summary=summary,
+        link=result["event"].get("htmlLink"),
+        busy=[
+            (to_rfc3339(start), to_rfc3339(end))
+            for start, end in result.get("busy", ())
+        ]
+        or None,
+        error=str(result["error"]) if "error" in result else None,
     )
 
-    return f"Event created successfully. Event ID: {event.get('id')}"
 
+@agent_tool("Google Calendar Writer Tool")
+def _google_calendar_writer_tool(
+    event_details: Union[dict, List[dict]],
+) -> str:
+    """
+    Creates a new event in the user's Google Calendar, or several at once
+    when given a list of events.
+    """
+    service = get_service("calendar", "v3")
+    if isinstance(event_details, dict):
+        [result] = create_events(service, [event_details])
+        if result["status"] == "failed":
+            raise result["error"]
+        if STRUCTURED_OUTPUTS:
+            return encode(_booking_entry(result))
+        return _format_booking(result)
 
-@tool("Human Approval Tool")
-def human_approval_tool(proposed_slots: list) -> str:
+    results = create_events(service, event_details)
+    created = sum(1 for result in results if result["status"] == "created")
+    if STRUCTURED_OUTPUTS:
+        return encode(
+            Bookings(
+                created=created,
+                results=[
+                    _booking_entry(result, result["event"].get("summary"))
+                    for result in results
+                ],
+            )
+        )
+    lines = "\n".join(
+        f"{i}. {result['event'].get('summary', 'Event')}: "
+        f"{_format_booking(result)}"
+        for i, result in enumerate(results, 1)
+    )
+    return f"Created {created} of {len(results)} events:\n{lines}"
+
+
+@agent_tool("Human Approval Tool")
+def _human_approval_tool(proposed_slots: list) -> str:
     """
     Presents a list of proposed time slots to the user and waits for their
     selection. This is the human-in-the-loop interface.
     """
+    if APPROVAL_MODE == "broker":
+        # Park only this workflow until the approval API is answered
+        return get_approval_broker().request(proposed_slots)
+
     print("Please review the following proposed meeting times:")
     for i, slot in enumerate(proposed_slots):
         print(f"{i+1}. {slot}")
@@ -120,3 +783,19 @@ def human_approval_tool(proposed_slots: list) -> str:
                 print("Invalid selection. Please try again.")
         except ValueError:
             print("Please enter a valid number.")
+
+
+# Builds the agent tools registered with agent_tool() on first access.
+def __getattr__(attribute):
+    if attribute not in _AGENT_TOOLS:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {attribute!r}"
+        )
+    with _agent_tools_lock:
+        built = globals().get(attribute)
+        if built is None:
+            from crewai_tools import tool
+
+            name, func = _AGENT_TOOLS[attribute]
+            built = globals()[attribute] = tool(name)(func)
+    return built
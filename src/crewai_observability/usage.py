@@ -0,0 +1,284 @@
+"""
+Token and cost accounting for the crew's LLM calls.
+
+``UsageSpanProcessor`` watches the spans OpenLLMetry emits for LLM calls
+and rolls their prompt and completion token counts up by model, task and
+agent, pricing them with LLM_PRICES. Tasks and agents are taken from the
+``task`` spans the crew opens around each task (see ``task_span()``),
+and runs from the spans opened by ``run_span()``; every LLM span is
+charged to its nearest enclosing task and run.
+
+The totals are exported as the ``assistant.llm.tokens`` and
+``assistant.llm.cost`` counters, and each finished run records its total
+in the ``assistant.run.tokens`` and ``assistant.run.cost`` histograms.
+With RUN_TOKEN_BUDGET set, ``check_budget()`` (called by the agents after
+every step) aborts a run once it has used more tokens than that.
+"""
+
+import contextlib
+import os
+import threading
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import SpanProcessor
+
+from .profiling import profile_span
+from .telemetry import meter, tracer
+
+# USD per 1,000 prompt / completion tokens, by model name prefix.
+LLM_PRICES = os.getenv(
+    "LLM_PRICES",
+    "gpt-4o-mini=0.00015/0.0006,gpt-4o=0.005/0.015,"
+    "gpt-4-turbo=0.01/0.03,gpt-4=0.03/0.06,gpt-3.5-turbo=0.0005/0.0015",
+)
+# 0 disables the budget.
+RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", "0"))
+
+RUN_ATTRIBUTE = "assistant.run"
+TASK_ATTRIBUTE = "assistant.task"
+AGENT_ATTRIBUTE = "assistant.agent"
+
+# Attribute names used for token usage and model by the OpenLLMetry
+# instrumentations, current names first.
+PROMPT_TOKEN_ATTRIBUTES = (
+    "gen_ai.usage.prompt_tokens",
+    "gen_ai.usage.input_tokens",
+    "llm.usage.prompt_tokens",
+)
+COMPLETION_TOKEN_ATTRIBUTES = (
+    "gen_ai.usage.completion_tokens",
+    "gen_ai.usage.output_tokens",
+    "llm.usage.completion_tokens",
+)
+MODEL_ATTRIBUTES = (
+    "gen_ai.response.model",
+    "gen_ai.request.model",
+    "llm.response.model",
+    "llm.request.model",
+)
+
+llm_tokens = meter.create_counter(
+    "assistant.llm.tokens",
+    unit="{token}",
+    description="LLM tokens used, by model, task, agent and token type.",
+)
+llm_cost = meter.create_counter(
+    "assistant.llm.cost",
+    unit="USD",
+    description="Estimated LLM cost, by model, task and agent.",
+)
+run_tokens = meter.create_histogram(
+    "assistant.run.tokens",
+    unit="{token}",
+    description="LLM tokens used per run.",
+)
+run_cost = meter.create_histogram(
+    "assistant.run.cost",
+    unit="USD",
+    description="Estimated LLM cost per run.",
+)
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """Raised to abort a run that used more than RUN_TOKEN_BUDGET tokens."""
+
+
+def parse_prices(spec):
+    """
+    Parses ``model=prompt/completion`` prices, in USD per 1,000 tokens,
+    separated by commas.
+    """
+    prices = {}
+    for pair in spec.split(","):
+        if pair.strip():
+            model, price = pair.split("=", 1)
+            prompt, completion = price.split("/", 1)
+            prices[model.strip()] = (float(prompt), float(completion))
+    return prices
+
+
+def price_of(prices, model, prompt_tokens, completion_tokens):
+    """
+    Returns the cost of a call, priced by the longest model name prefix
+    in ``prices`` matching ``model`` (0 when none does).
+    """
+    matches = [name for name in prices if model.startswith(name)]
+    if not matches:
+        return 0.0
+    prompt, completion = prices[max(matches, key=len)]
+    return (prompt * prompt_tokens + completion * completion_tokens) / 1000
+
+
+def _first(attributes, names, default=None):
+    for name in names:
+        value = attributes.get(name)
+        if value is not None:
+            return value
+    return default
+
+
+class RunUsage:
+    """The tokens and cost used by one run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+
+class _SpanInfo:
+    def __init__(self, parent, run=None, task="", agent=""):
+        self.parent = parent
+        self.run = run
+        self.task = task
+        self.agent = agent
+        # Whether usage was already counted on a descendant span.
+        self.counted = False
+
+
+class UsageSpanProcessor(SpanProcessor):
+    """Rolls the token usage of LLM spans up by run, task and agent."""
+
+    def __init__(self, prices=None, budget=RUN_TOKEN_BUDGET):
+        self.prices = parse_prices(LLM_PRICES) if prices is None else prices
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def on_start(self, span, parent_context=None):
+        parent_id = span.parent.span_id if span.parent else None
+        attributes = span.attributes or {}
+        with self._lock:
+            parent = self._spans.get(parent_id)
+            info = _SpanInfo(parent_id)
+            if parent is not None:
+                info.run, info.task, info.agent = (
+                    parent.run,
+                    parent.task,
+                    parent.agent,
+                )
+            if RUN_ATTRIBUTE in attributes:
+                info.run = RunUsage(attributes[RUN_ATTRIBUTE])
+            if TASK_ATTRIBUTE in attributes:
+                info.task = attributes[TASK_ATTRIBUTE]
+                info.agent = attributes.get(AGENT_ATTRIBUTE, "")
+            self._spans[span.context.span_id] = info
+
+    def on_end(self, span):
+        with self._lock:
+            info = self._spans.pop(span.context.span_id, None)
+        if info is None:
+            return
+        attributes = span.attributes or {}
+        prompt = _first(attributes, PROMPT_TOKEN_ATTRIBUTES)
+        completion = _first(attributes, COMPLETION_TOKEN_ATTRIBUTES)
+        # Both the LangChain and the OpenAI instrumentation may report the
+        # same call; only the innermost span reporting it is counted.
+        reported = prompt is not None or completion is not None
+        if reported and not info.counted:
+            self._record(
+                info, attributes, int(prompt or 0), int(completion or 0)
+            )
+            info.counted = True
+        with self._lock:
+            parent = self._spans.get(info.parent)
+            if parent is not None and info.counted:
+                parent.counted = True
+        if RUN_ATTRIBUTE in attributes and info.run is not None:
+            run_tokens.record(info.run.total_tokens)
+            run_cost.record(info.run.cost)
+
+    def _record(self, info, attributes, prompt, completion):
+        model = str(_first(attributes, MODEL_ATTRIBUTES, ""))
+        cost = price_of(self.prices, model, prompt, completion)
+        labels = {"model": model, "task": info.task, "agent": info.agent}
+        llm_tokens.add(prompt, {**labels, "token.type": "prompt"})
+        llm_tokens.add(completion, {**labels, "token.type": "completion"})
+        llm_cost.add(cost, labels)
+        if info.run is not None:
+            with self._lock:
+                info.run.prompt_tokens += prompt
+                info.run.completion_tokens += completion
+                info.run.cost += cost
+
+    def run_usage(self, span=None):
+        """Returns the usage of the run ``span`` (default: current) is in."""
+        span = span or trace.get_current_span()
+        with self._lock:
+            info = self._spans.get(span.get_span_context().span_id)
+        return info.run if info is not None else None
+
+    def check_budget(self, span=None):
+        """Raises TokenBudgetExceeded if the current run is over budget."""
+        usage = self.run_usage(span)
+        if self.budget and usage is not None:
+            if usage.total_tokens > self.budget:
+                raise TokenBudgetExceeded(
+                    f"Run {usage.name} used {usage.total_tokens} tokens, "
+                    f"over its budget of {self.budget}."
+                )
+
+    def shutdown(self):
+        with self._lock:
+            self._spans.clear()
+
+    def force_flush(self, timeout_millis=30000):
+        return True
+
+
+_processor = None
+_processor_lock = threading.Lock()
+
+
+def get_usage_processor():
+    """Returns the process-wide usage span processor."""
+    global _processor
+    with _processor_lock:
+        if _processor is None:
+            _processor = UsageSpanProcessor()
+        return _processor
+
+
+def install_usage_processor(provider=None):
+    """
+    Adds the usage processor to ``provider`` (default: the global tracer
+    provider). Returns False when the provider is not the OTel SDK's, as
+    before Traceloop.init() has run.
+    """
+    provider = provider or trace.get_tracer_provider()
+    if not hasattr(provider, "add_span_processor"):
+        return False
+    provider.add_span_processor(get_usage_processor())
+    return True
+
+
+def check_budget(step_output=None):
+    """
+    Aborts the current run if it is over RUN_TOKEN_BUDGET. Used as the
+    agents' step callback, so a looping agent stops within one step.
+    """
+    get_usage_processor().check_budget()
+
+
+@contextlib.contextmanager
+def run_span(name):
+    """Opens the span that LLM usage of one run is charged to."""
+    with tracer.start_as_current_span(
+        f"run {name}", attributes={RUN_ATTRIBUTE: name}
+    ) as span, profile_span(span, all_threads=True):
+        yield span
+
+
+@contextlib.contextmanager
+def task_span(task, agent):
+    """Opens the span that LLM usage of one task is charged to."""
+    with tracer.start_as_current_span(
+        f"task {task}",
+        attributes={TASK_ATTRIBUTE: task, AGENT_ATTRIBUTE: agent},
+    ) as span, profile_span(span):
+        yield span
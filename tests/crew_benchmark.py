@@ -0,0 +1,127 @@
+"""
+Latency instrumentation for end-to-end crew benchmarks.
+
+``instrument_crew()`` times every task of a crew, every call to the Google
+tools and every LLM call (attributed to the task that made it), so a
+replayed run can be summarized as p50/p95 latencies per task, tool and
+LLM call.
+"""
+
+import contextlib
+import math
+import threading
+import time
+from collections import defaultdict
+from unittest.mock import patch
+
+from crewai import Task
+from crewai.utilities.token_counter_callback import TokenCalcHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from crewai_observability.tools import google_tools
+
+TOOLS = (
+    google_tools.gmail_reader_tool,
+    google_tools.google_calendar_search_tool,
+    google_tools.google_calendar_writer_tool,
+    google_tools.human_approval_tool,
+)
+
+
+def percentile(values, q):
+    """Returns the nearest-rank ``q`` percentile of ``values``."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyRecorder:
+    """Collects latency samples grouped by kind (task, tool, llm) and name."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def current_task(self):
+        return getattr(self._local, "task", None)
+
+    @contextlib.contextmanager
+    def measure(self, kind, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.samples[(kind, name)].append(elapsed)
+
+    def summary(self):
+        """Returns ``{(kind, name): (count, p50, p95)}`` in seconds."""
+        return {
+            key: (
+                len(values),
+                percentile(values, 50),
+                percentile(values, 95),
+            )
+            for key, values in sorted(self.samples.items())
+        }
+
+    def report(self):
+        lines = [
+            f"{'kind':<6} {'name':<30} {'n':>4} {'p50 ms':>9} {'p95 ms':>9}"
+        ]
+        for (kind, name), (count, p50, p95) in self.summary().items():
+            lines.append(
+                f"{kind:<6} {name:<30} {count:>4} "
+                f"{p50 * 1000:>9.1f} {p95 * 1000:>9.1f}"
+            )
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def instrument_crew(recorder, crew, task_names):
+    """
+    Records task, tool and LLM call latencies of ``crew`` into
+    ``recorder``. ``task_names`` names the crew's tasks, in order.
+    """
+    names = {id(task): name for task, name in zip(crew.tasks, task_names)}
+    execute_task = Task.execute
+    generate = BaseChatModel._generate_with_cache
+
+    def timed_execute(task, *args, **kwargs):
+        name = names.get(id(task), "task")
+        recorder._local.task = name
+        try:
+            with recorder.measure("task", name):
+                return execute_task(task, *args, **kwargs)
+        finally:
+            recorder._local.task = None
+
+    def timed_generate(model, *args, **kwargs):
+        with recorder.measure("llm", recorder.current_task or "llm"):
+            return generate(model, *args, **kwargs)
+
+    def timed_tool(tool):
+        func = tool.func
+
+        def wrapper(*args, **kwargs):
+            with recorder.measure("tool", tool.name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patch.object(Task, "execute", timed_execute))
+        stack.enter_context(
+            patch.object(
+                BaseChatModel, "_generate_with_cache", timed_generate
+            )
+        )
+        # crewAI's token counter downloads tiktoken encodings on first use,
+        # which an offline benchmark cannot do.
+        stack.enter_context(patch.object(TokenCalcHandler, "on_llm_start"))
+        for tool in TOOLS:
+            stack.enter_context(patch.object(tool, "func", timed_tool(tool)))
+        yield recorder
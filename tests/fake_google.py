@@ -0,0 +1,284 @@
+"""
+A local, in-process stand-in for the Google REST endpoints used by the
+tools, so benchmarks and integration tests can run without network access.
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+
+GOOGLE_ROOT_URLS = (
+    "https://gmail.googleapis.com/",
+    "https://www.googleapis.com/",
+)
+
+
+class FakeGoogleServer:
+    """
+    Serves a synthetic mailbox over the Gmail v1 REST and batch APIs, and
+    synthetic calendars over the Calendar v3 freeBusy and events APIs.
+
+    ``latency`` is added to every HTTP round trip, and ``item_latency`` to
+    every call inside a batch, to model the cost of the network versus the
+    cost of the server doing work. ``fail_next()`` makes calls fail, to
+    exercise rate limiting and retries.
+    """
+
+    def __init__(self, message_count=0, latency=0.0, item_latency=0.0):
+        self.latency = latency
+        self.item_latency = item_latency
+        self.messages = {}
+        self.calendars = {}
+        self.events = {}
+        self.http_requests = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        for i in range(message_count):
+            self.add_message(
+                f"msg{i}",
+                subject=f"Subject {i}",
+                body=f"Let's meet to discuss item {i}.",
+            )
+        self._server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), _make_handler(self)
+        )
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def add_message(
+        self, message_id, subject, body, thread_id=None, sender=None
+    ):
+        data = base64.urlsafe_b64encode(body.encode("utf-8")).decode("ascii")
+        headers = [{"name": "Subject", "value": subject}]
+        if sender:
+            headers.append({"name": "From", "value": sender})
+        self.messages[message_id] = {
+            "id": message_id,
+            "threadId": thread_id or message_id,
+            # Messages arrive a second apart, in the order they are added.
+            "internalDate": str(1725267600000 + 1000 * len(self.messages)),
+            "payload": {
+                "mimeType": "multipart/alternative",
+                "headers": headers,
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": data}},
+                    {"mimeType": "text/html", "body": {"data": data}},
+                ],
+            },
+        }
+
+    def add_busy(self, calendar_id, start, end):
+        self.calendars.setdefault(calendar_id, []).append(
+            {"start": start, "end": end}
+        )
+
+    def fail_next(self, count, status=429, retry_after=None):
+        """
+        Answers the next ``count`` calls, single or inside a batch, with
+        ``status`` and an optional Retry-After header.
+        """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _injected_failure(self):
+        """Returns ``(status, payload, headers)`` for a failing call."""
+        with self._lock:
+            if not self._failures:
+                return None
+            status, retry_after = self._failures.pop(0)
+        if status in (403, 429):
+            reason = "rateLimitExceeded"
+        else:
+            reason = "backendError"
+        payload = {
+            "error": {
+                "code": status,
+                "message": reason,
+                "errors": [{"domain": "usageLimits", "reason": reason}],
+            }
+        }
+        headers = {}
+        if retry_after is not None:
+            headers["Retry-After"] = str(retry_after)
+        return status, payload, headers
+
+    def http(self):
+        """Returns an httplib2 transport that talks to this server."""
+        return RedirectingHttp(self.url)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def dispatch(self, method, target, body=b""):
+        """Handles one REST call and returns ``(status, payload)``."""
+        parsed = urllib.parse.urlsplit(target)
+        path = parsed.path.rstrip("/")
+        prefix = "/gmail/v1/users/me/messages"
+        if method == "GET" and path == prefix:
+            ids = [
+                {"id": m["id"], "threadId": m["threadId"]}
+                for m in self.messages.values()
+            ]
+            return 200, {"messages": ids, "resultSizeEstimate": len(ids)}
+        if method == "GET" and path.startswith(prefix + "/"):
+            message_id = urllib.parse.unquote(path[len(prefix) + 1:])
+            if message_id in self.messages:
+                return 200, self.messages[message_id]
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        if method == "POST" and path == "/calendar/v3/freeBusy":
+            request = json.loads(body or b"{}")
+            calendars = {}
+            for item in request.get("items", []):
+                if self.item_latency:
+                    time.sleep(self.item_latency)
+                busy = self.calendars.get(item["id"])
+                if busy is not None:
+                    calendars[item["id"]] = {"busy": busy}
+                else:
+                    calendars[item["id"]] = {
+                        "errors": [{"domain": "global", "reason": "notFound"}]
+                    }
+            return 200, {"kind": "calendar#freeBusy", "calendars": calendars}
+        events_path = re.fullmatch(
+            r"/calendar/v3/calendars/([^/]+)/events", path
+        )
+        if events_path:
+            calendar_id = urllib.parse.unquote(events_path.group(1))
+            events = self.events.setdefault(calendar_id, [])
+            if method == "GET":
+                return 200, {"items": events, "nextSyncToken": "sync-token"}
+            if method == "POST":
+                event = dict(json.loads(body or b"{}"))
+                event.setdefault("id", f"evt{len(events)}")
+                if any(e["id"] == event["id"] for e in events):
+                    return 409, {"error": {"code": 409, "message": "Dup"}}
+                event["htmlLink"] = (
+                    f"https://calendar.google.com/event?eid={event['id']}"
+                )
+                events.append(event)
+                return 200, event
+        return 404, {"error": {"code": 404, "message": f"No route {path}"}}
+
+    def dispatch_batch(self, content_type, body):
+        """Splits a multipart/mixed batch and answers each call in it."""
+        message = BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+        )
+        boundary = uuid.uuid4().hex
+        chunks = []
+        for part in message.get_payload():
+            raw = part.get_payload().replace("\r\n", "\n")
+            head, _, content = raw.partition("\n\n")
+            request_line = head.split("\n", 1)[0].strip()
+            method, target, _ = request_line.split(" ", 2)
+            if self.item_latency:
+                time.sleep(self.item_latency)
+            failure = self._injected_failure()
+            if failure is not None:
+                status, payload, _ = failure
+            else:
+                status, payload = self.dispatch(
+                    method, target, content.encode("utf-8")
+                )
+            # Long IDs come back folded over several lines.
+            content_id = " ".join(part["Content-ID"].split())[1:-1]
+            chunks.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} OK\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(chunks)
+
+
+class RedirectingHttp(httplib2.Http):
+    """An httplib2 transport that rewrites Google API hosts to a local URL."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def request(self, uri, *args, **kwargs):
+        for root in GOOGLE_ROOT_URLS:
+            if uri.startswith(root):
+                uri = self.base_url + uri[len(root):]
+                break
+        return super().request(uri, *args, **kwargs)
+
+
+def _make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, content_type, text, headers=None):
+            data = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _serve(self, method):
+            with fake._lock:
+                fake.http_requests += 1
+            if fake.latency:
+                time.sleep(fake.latency)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if method == "POST" and self.path.startswith("/batch"):
+                content_type, text = fake.dispatch_batch(
+                    self.headers["Content-Type"], body
+                )
+                self._reply(200, content_type, text)
+                return
+            failure = fake._injected_failure()
+            if failure is not None:
+                status, payload, headers = failure
+                self._reply(
+                    status, "application/json", json.dumps(payload), headers
+                )
+                return
+            status, payload = fake.dispatch(method, self.path, body)
+            self._reply(status, "application/json", json.dumps(payload))
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+    return Handler
@@ -0,0 +1,117 @@
+import base64
+from unittest.mock import MagicMock
+
+from crewai_observability import clients
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.state import StateStore
+
+GOOGLE_TOOLS = "crewai_observability.tools.google_tools"
+
+
+class FakeBatchHttpRequest:
+    """In-memory stand-in for googleapiclient's BatchHttpRequest."""
+
+    def __init__(self, callback=None):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request, callback, request_id))
+
+    def execute(self, http=None):
+        for request, callback, request_id in self._requests:
+            callback = callback or self._callback
+            try:
+                response, exception = request.execute(), None
+            except Exception as exc:
+                response, exception = None, exc
+            callback(request_id, response, exception)
+
+
+def mock_google_auth(monkeypatch):
+    """Replaces the OAuth flow with a credentials mock."""
+    clients.reset_clients()
+    monkeypatch.setattr(clients, "get_google_credentials", MagicMock)
+
+
+def mock_google_service_build(monkeypatch, api, data):
+    """
+    Replaces the client registry's services with a mock whose
+    ``execute()`` calls return the canned responses in ``data``.
+    """
+    service = MagicMock()
+    service.new_batch_http_request.side_effect = (
+        lambda callback=None: FakeBatchHttpRequest(callback)
+    )
+    if api == "gmail":
+        messages = service.users.return_value.messages.return_value
+        messages.list.return_value.execute.return_value = data.get("list")
+        messages.get.return_value.execute.return_value = data.get("get")
+    elif api == "calendar":
+        query = service.freebusy.return_value.query.return_value
+        query.execute.return_value = data.get("query")
+        insert = service.events.return_value.insert.return_value
+        insert.execute.return_value = data.get("insert")
+        events = service.events.return_value.list.return_value
+        events.execute.return_value = data.get(
+            "events", {"items": [], "nextSyncToken": "sync-token"}
+        )
+        cache = BusyCache()
+        monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_busy_cache", lambda: cache)
+
+    monkeypatch.setattr(
+        f"{GOOGLE_TOOLS}.get_service", lambda api, version: service
+    )
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_http", MagicMock)
+    return service
+
+
+def mock_state_store(monkeypatch, tmp_path):
+    """Points the tools at a fresh state store under ``tmp_path``."""
+    store = StateStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_state_store", lambda: store)
+    return store
+
+
+def get_mock_email_list(count=1):
+    """Returns a messages().list() response with ``count`` messages."""
+    if count == 0:
+        return {"resultSizeEstimate": 0}
+    return {
+        "messages": [
+            {"id": f"msg{i}", "threadId": f"thread{i}"} for i in range(count)
+        ],
+        "resultSizeEstimate": count,
+    }
+
+
+def get_mock_email_content(subject="Subject", body="Body", headers=None):
+    """
+    Returns a messages().get() response with a plain text part and any
+    extra ``headers`` given as a name-to-value dict.
+    """
+    data = base64.urlsafe_b64encode(body.encode("utf-8")).decode("ascii")
+    extra = [{"name": k, "value": v} for k, v in (headers or {}).items()]
+    return {
+        "id": "msg0",
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [{"name": "Subject", "value": subject}] + extra,
+            "parts": [
+                {"mimeType": "text/plain", "body": {"data": data}},
+            ],
+        },
+    }
+
+
+def get_mock_freebusy_query_response(busy_slots=None):
+    """Returns a freebusy().query() response for the primary calendar."""
+    return {"calendars": {"primary": {"busy": busy_slots or []}}}
+
+
+def get_mock_event_insert_response(event_id="evt"):
+    """Returns an events().insert() response."""
+    return {
+        "id": event_id,
+        "htmlLink": f"https://calendar.google.com/event?eid={event_id}",
+    }
@@ -9,7 +9,7 @@ from langchain_core.runnables import Runnable
 def mock_google_tools(mocker):
     """Fixture to mock Google-related tools and credentials."""
     mocker.patch(
-        "crewai_observability.tools.google_tools.get_google_credentials",
+        "crewai_observability.clients.get_google_credentials",
         return_value=MagicMock(),
     )
     mocker.patch(
@@ -0,0 +1,186 @@
+"""
+Load generator for the OpenTelemetry Collector.
+
+Sends synthetic crew traces, each a run span with task, LLM and tool
+children carrying prompt-sized attributes, at a fixed rate to a running
+collector, and reports the collector's CPU and memory use and how many
+spans it accepted, refused and exported, read from its own metrics
+endpoint. A share of the traces fail or are slow, so the tail-sampling
+profile has something to keep.
+
+Usage (with the stack from docker/docker-compose.yml running):
+
+    PYTHONPATH=src python -m tests.performance.collector_load \\
+        --rate 50 --duration 60
+"""
+
+import argparse
+import random
+import time
+import urllib.request
+
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import Status, StatusCode
+
+from crewai_observability.telemetry import span_processor
+
+OTLP_ENDPOINT = "http://localhost:4318"
+METRICS_URL = "http://localhost:8888/metrics"
+TASKS = ("scan_inbox_task", "find_slots_task", "create_event_task")
+NANOS = 1_000_000_000
+
+
+def read_metrics(url=METRICS_URL):
+    """
+    Returns the collector's own metrics as a dict of name to value, summed
+    over label sets.
+    """
+    with urllib.request.urlopen(url, timeout=5) as response:
+        text = response.read().decode("utf-8")
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, _, value = line.rpartition(" ")
+        name = series.split("{", 1)[0]
+        try:
+            values[name] = values.get(name, 0.0) + float(value)
+        except ValueError:
+            continue
+    return values
+
+
+def _metric(values, *names):
+    # Metric names gained a _total suffix in later collector versions.
+    for name in names:
+        for candidate in (name, f"{name}_total"):
+            if candidate in values:
+                return values[candidate]
+    return 0.0
+
+
+def emit_trace(tracer, prompt_bytes, failed=False, slow=False):
+    """
+    Emits one crew trace; a slow one claims to have taken two minutes.
+    """
+    start = time.time_ns()
+    duration = (120 if slow else 5) * NANOS
+    step = duration // (len(TASKS) + 1)
+    prompt = "x" * prompt_bytes
+    with tracer.start_as_current_span(
+        "crew", start_time=start, end_on_exit=False
+    ) as run:
+        run.set_attribute("assistant.run", "crew")
+        for i, task in enumerate(TASKS):
+            task_start = start + i * step
+            with tracer.start_as_current_span(
+                task, start_time=task_start, end_on_exit=False
+            ) as task_span:
+                llm = tracer.start_span(
+                    "openai.chat", start_time=task_start
+                )
+                llm.set_attribute("llm.prompts.0.content", prompt)
+                llm.set_attribute(
+                    "llm.completions.0.content", "Reply to bob@example.com"
+                )
+                llm.set_attribute("llm.usage.total_tokens", prompt_bytes // 4)
+                llm.end(end_time=task_start + step // 2)
+                tool = tracer.start_span(
+                    "Gmail Reader Tool.tool", start_time=task_start + step // 2
+                )
+                if failed and i == len(TASKS) - 1:
+                    tool.set_status(Status(StatusCode.ERROR, "HttpError 503"))
+                tool.end(end_time=task_start + step)
+            task_span.end(end_time=task_start + step)
+        run.end(end_time=start + duration)
+
+
+def run_load(
+    rate,
+    duration,
+    endpoint=OTLP_ENDPOINT,
+    metrics_url=METRICS_URL,
+    prompt_bytes=8000,
+    error_ratio=0.02,
+    slow_ratio=0.02,
+):
+    """
+    Sends ``rate`` traces per second for ``duration`` seconds and returns
+    a report of the collector's resource use over that time.
+    """
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "collector-load-test"})
+    )
+    provider.add_span_processor(
+        span_processor(OTLPSpanExporter(endpoint=f"{endpoint}/v1/traces"))
+    )
+    tracer = provider.get_tracer(__name__)
+    before = read_metrics(metrics_url)
+    started = time.monotonic()
+    sent = 0
+    while time.monotonic() - started < duration:
+        due = int((time.monotonic() - started) * rate)
+        while sent < due:
+            emit_trace(
+                tracer,
+                prompt_bytes,
+                failed=random.random() < error_ratio,
+                slow=random.random() < slow_ratio,
+            )
+            sent += 1
+        time.sleep(0.01)
+    provider.force_flush()
+    elapsed = time.monotonic() - started
+    after = read_metrics(metrics_url)
+    provider.shutdown()
+
+    def delta(*names):
+        return _metric(after, *names) - _metric(before, *names)
+
+    return {
+        "traces_sent": sent,
+        "spans_sent": sent * (1 + 3 * len(TASKS)),
+        "traces_per_second": sent / elapsed,
+        "cpu_percent": 100 * delta("otelcol_process_cpu_seconds") / elapsed,
+        "memory_rss_mib": _metric(after, "otelcol_process_memory_rss")
+        / 2**20,
+        "heap_alloc_mib": _metric(
+            after, "otelcol_process_runtime_heap_alloc_bytes"
+        )
+        / 2**20,
+        "spans_accepted": delta("otelcol_receiver_accepted_spans"),
+        "spans_refused": delta("otelcol_receiver_refused_spans"),
+        "spans_exported": delta("otelcol_exporter_sent_spans"),
+    }
+
+
+def format_report(report):
+    return "\n".join(
+        f"{name:>18}: {value:,.1f}" for name, value in report.items()
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--endpoint", default=OTLP_ENDPOINT)
+    parser.add_argument("--metrics-url", default=METRICS_URL)
+    parser.add_argument("--prompt-bytes", type=int, default=8000)
+    args = parser.parse_args(argv)
+    report = run_load(
+        args.rate,
+        args.duration,
+        endpoint=args.endpoint,
+        metrics_url=args.metrics_url,
+        prompt_bytes=args.prompt_bytes,
+    )
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
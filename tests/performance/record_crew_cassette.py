@@ -0,0 +1,134 @@
+"""
+Records the cassette replayed by test_crew_benchmark.py.
+
+The crew runs once against the local fake Google server, with the OpenAI
+chat model answering from a fixed script, so the cassette can be
+regenerated without credentials whenever the crew's prompts change. To
+capture a real run instead, run ``main.py`` with
+ASSISTANT_CASSETTE=<file> and ASSISTANT_CASSETTE_MODE=record.
+
+Usage: PYTHONPATH=src python -m tests.performance.record_crew_cassette
+"""
+
+import json
+import pathlib
+from unittest.mock import patch
+
+from crewai.utilities.token_counter_callback import TokenCalcHandler
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_openai import ChatOpenAI
+
+from crewai_observability import clients
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.cassette import Cassette, use_cassette
+from crewai_observability.crew import SchedulingCrew
+from tests.fake_google import FakeGoogleServer
+
+CASSETTE_PATH = (
+    pathlib.Path(__file__).parent.parent
+    / "fixtures"
+    / "cassettes"
+    / "scheduling_crew.json"
+)
+
+ATTENDEE = "alice@example.com"
+REQUEST = {
+    "thread_id": "msg0",
+    "topic": "Roadmap review",
+    "attendees": [ATTENDEE],
+    "duration_minutes": 30,
+}
+SLOTS = ["2030-06-03T09:00:00Z", "2030-06-03T11:00:00Z"]
+EVENT = {
+    "summary": "Roadmap review",
+    "start": {"dateTime": SLOTS[0]},
+    "end": {"dateTime": "2030-06-03T09:30:00Z"},
+    "attendees": [{"email": ATTENDEE}],
+}
+
+
+def _action(tool, arguments):
+    return (
+        "Thought: I need to use a tool.\n"
+        f"Action: {tool}\n"
+        f"Action Input: {json.dumps(arguments)}"
+    )
+
+
+def _final(answer):
+    return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+# The agents' answers, in the order the sequential crew asks for them.
+SCRIPT = [
+    _action("Gmail Reader Tool", {"query": "newer_than:1d"}),
+    _final(json.dumps([REQUEST])),
+    _action(
+        "Google Calendar Search Tool",
+        {
+            "start_time": "2030-06-03T00:00:00Z",
+            "end_time": "2030-06-08T00:00:00Z",
+            "duration_minutes": 30,
+            "attendees": [ATTENDEE],
+        },
+    ),
+    _final(json.dumps({**REQUEST, "slots": SLOTS})),
+    _action("Human Approval Tool", {"proposed_slots": SLOTS}),
+    _final(SLOTS[0]),
+    _action("Google Calendar Writer Tool", {"event_details": EVENT}),
+    _final("Event created successfully. Event ID: evt0"),
+]
+
+
+def record(path=CASSETTE_PATH):
+    responses = iter(SCRIPT)
+
+    def scripted_generate(model, messages, stop=None, **kwargs):
+        message = AIMessage(content=next(responses))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    cassette = Cassette(str(path), mode="record")
+    with FakeGoogleServer() as server:
+        server.add_message(
+            "msg0",
+            subject="Roadmap review",
+            body="Hi, can we meet next week to go through the roadmap?",
+        )
+        server.add_message(
+            "msg1",
+            subject="Weekly digest",
+            body="The most read stories this week.",
+        )
+        server.add_busy(
+            "primary", "2030-06-03T10:00:00Z", "2030-06-03T11:00:00Z"
+        )
+        server.add_busy(
+            ATTENDEE, "2030-06-03T12:00:00Z", "2030-06-03T14:00:00Z"
+        )
+
+        def transport():
+            return cassette.transport(server.http())
+
+        tools = "crewai_observability.tools.google_tools"
+        with patch.object(ChatOpenAI, "_generate", scripted_generate), \
+                patch.object(TokenCalcHandler, "on_llm_start"), \
+                patch("builtins.input", return_value="1"), \
+                patch.object(clients, "get_http", transport), \
+                patch(f"{tools}.get_http", transport), \
+                patch(f"{tools}.get_busy_cache", return_value=BusyCache()), \
+                patch.dict("os.environ", {"OPENAI_API_KEY": "recording"}):
+            use_cassette(cassette)
+            clients.reset_clients()
+            try:
+                result = SchedulingCrew().crew().kickoff()
+            finally:
+                use_cassette(None)
+                clients.reset_clients()
+    cassette.save()
+    return result
+
+
+if __name__ == "__main__":
+    print(record())
+    print(f"Recorded {CASSETTE_PATH}")
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+from googleapiclient.discovery import build
+
+from tests.fake_google import FakeGoogleServer
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.intervals import to_epoch, to_rfc3339
+from crewai_observability.ratelimit import RequestExecutor
+from crewai_observability.tools.google_tools import create_events
+
+ROUND_TRIP = 0.005
+ITEM_COST = 0.0002
+BATCH_SIZE = 50
+
+
+def _events(count):
+    start = to_epoch("2030-06-03T00:00:00Z")
+    return [
+        {
+            "summary": f"Meeting {i}",
+            "start": {"dateTime": to_rfc3339(start + i * 3600)},
+            "end": {"dateTime": to_rfc3339(start + i * 3600 + 1800)},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", [10, 50, 100])
+def test_bulk_booking_wall_time(count, monkeypatch):
+    """
+    Reports the wall time to book N events one insert at a time versus
+    through batch requests against a local fake Calendar server.
+    """
+    cache = BusyCache(sync_ids=[])
+    monkeypatch.setattr(
+        "crewai_observability.tools.google_tools.get_busy_cache",
+        lambda: cache,
+    )
+    events = _events(count)
+    with FakeGoogleServer(
+        latency=ROUND_TRIP, item_latency=ITEM_COST
+    ) as server:
+        service = build("calendar", "v3", http=server.http())
+
+        started = time.perf_counter()
+        for event in events:
+            service.events().insert(
+                calendarId="baseline", body=event
+            ).execute()
+        sequential_time = time.perf_counter() - started
+
+        server.http_requests = 0
+        started = time.perf_counter()
+        results = create_events(
+            service,
+            events,
+            http_factory=server.http,
+            batch_size=BATCH_SIZE,
+            # Measure batching, not the quota throttle.
+            executor=RequestExecutor("calendar"),
+        )
+        batched_time = time.perf_counter() - started
+
+    print(
+        f"\nCalendar bulk booking N={count}: "
+        f"sequential {sequential_time * 1000:.1f} ms ({count} requests), "
+        f"batched {batched_time * 1000:.1f} ms "
+        f"({server.http_requests} requests)"
+    )
+    assert [result["status"] for result in results] == ["created"] * count
+    assert server.http_requests == -(-count // BATCH_SIZE)
+    assert len(server.events["primary"]) == count
+    if count > 1:
+        assert batched_time < sequential_time
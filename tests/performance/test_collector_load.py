@@ -0,0 +1,36 @@
+import os
+import urllib.error
+
+import pytest
+
+from tests.performance.collector_load import (
+    METRICS_URL,
+    format_report,
+    read_metrics,
+    run_load,
+)
+
+RATES = [
+    int(rate) for rate in os.getenv("COLLECTOR_LOAD_RATES", "10,50").split(",")
+]
+
+
+@pytest.fixture(scope="module")
+def collector():
+    """Skips unless a collector from docker-compose.yml is running."""
+    try:
+        read_metrics(METRICS_URL)
+    except (urllib.error.URLError, OSError):
+        pytest.skip("no OpenTelemetry Collector at localhost:8888")
+
+
+@pytest.mark.parametrize("rate", RATES)
+def test_collector_resource_use(collector, rate):
+    """
+    Reports the collector's CPU and memory use at N traces per second.
+    """
+    report = run_load(rate, duration=15)
+
+    print(f"\nCollector at {rate} traces/s:\n{format_report(report)}")
+    assert report["spans_refused"] == 0
+    assert report["spans_accepted"] >= report["spans_sent"]
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import pytest
+
+from crewai_observability import clients
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.cassette import Cassette, use_cassette
+from crewai_observability.crew import SchedulingCrew
+from tests.crew_benchmark import LatencyRecorder, instrument_crew
+from tests.performance.record_crew_cassette import CASSETTE_PATH
+
+RUNS = 3
+
+
+@pytest.mark.parametrize(
+    "http_latency,llm_latency",
+    [(0.0, 0.0), (0.02, 0.1)],
+)
+def test_crew_replay_latency(monkeypatch, http_latency, llm_latency):
+    """
+    Replays a recorded crew run offline with injected Google API and LLM
+    latencies, and reports p50/p95 per task, tool and LLM call.
+    """
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "1")
+    recorder = LatencyRecorder()
+
+    for _ in range(RUNS):
+        cassette = Cassette(
+            str(CASSETTE_PATH),
+            mode="replay",
+            http_latency=http_latency,
+            llm_latency=llm_latency,
+        )
+        use_cassette(cassette)
+        clients.reset_clients()
+        try:
+            scheduling_crew = SchedulingCrew()
+            crew = scheduling_crew.crew()
+            with patch(
+                "crewai_observability.tools.google_tools.get_busy_cache",
+                return_value=BusyCache(),
+            ), instrument_crew(
+                recorder, crew, [task.name for task in crew.tasks]
+            ):
+                with recorder.measure("crew", "kickoff"):
+                    result = crew.kickoff()
+        finally:
+            use_cassette(None)
+            clients.reset_clients()
+
+        assert "Event created successfully" in str(result)
+
+    print(
+        f"\nCrew replay, HTTP {http_latency * 1000:.0f} ms, "
+        f"LLM {llm_latency * 1000:.0f} ms, {RUNS} runs:\n"
+        f"{recorder.report()}"
+    )
+    summary = recorder.summary()
+    assert summary[("task", "scan_inbox_task")][0] == RUNS
+    assert summary[("tool", "Gmail Reader Tool")][0] == RUNS
+    assert summary[("llm", "create_event_task")][0] == 2 * RUNS
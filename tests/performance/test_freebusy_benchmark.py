@@ -0,0 +1,55 @@
+import time
+
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+
+from tests.fake_google import FakeGoogleServer
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.intervals import to_epoch
+
+ROUND_TRIP = 0.05
+WINDOW = (
+    to_epoch("2024-09-02T00:00:00Z"),
+    to_epoch("2024-09-07T00:00:00Z"),
+)
+
+
+def _service(server):
+    # A transport per request keeps concurrent chunks thread-safe.
+    def _request(http, *args, **kwargs):
+        return HttpRequest(server.http(), *args, **kwargs)
+
+    return build(
+        "calendar", "v3", http=server.http(), requestBuilder=_request
+    )
+
+
+@pytest.mark.parametrize("attendees", [10, 60, 200])
+def test_multi_attendee_freebusy_wall_time(attendees):
+    """
+    Reports the time to read availability for many attendees with chunks
+    queried one after another versus concurrently.
+    """
+    with FakeGoogleServer(latency=ROUND_TRIP) as server:
+        calendar_ids = [f"user{i}@example.com" for i in range(attendees)]
+        for calendar_id in calendar_ids:
+            server.add_busy(
+                calendar_id, "2024-09-02T10:00:00Z", "2024-09-02T11:00:00Z"
+            )
+        service = _service(server)
+        timings = {}
+        for concurrency in (1, 8):
+            cache = BusyCache(sync_ids=[], max_concurrency=concurrency)
+            started = time.perf_counter()
+            result = cache.busy(service, calendar_ids, *WINDOW)
+            timings[concurrency] = time.perf_counter() - started
+            assert len(result) == attendees
+
+    chunks = -(-attendees // 50)
+    print(
+        f"\nFree/busy for {attendees} attendees ({chunks} chunks): "
+        f"sequential {timings[1] * 1000:.1f} ms, "
+        f"concurrent {timings[8] * 1000:.1f} ms"
+    )
+    assert timings[8] < ROUND_TRIP * chunks + 0.5
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from googleapiclient.discovery import build
+
+from tests.fake_google import FakeGoogleServer
+from crewai_observability.ratelimit import RequestExecutor
+from crewai_observability.tools.google_tools import (
+    _format_message,
+    fetch_messages,
+)
+
+# Simulated network round trip and per-call server time.
+ROUND_TRIP = 0.005
+ITEM_COST = 0.0002
+
+
+def _sequential_fetch(service, message_ids):
+    """The original one-request-per-message strategy, as a baseline."""
+    return {
+        message_id: service.users()
+        .messages()
+        .get(userId="me", id=message_id)
+        .execute()
+        for message_id in message_ids
+    }
+
+
+@pytest.mark.parametrize("count", [10, 50, 100])
+def test_gmail_fetch_wall_time(count):
+    """
+    Reports the wall time to fetch N messages sequentially versus through
+    batch requests against a local fake Gmail server.
+    """
+    with FakeGoogleServer(
+        message_count=count, latency=ROUND_TRIP, item_latency=ITEM_COST
+    ) as server:
+        service = build("gmail", "v1", http=server.http())
+        message_ids = list(server.messages)
+
+        started = time.perf_counter()
+        sequential = _sequential_fetch(service, message_ids)
+        sequential_time = time.perf_counter() - started
+        sequential_requests = server.http_requests
+
+        server.http_requests = 0
+        started = time.perf_counter()
+        batched = fetch_messages(
+            service,
+            message_ids,
+            http_factory=server.http,
+            batch_size=50,
+            max_concurrency=4,
+            # Measure batching, not the quota throttle.
+            executor=RequestExecutor("gmail"),
+        )
+        batched_time = time.perf_counter() - started
+
+    print(
+        f"\nGmail fetch N={count}: "
+        f"sequential {sequential_time * 1000:.1f} ms "
+        f"({sequential_requests} requests), "
+        f"batched {batched_time * 1000:.1f} ms "
+        f"({server.http_requests} requests)"
+    )
+
+    assert sequential_requests == count
+    assert server.http_requests == -(-count // 50)
+    for message_id in message_ids:
+        assert _format_message(message_id, batched[message_id]) == (
+            _format_message(message_id, sequential[message_id])
+        )
+    assert batched_time < sequential_time
@@ -0,0 +1,151 @@
+import functools
+import json
+import math
+from unittest.mock import MagicMock, patch
+
+from googleapiclient.discovery import build
+from langchain_core.runnables import Runnable
+
+from crewai_observability import crew as crew_module
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.crew import SchedulingCrew
+from crewai_observability.structured import TASK_OUTPUTS
+from crewai_observability.tools.google_tools import (
+    gmail_reader_tool,
+    google_calendar_search_tool,
+    google_calendar_writer_tool,
+)
+from tests.fake_google import FakeGoogleServer
+from tests.helpers import GOOGLE_TOOLS, mock_google_auth
+
+MESSAGES = 20
+ATTENDEES = ["ann@example.com", "bo@example.com"]
+DAYS = ("02", "03", "04", "05", "06")
+BODY = (
+    "Hi,\n\nFollowing up on last week's review, could we find half an "
+    "hour to go through the open items on the launch plan? Monday or "
+    "Tuesday afternoon would suit me best, but I can move things around. "
+    "Please include Bo, who owns the rollout checklist.\n\nThanks,\nAnn"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The encoding is downloaded on first use, which is not possible
+        # offline; fall back to OpenAI's four-characters-per-token rule.
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text))
+
+
+def _mailbox_and_calendars(server):
+    for i in range(MESSAGES):
+        server.add_message(f"msg{i}", f"Launch plan review {i}", BODY)
+    for calendar_id in ["primary"] + ATTENDEES:
+        for day in DAYS:
+            for start, end in (("09", "10"), ("11", "12"), ("14", "15")):
+                offset = len(calendar_id) % 2
+                server.add_busy(
+                    calendar_id,
+                    f"2024-09-{day}T{int(start) + offset:02d}:00:00Z",
+                    f"2024-09-{day}T{int(end) + offset:02d}:00:00Z",
+                )
+
+
+def _task_prompts():
+    with patch("crewai.agent.ChatOpenAI") as chat_openai:
+        llm = MagicMock()
+        llm.bind.return_value = MagicMock(spec=Runnable)
+        chat_openai.return_value = llm
+        scheduling_crew = SchedulingCrew()
+        return {
+            name: getattr(scheduling_crew, name)().prompt()
+            for name in TASK_OUTPUTS
+        }
+
+
+def _run_payloads(monkeypatch, structured):
+    """
+    Returns what one run puts in front of the LLM: the task prompts and
+    the outputs of the inbox scan, the slot search and the booking.
+    """
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.STRUCTURED_OUTPUTS", structured)
+    monkeypatch.setattr(crew_module, "STRUCTURED_OUTPUTS", structured)
+    cache = BusyCache(sync_ids=[])
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_busy_cache", lambda: cache)
+    with FakeGoogleServer() as server:
+        _mailbox_and_calendars(server)
+        services = {
+            "gmail": build("gmail", "v1", http=server.http()),
+            "calendar": build("calendar", "v3", http=server.http()),
+        }
+        monkeypatch.setattr(
+            f"{GOOGLE_TOOLS}.get_service",
+            lambda api, version: services[api],
+        )
+        monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_http", server.http)
+        payloads = {
+            f"prompt {name}": prompt
+            for name, prompt in _task_prompts().items()
+        }
+        payloads["Gmail Reader Tool"] = gmail_reader_tool.run(
+            query="newer_than:1d"
+        )
+        payloads["Google Calendar Search Tool"] = (
+            google_calendar_search_tool.run(
+                start_time="2024-09-02T00:00:00Z",
+                end_time="2024-09-07T00:00:00Z",
+                duration_minutes=30,
+                attendees=ATTENDEES,
+            )
+        )
+        payloads["Google Calendar Writer Tool"] = (
+            google_calendar_writer_tool.run(
+                event_details={
+                    "summary": "Launch plan review",
+                    "start": {"dateTime": "2024-09-02T12:00:00Z"},
+                    "end": {"dateTime": "2024-09-02T12:30:00Z"},
+                    "attendees": [{"email": a} for a in ATTENDEES],
+                }
+            )
+        )
+    return payloads
+
+
+def test_structured_outputs_cut_prompt_tokens(monkeypatch):
+    """
+    Reports the prompt tokens one run spends on task prompts and tool
+    outputs with prose outputs versus STRUCTURED_OUTPUTS.
+    """
+    mock_google_auth(monkeypatch)
+    text = _run_payloads(monkeypatch, structured=False)
+    structured = _run_payloads(monkeypatch, structured=True)
+
+    tokenizer = "cl100k_base" if _encoding() else "~4 chars/token"
+    lines = [f"Prompt tokens per run ({tokenizer}):"]
+    for name in text:
+        lines.append(
+            f"  {name:<32} {count_tokens(text[name]):6d} -> "
+            f"{count_tokens(structured[name]):6d}"
+        )
+    text_total = sum(count_tokens(p) for p in text.values())
+    structured_total = sum(count_tokens(p) for p in structured.values())
+    lines.append(f"  {'total':<32} {text_total:6d} -> {structured_total:6d}")
+    print("\n" + "\n".join(lines))
+
+    # The same slots are offered, in fewer tokens.
+    offered = text["Google Calendar Search Tool"].split("slots:\n", 1)[1]
+    assert [line.split()[1] for line in offered.splitlines()] == (
+        json.loads(structured["Google Calendar Search Tool"])["s"]
+    )
+    assert structured_total < text_total
@@ -0,0 +1,54 @@
+import random
+import time
+
+import pytest
+
+from crewai_observability.intervals import to_epoch
+from crewai_observability.scheduling import find_free_slots
+
+WINDOW_START = to_epoch("2024-09-02T00:00:00Z")
+WINDOW_DAYS = 28
+
+
+def _random_busy(calendars, per_calendar, seed=7):
+    rng = random.Random(seed)
+    span = WINDOW_DAYS * 24 * 3600
+    busy = {}
+    for i in range(calendars):
+        blocks = []
+        for _ in range(per_calendar):
+            start = WINDOW_START + rng.randrange(0, span, 15 * 60)
+            blocks.append((start, start + rng.choice([15, 30, 60]) * 60))
+        busy[f"user{i}@example.com"] = blocks
+    return busy
+
+
+@pytest.mark.parametrize(
+    "calendars,per_calendar", [(1, 10_000), (50, 200), (100, 500)]
+)
+def test_free_slot_engine_wall_time(calendars, per_calendar):
+    """
+    Reports the time to find slots across a four-week window for large
+    numbers of busy intervals and attendees.
+    """
+    busy = _random_busy(calendars, per_calendar)
+    end = WINDOW_START + WINDOW_DAYS * 24 * 3600
+
+    started = time.perf_counter()
+    slots = find_free_slots(
+        busy, WINDOW_START, end, duration_minutes=30, count=3,
+        time_zone="UTC", hours=(9, 17), buffer_minutes=5, step_minutes=15,
+    )
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"\nFree-slot engine: {calendars} calendars x {per_calendar} "
+        f"intervals = {calendars * per_calendar} busy blocks over "
+        f"{WINDOW_DAYS} days in {elapsed * 1000:.1f} ms"
+    )
+    assert elapsed < 2.0
+    for slot_start, slot_end in slots:
+        for blocks in busy.values():
+            assert all(
+                slot_end <= s or slot_start >= e for s, e in blocks
+            )
@@ -0,0 +1,87 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent.parent
+
+# Import time budgets in seconds, as measured by ``python -X importtime``.
+CLI_BUDGET = float(os.getenv("CLI_IMPORT_BUDGET", "0.5"))
+MODULE_BUDGET = float(os.getenv("MODULE_IMPORT_BUDGET", "1.5"))
+# Packages that take seconds to import and must only be loaded on demand.
+HEAVY_PACKAGES = ("crewai", "crewai_tools", "embedchain", "traceloop")
+
+
+def import_profile(*args):
+    """
+    Runs ``python -X importtime *args`` from the repository root and
+    returns ``(total seconds, {module: cumulative seconds})``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": "src"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+        if not name.startswith("  "):
+            # Only top-level imports; nested ones are in their parent's.
+            total += int(cumulative) / 1e6
+    return total, modules
+
+
+def _report(label, total, modules):
+    slowest = sorted(modules.items(), key=lambda item: -item[1])[:8]
+    lines = "\n".join(f"  {t * 1000:8.1f} ms  {m}" for m, t in slowest)
+    print(f"\n{label}: {total * 1000:.1f} ms of imports\n{lines}")
+
+
+def _heavy(modules):
+    return sorted(
+        module
+        for module in modules
+        if module.split(".", 1)[0] in HEAVY_PACKAGES
+    )
+
+
+def test_cli_starts_without_heavy_imports():
+    """
+    Tests that ``main.py --help`` answers without loading crewAI,
+    crewai_tools or OpenLLMetry, within the CLI budget.
+    """
+    total, modules = import_profile("main.py", "--help")
+
+    _report("main.py --help", total, modules)
+    assert _heavy(modules) == []
+    assert total < CLI_BUDGET
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "crewai_observability.tools.google_tools",
+        "crewai_observability.pipeline",
+        "crewai_observability.daemon",
+        "crewai_observability.approvals",
+    ],
+)
+def test_modules_import_within_budget(module):
+    """
+    Tests that the Google tools and the pipeline modules leave crewAI and
+    the agent tool objects to be loaded when first used.
+    """
+    total, modules = import_profile("-c", f"import {module}")
+
+    _report(module, total, modules)
+    assert _heavy(modules) == []
+    assert total < MODULE_BUDGET
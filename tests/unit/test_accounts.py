@@ -0,0 +1,123 @@
+import datetime
+import importlib.util
+import sys
+import types
+from unittest.mock import MagicMock
+
+from google.oauth2.credentials import Credentials
+
+from crewai_observability.accounts import (
+    CredentialStore,
+    account_key,
+    account_scope,
+)
+
+
+def _credentials(token="token", expires_in=3600):
+    expiry = datetime.datetime.utcnow() + datetime.timedelta(
+        seconds=expires_in
+    )
+    return Credentials(
+        token=token,
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="id",
+        client_secret="secret",
+        expiry=expiry,
+    )
+
+
+def test_credentials_are_stored_per_account(tmp_path):
+    """Tests that every account's token round-trips through its own file."""
+    store = CredentialStore(str(tmp_path))
+
+    assert store.save("alice@example.com", _credentials("a")) is True
+    assert store.save("bob@example.com", _credentials("b")) is True
+
+    assert store.accounts() == ["alice@example.com", "bob@example.com"]
+    assert store.load("alice@example.com").token == "a"
+    assert store.load("bob@example.com").token == "b"
+    assert store.load("carol@example.com") is None
+    assert store.path("alice@example.com") != store.path("bob@example.com")
+
+
+def test_unchanged_credentials_are_not_rewritten(tmp_path):
+    """Tests that saving the token just loaded or saved skips the write."""
+    store = CredentialStore(str(tmp_path))
+    creds = _credentials()
+
+    assert store.save("alice@example.com", creds) is True
+    assert store.save("alice@example.com", creds) is False
+
+    creds.token = "rotated"
+    assert store.save("alice@example.com", creds) is True
+    assert CredentialStore(str(tmp_path)).load("alice@example.com").token == (
+        "rotated"
+    )
+
+
+def test_refresh_adopts_a_token_refreshed_elsewhere(tmp_path):
+    """
+    Tests that a token another process already refreshed is taken from
+    the store instead of being refreshed again, and that a stale one is
+    refreshed and saved.
+    """
+    store = CredentialStore(str(tmp_path))
+    stale = _credentials("old", expires_in=60)
+    stale.refresh = MagicMock()
+    elsewhere = CredentialStore(str(tmp_path))
+    elsewhere.save("alice@example.com", _credentials("new"))
+
+    store.refresh("alice@example.com", stale)
+
+    stale.refresh.assert_not_called()
+    assert stale.token == "new"
+
+    other = _credentials("older", expires_in=60)
+    store.save("bob@example.com", other)
+
+    def _refresh(request):
+        other.token = "fresh"
+        other.expiry = datetime.datetime.utcnow() + datetime.timedelta(
+            hours=1
+        )
+
+    other.refresh = MagicMock(side_effect=_refresh)
+    store.refresh("bob@example.com", other)
+
+    other.refresh.assert_called_once()
+    assert store.load("bob@example.com").token == "fresh"
+
+
+def test_account_keys_follow_the_account_scope():
+    """Tests that per-mailbox keys are namespaced by the current account."""
+    assert account_key("gmail.history_id") == "gmail.history_id"
+    with account_scope("alice@example.com"):
+        assert account_key("gmail.history_id") == (
+            "alice@example.com/gmail.history_id"
+        )
+    assert account_key("x", "bob@example.com") == "bob@example.com/x"
+
+
+def test_credential_locks_fall_back_to_msvcrt(monkeypatch, tmp_path):
+    """
+    Tests that the module imports without fcntl, as on Windows, and locks
+    credential files through msvcrt there.
+    """
+    calls = []
+    msvcrt = types.SimpleNamespace(
+        LK_LOCK=1,
+        LK_UNLCK=0,
+        locking=lambda fd, mode, size: calls.append(mode),
+    )
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    monkeypatch.setitem(sys.modules, "msvcrt", msvcrt)
+    spec = importlib.util.find_spec("crewai_observability.accounts")
+    windows_accounts = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(windows_accounts)
+
+    store = windows_accounts.CredentialStore(str(tmp_path))
+    with store.locked("alice@example.com"):
+        assert calls == [msvcrt.LK_LOCK]
+
+    assert calls == [msvcrt.LK_LOCK, msvcrt.LK_UNLCK]
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+import urllib.request
+
+import pytest
+
+from tests.helpers import GOOGLE_TOOLS
+from crewai_observability.approvals import (
+    REJECTED,
+    ApprovalBroker,
+    main,
+)
+from crewai_observability.tools.google_tools import human_approval_tool
+
+SLOTS = ["2030-06-03T09:00:00Z", "2030-06-03T11:00:00Z"]
+
+
+@pytest.fixture
+def broker():
+    """Provides an approval broker listening on a free local port."""
+    broker = ApprovalBroker(timeout=5, port=0).start()
+    yield broker
+    broker.stop()
+
+
+def _url(broker, path):
+    host, port = broker.address
+    return f"http://{host}:{port}{path}"
+
+
+def _wait_for_pending(broker, count):
+    for _ in range(200):
+        if len(broker.pending()) == count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"expected {count} pending approvals")
+
+
+def test_waiting_workflow_does_not_block_others(broker):
+    """
+    Tests that answering one approval over HTTP releases its workflow
+    while another keeps waiting.
+    """
+    results = {}
+
+    def workflow(name):
+        results[name] = broker.wait(broker.submit(SLOTS))
+
+    threads = [
+        threading.Thread(target=workflow, args=(name,)) for name in "ab"
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for_pending(broker, 2)
+
+    # Act
+    with urllib.request.urlopen(_url(broker, "/approvals")) as response:
+        listed = json.loads(response.read())
+    first = listed[0]["id"]
+    request = urllib.request.Request(
+        _url(broker, f"/approvals/{first}"),
+        data=json.dumps({"choice": 2}).encode("utf-8"),
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        status = response.status
+    _wait_for_pending(broker, 1)
+
+    # Assert
+    assert status == 204
+    assert [a["proposed_slots"] for a in listed] == [SLOTS, SLOTS]
+    assert list(results.values()) == [SLOTS[1]]
+
+    broker.resolve(broker.pending()[0].id)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert sorted(results.values()) == sorted([SLOTS[1], REJECTED])
+
+
+@pytest.mark.parametrize(
+    "default,expected", [("reject", REJECTED), ("first", SLOTS[0])]
+)
+def test_unanswered_approval_gets_the_default_action(default, expected):
+    """Tests that an approval nobody answers times out to the default."""
+    broker = ApprovalBroker(timeout=0.05, default=default)
+
+    assert broker.wait(broker.submit(SLOTS)) == expected
+    assert broker.pending() == []
+
+
+def test_approval_can_be_awaited():
+    """Tests that a workflow on an event loop can await an approval."""
+    broker = ApprovalBroker(timeout=5)
+
+    async def workflow():
+        approval = broker.submit(SLOTS)
+        asyncio.get_running_loop().call_later(
+            0.01, broker.resolve, approval.id, 1
+        )
+        return await broker.wait_async(approval)
+
+    assert asyncio.run(workflow()) == SLOTS[0]
+
+
+def test_awaited_approval_times_out_to_the_default():
+    """
+    Tests that an awaited approval nobody answers expires to the default
+    action instead of failing on a cancelled future.
+    """
+    broker = ApprovalBroker(timeout=0.05, default="first")
+    approval = broker.submit(SLOTS)
+
+    assert asyncio.run(broker.wait_async(approval)) == SLOTS[0]
+    assert approval.future.result(timeout=1) == SLOTS[0]
+    assert broker.pending() == []
+
+
+def test_cli_answers_pending_approvals(broker, capsys):
+    """Tests the command-line client against a running broker."""
+    approval = broker.submit(SLOTS)
+    url = _url(broker, "")
+
+    main(["--url", url, "list"])
+    main(["--url", url, "approve", approval.id, "1"])
+
+    assert "1. 2030-06-03T09:00:00Z" in capsys.readouterr().out
+    assert approval.future.result(timeout=1) == SLOTS[0]
+    with pytest.raises(SystemExit):
+        main(["--url", url, "reject", approval.id])
+
+
+def test_cli_lists_nothing_pending(broker, capsys):
+    """Tests that the client reports an empty list of approvals."""
+    with urllib.request.urlopen(_url(broker, "/approvals")) as response:
+        listed = json.loads(response.read())
+
+    main(["--url", _url(broker, ""), "list"])
+
+    assert listed == []
+    assert capsys.readouterr().out == "No approvals are pending.\n"
+
+
+def test_human_approval_tool_uses_the_broker(monkeypatch):
+    """Tests that broker mode never prompts on the terminal."""
+    broker = ApprovalBroker(timeout=5)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.APPROVAL_MODE", "broker")
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_approval_broker", lambda: broker)
+    monkeypatch.setattr(broker, "start", lambda: broker)
+    monkeypatch.setattr(
+        "builtins.input", lambda prompt="": pytest.fail("prompted")
+    )
+
+    def answer():
+        _wait_for_pending(broker, 1)
+        broker.resolve(broker.pending()[0].id, 2)
+
+    threading.Thread(target=answer).start()
+
+    result = human_approval_tool.run(proposed_slots=SLOTS)
+
+    assert result == SLOTS[1]
@@ -0,0 +1,251 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.intervals import to_epoch
+
+HOUR = 3600
+DAY_START = to_epoch("2024-09-02T00:00:00Z")
+
+
+def _at(hour):
+    return DAY_START + hour * HOUR
+
+
+def _rfc(hour):
+    return f"2024-09-02T{hour:02d}:00:00Z"
+
+
+@pytest.fixture
+def service():
+    """Provides a calendar service mock with one busy hour at 10:00."""
+    service = MagicMock()
+    service.freebusy.return_value.query.return_value.execute.return_value = {
+        "calendars": {
+            "primary": {"busy": [{"start": _rfc(10), "end": _rfc(11)}]}
+        }
+    }
+    service.events.return_value.list.return_value.execute.return_value = {
+        "items": [],
+        "nextSyncToken": "token-1",
+    }
+    return service
+
+
+def _query_windows(service):
+    return [
+        (call.kwargs["body"]["timeMin"], call.kwargs["body"]["timeMax"])
+        for call in service.freebusy.return_value.query.call_args_list
+    ]
+
+
+def test_repeated_and_overlapping_windows_are_served_from_memory(service):
+    """Tests that only uncovered ranges are fetched from the API."""
+    cache = BusyCache(
+        sync_interval=60, sync_ids=["primary"], clock=lambda: DAY_START
+    )
+
+    first = cache.busy(service, ["primary"], _at(9), _at(17))
+    again = cache.busy(service, ["primary"], _at(10), _at(12))
+    wider = cache.busy(service, ["primary"], _at(9), _at(19))
+
+    assert first == {"primary": [(_at(10), _at(11))]}
+    assert again == first
+    assert wider == first
+    assert _query_windows(service) == [
+        (_rfc(9), _rfc(17)),
+        (_rfc(17), _rfc(19)),
+    ]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_changed_events_invalidate_their_old_and_new_ranges(service):
+    """Tests that incremental sync drops ranges touched by changed events."""
+    now = [DAY_START]
+    cache = BusyCache(
+        sync_interval=60, sync_ids=["primary"], clock=lambda: now[0]
+    )
+    events = service.events.return_value.list.return_value.execute
+    events.return_value = {
+        "items": [
+            {
+                "id": "evt1",
+                "start": {"dateTime": _rfc(10)},
+                "end": {"dateTime": _rfc(11)},
+            }
+        ],
+        "nextSyncToken": "token-1",
+    }
+    cache.busy(service, ["primary"], _at(9), _at(17))
+
+    # The event moves to 14:00.
+    events.return_value = {
+        "items": [
+            {
+                "id": "evt1",
+                "start": {"dateTime": _rfc(14)},
+                "end": {"dateTime": _rfc(15)},
+            }
+        ],
+        "nextSyncToken": "token-2",
+    }
+    fetched = service.freebusy.return_value.query.return_value.execute
+    fetched.return_value = {"calendars": {"primary": {"busy": []}}}
+    now[0] += 120
+    result = cache.busy(service, ["primary"], _at(9), _at(17))
+
+    initial, sync_call = service.events.return_value.list.call_args_list
+    # The first sync only lists the events of the next 30 days.
+    assert initial.kwargs["timeMax"] == "2024-10-02T00:00:00Z"
+    assert sync_call.kwargs["syncToken"] == "token-1"
+    assert _query_windows(service)[-1] == (_rfc(10), _rfc(11))
+    assert result == {"primary": [(_at(14), _at(15))]}
+
+
+def test_recorded_events_update_the_cache_without_api_calls(service):
+    """Tests that a written event is immediately reported as busy."""
+    cache = BusyCache(
+        sync_interval=60, sync_ids=["primary"], clock=lambda: DAY_START
+    )
+    cache.busy(service, ["primary"], _at(9), _at(17))
+    calls = cache.stats()["api_calls"]
+
+    cache.record_event(
+        "primary",
+        {
+            "id": "new",
+            "start": {"dateTime": _rfc(13)},
+            "end": {"dateTime": _rfc(14)},
+        },
+    )
+    result = cache.busy(service, ["primary"], _at(9), _at(17))
+
+    assert result == {"primary": [(_at(10), _at(11)), (_at(13), _at(14))]}
+    assert cache.stats()["api_calls"] == calls
+
+
+def test_unsynced_calendars_expire_after_ttl(service):
+    """Tests that calendars without sync are refetched after the TTL."""
+    now = [DAY_START]
+    cache = BusyCache(ttl=300, sync_ids=[], clock=lambda: now[0])
+
+    cache.busy(service, ["primary"], _at(9), _at(17))
+    now[0] += 200
+    cache.busy(service, ["primary"], _at(9), _at(17))
+    now[0] += 200
+    cache.busy(service, ["primary"], _at(9), _at(17))
+
+    assert len(_query_windows(service)) == 2
+    service.events.assert_not_called()
+
+
+def test_many_calendars_are_queried_in_concurrent_chunks():
+    """Tests chunking by the item limit and skipping unreadable calendars."""
+    service = MagicMock()
+    attendees = [f"user{i}@example.com" for i in range(120)]
+
+    def _query(body):
+        request = MagicMock()
+        calendars = {}
+        for item in body["items"]:
+            if item["id"] == "user7@example.com":
+                calendars[item["id"]] = {"errors": [{"reason": "notFound"}]}
+            else:
+                calendars[item["id"]] = {
+                    "busy": [{"start": _rfc(10), "end": _rfc(11)}]
+                }
+        request.execute.return_value = {"calendars": calendars}
+        return request
+
+    service.freebusy.return_value.query.side_effect = _query
+    cache = BusyCache(
+        sync_ids=[], clock=lambda: DAY_START, max_items=50, max_concurrency=4
+    )
+
+    result = cache.busy(service, attendees, _at(9), _at(17))
+
+    sizes = sorted(
+        len(call.kwargs["body"]["items"])
+        for call in service.freebusy.return_value.query.call_args_list
+    )
+    assert sizes == [20, 50, 50]
+    assert len(result) == 119
+    assert "user7@example.com" not in result
+    assert cache.stats()["api_calls"] == 3
+
+
+def test_concurrent_lookups_share_one_fetch_without_holding_the_lock(service):
+    """
+    Tests that the cache stays usable while a calendar is being fetched,
+    and that a second lookup of it waits for that fetch instead of
+    querying the API again.
+    """
+    cache = BusyCache(sync_ids=[], clock=lambda: DAY_START)
+    query = service.freebusy.return_value.query.return_value
+    response = query.execute.return_value
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def _execute():
+        fetching.set()
+        assert release.wait(2)
+        return response
+
+    query.execute.side_effect = _execute
+    results = []
+    lookups = [
+        threading.Thread(
+            target=lambda: results.append(
+                cache.busy(service, ["primary"], _at(9), _at(17))
+            )
+        )
+        for _ in range(2)
+    ]
+    lookups[0].start()
+    assert fetching.wait(2)
+    lookups[1].start()
+
+    # Neither the fetch nor the waiting lookup holds the lock.
+    assert cache.conflicts("other", (_at(9), _at(10))) == []
+    release.set()
+    for lookup in lookups:
+        lookup.join(2)
+
+    assert results == [{"primary": [(_at(10), _at(11))]}] * 2
+    assert len(_query_windows(service)) == 1
+
+
+def test_other_calendars_are_queried_while_one_is_synced(service):
+    """
+    Tests that the free/busy query for calendars without sync does not
+    wait for the sync of another calendar to finish.
+    """
+    queried = threading.Event()
+    freebusy = service.freebusy.return_value.query.return_value
+    response = freebusy.execute.return_value
+
+    def _query():
+        queried.set()
+        return response
+
+    def _sync():
+        # Only returns once the query ran alongside it.
+        assert queried.wait(2)
+        return {"items": [], "nextSyncToken": "token-1"}
+
+    freebusy.execute.side_effect = _query
+    service.events.return_value.list.return_value.execute.side_effect = _sync
+    cache = BusyCache(sync_ids=["primary"], clock=lambda: DAY_START)
+
+    result = cache.busy(
+        service, ["primary", "colleague@example.com"], _at(9), _at(17)
+    )
+
+    assert [
+        [item["id"] for item in call.kwargs["body"]["items"]]
+        for call in service.freebusy.return_value.query.call_args_list
+    ] == [["colleague@example.com"], ["primary"]]
+    assert result["primary"] == [(_at(10), _at(11))]
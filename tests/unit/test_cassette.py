@@ -0,0 +1,88 @@
+import pytest
+from googleapiclient.discovery import build
+from langchain_core.language_models.fake_chat_models import (
+    FakeListChatModel,
+)
+
+from crewai_observability.cassette import Cassette, CassetteMiss
+from crewai_observability.tools.google_tools import fetch_messages
+from tests.fake_google import FakeGoogleServer
+
+
+def _record_gmail(path):
+    """Records a message listing and a batched fetch into ``path``."""
+    cassette = Cassette(str(path), mode="record")
+    with FakeGoogleServer(message_count=3) as server:
+        http = cassette.transport(server.http())
+        service = build("gmail", "v1", http=http)
+        listing = service.users().messages().list(userId="me").execute()
+        ids = [message["id"] for message in listing["messages"]]
+        fetched = fetch_messages(service, ids, http_factory=lambda: http)
+    cassette.save()
+    return listing, fetched
+
+
+def test_replay_serves_recorded_calls_and_batches(tmp_path):
+    """
+    Tests that recorded calls, including the calls inside a batch, are
+    answered offline with the same responses.
+    """
+    path = tmp_path / "run.json"
+    listing, fetched = _record_gmail(path)
+
+    cassette = Cassette(str(path), mode="replay")
+    http = cassette.transport()
+    service = build("gmail", "v1", http=http)
+    replayed_listing = service.users().messages().list(userId="me").execute()
+    # Batch the calls differently from the recording
+    replayed = fetch_messages(
+        service,
+        list(reversed(list(fetched))),
+        http_factory=lambda: http,
+        batch_size=2,
+    )
+
+    assert replayed_listing == listing
+    assert replayed == fetched
+
+
+def test_replay_falls_back_to_the_same_endpoint(tmp_path):
+    """
+    Tests that a call whose query changed still gets the recording for its
+    endpoint, and that unknown endpoints fail loudly.
+    """
+    path = tmp_path / "run.json"
+    listing, _ = _record_gmail(path)
+    service = build(
+        "gmail", "v1", http=Cassette(str(path), mode="replay").transport()
+    )
+
+    changed = (
+        service.users().messages().list(userId="me", q="newer_than:1d")
+    ).execute()
+
+    assert changed == listing
+    with pytest.raises(CassetteMiss):
+        service.users().getProfile(userId="me").execute()
+
+
+def test_llm_calls_are_recorded_and_replayed(tmp_path):
+    """Tests that replayed prompts get the recorded completions."""
+    path = tmp_path / "run.json"
+    recording = Cassette(str(path), mode="record")
+    model = FakeListChatModel(
+        responses=["Tuesday", "Friday"], cache=recording.llm_cache()
+    )
+    model.invoke("When?")
+    model.invoke("When else?")
+    recording.save()
+
+    replay = Cassette(str(path), mode="replay", llm_latency=0.01)
+    model = FakeListChatModel(
+        responses=["Tuesday", "Friday"], cache=replay.llm_cache()
+    )
+
+    assert model.invoke("When else?").content == "Friday"
+    assert model.invoke("When?").content == "Tuesday"
+    # The model itself was never called
+    assert model.i == 0
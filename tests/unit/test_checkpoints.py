@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock, patch
+
+from langchain_core.runnables import Runnable
+
+from crewai_observability.checkpoints import (
+    INBOX_SCOPE,
+    CheckpointStore,
+    StageCheckpoint,
+    checkpoint_scope,
+    idempotency_key,
+    thread_scope,
+)
+from crewai_observability.crew import SchedulingCrew
+
+EVENT = {
+    "summary": "Roadmap review",
+    "start": {"dateTime": "2030-06-03T09:00:00Z"},
+    "end": {"dateTime": "2030-06-03T09:30:00Z"},
+    "attendees": [{"email": "bob@example.com"}, {"email": "al@example.com"}],
+}
+
+
+def test_thread_scope_names_the_requests_threads():
+    """Tests that checkpoint scopes are derived from thread IDs."""
+    triage = 'Found: [{"thread_id": "t2"}, {"thread_id": "t1"}]'
+
+    assert thread_scope(triage) == "t1,t2"
+    assert thread_scope('{"thread_id": "t2"}') == "t2"
+    assert thread_scope("No meeting requests.") is None
+
+
+def test_idempotency_key_identifies_a_booking():
+    """
+    Tests that the same booking for the same thread always gets the same
+    event ID, and that other threads or details get another.
+    """
+    reordered = {**EVENT, "attendees": EVENT["attendees"][::-1]}
+    with checkpoint_scope("t1"):
+        key = idempotency_key(EVENT)
+
+    assert key == idempotency_key(reordered, scope="t1")
+    assert key != idempotency_key(EVENT, scope="t2")
+    assert key != idempotency_key({**EVENT, "summary": "Other"}, "t1")
+    assert len(key) == 32 and set(key) <= set("0123456789abcdef")
+
+
+def test_stage_checkpoint_skips_completed_stages_on_resume(tmp_path):
+    """
+    Tests that outputs are always saved but only reused when resuming.
+    """
+    store = CheckpointStore(str(tmp_path / "state.db"))
+    execute = MagicMock(return_value="slots")
+
+    fresh = StageCheckpoint(store, resume=False, scope="t1")
+    assert fresh.run("find_slots_task", execute) == ("slots", False)
+    assert fresh.run("find_slots_task", execute) == ("slots", False)
+
+    resumed = StageCheckpoint(store, resume=True, scope="t1")
+    assert resumed.run("find_slots_task", execute) == ("slots", True)
+    assert execute.call_count == 2
+
+
+def test_resumed_crew_skips_checkpointed_tasks(tmp_path):
+    """
+    Tests that the sequential crew restores every checkpointed task, the
+    inbox scan from the inbox scope and the rest from the thread's.
+    """
+    store = CheckpointStore(str(tmp_path / "state.db"))
+    store.save(INBOX_SCOPE, "scan_inbox_task", '[{"thread_id": "t1"}]')
+    store.save("t1", "find_slots_task", "slots")
+    store.save("t1", "confirm_time_task", "slot 1")
+    store.save("t1", "create_event_task", "Event ID: evt0")
+    checkpoint = StageCheckpoint(store, resume=True)
+
+    with patch("crewai.agent.ChatOpenAI") as mock_chat_openai:
+        mock_llm = MagicMock()
+        runnable = mock_llm.bind.return_value = MagicMock(spec=Runnable)
+        mock_chat_openai.return_value = mock_llm
+        crew = SchedulingCrew(checkpoint=checkpoint).crew()
+
+        result = crew.kickoff()
+
+    assert result == "Event ID: evt0"
+    assert checkpoint.scope == "t1"
+    assert not runnable.mock_calls
+    assert crew.tasks[1].output.raw_output == "slots"
+
+    checkpoint.finish()
+    assert store.completed(INBOX_SCOPE) == {}
+    assert len(store.completed("t1")) == 3
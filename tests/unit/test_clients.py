@@ -0,0 +1,125 @@
+import datetime
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from crewai_observability import accounts, auth, clients
+
+
+def _credentials(expires_in):
+    expiry = datetime.datetime.utcnow() + datetime.timedelta(
+        seconds=expires_in
+    )
+    return Credentials(
+        token="token",
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="id",
+        client_secret="secret",
+        expiry=expiry,
+    )
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Provides a fresh client registry with a mocked OAuth flow."""
+    creds = _credentials(expires_in=3600)
+    loader = MagicMock(return_value=creds)
+    monkeypatch.setattr(clients, "get_google_credentials", loader)
+    clients.reset_clients()
+    yield loader
+    clients.reset_clients()
+
+
+def test_get_service_is_built_once_per_process(registry):
+    """Tests that services and credentials are cached across calls."""
+    gmail = clients.get_service("gmail", "v1")
+
+    assert clients.get_service("gmail", "v1") is gmail
+    assert clients.get_service("calendar", "v3") is not gmail
+    assert registry.call_count == 1
+
+
+def test_requests_use_the_calling_threads_transport(registry):
+    """Tests that each thread gets its own pooled transport."""
+    service = clients.get_service("gmail", "v1")
+    main_request = service.users().messages().list(userId="me")
+    seen = []
+
+    def _worker():
+        seen.append(service.users().messages().list(userId="me").http)
+
+    thread = threading.Thread(target=_worker)
+    thread.start()
+    thread.join()
+
+    assert main_request.http is clients.get_http()
+    assert seen[0] is not main_request.http
+    assert seen[0].credentials is main_request.http.credentials
+
+
+def test_credentials_are_refreshed_ahead_of_expiry(registry, monkeypatch):
+    """Tests that near-expiry credentials are refreshed and persisted."""
+    creds = _credentials(expires_in=60)
+    creds.refresh = MagicMock()
+    registry.return_value = creds
+    save = MagicMock()
+    monkeypatch.setattr(clients, "save_credentials", save)
+
+    assert clients.get_credentials() is creds
+
+    creds.refresh.assert_called_once()
+    save.assert_called_once_with(creds)
+
+
+def test_fresh_credentials_are_not_refreshed(registry, monkeypatch):
+    """Tests that credentials far from expiry are left alone."""
+    save = MagicMock()
+    monkeypatch.setattr(clients, "save_credentials", save)
+
+    clients.get_credentials()
+
+    save.assert_not_called()
+
+
+def test_save_credentials_only_writes_changed_tokens(tmp_path, monkeypatch):
+    """Tests that the token file is only rewritten when it changes."""
+    token_file = tmp_path / "token.json"
+    monkeypatch.setattr(auth, "TOKEN_FILE", str(token_file))
+    monkeypatch.setattr(auth, "_stored_token", None)
+    creds = _credentials(expires_in=3600)
+
+    assert auth.save_credentials(creds) is True
+    assert auth.save_credentials(creds) is False
+
+    creds.token = "rotated"
+    assert auth.save_credentials(creds) is True
+    assert "rotated" in token_file.read_text()
+
+
+def test_accounts_get_their_own_credentials_and_transports(
+    registry, monkeypatch, tmp_path
+):
+    """
+    Tests that inside an account scope requests are authorized with that
+    account's stored credentials, on the shared service objects.
+    """
+    store = accounts.CredentialStore(str(tmp_path))
+    store.save("alice@example.com", _credentials(expires_in=3600))
+    monkeypatch.setattr(clients, "get_credential_store", lambda: store)
+    service = clients.get_service("gmail", "v1")
+    default_http = service.users().messages().list(userId="me").http
+
+    with accounts.account_scope("alice@example.com"):
+        alice_http = service.users().messages().list(userId="me").http
+        assert clients.get_service("gmail", "v1") is service
+        assert clients.get_http() is alice_http
+        with pytest.raises(accounts.AccountNotFound):
+            with accounts.account_scope("bob@example.com"):
+                clients.get_credentials()
+
+    assert alice_http is not default_http
+    assert alice_http.credentials is not default_http.credentials
+    assert registry.call_count == 1
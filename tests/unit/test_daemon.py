@@ -0,0 +1,282 @@
+import socket
+import threading
+import time
+import urllib.request
+from unittest.mock import MagicMock
+
+from crewai_observability.accounts import account_scope
+from crewai_observability.daemon import AssistantDaemon, WorkItem
+from crewai_observability.pipeline import PipelineResult
+from crewai_observability.state import StateStore
+from crewai_observability.tools.google_tools import gmail_reader_tool
+from tests.helpers import (
+    GOOGLE_TOOLS,
+    FakeBatchHttpRequest,
+    get_mock_email_content,
+    mock_google_auth,
+)
+
+DAEMON = "crewai_observability.daemon"
+
+
+class FakePipeline:
+    """Records the messages and requests the daemon hands over."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.triaged = []
+        self.stages = set()
+        self.requests = []
+
+    def run_stage(self, stage, context=None):
+        time.sleep(self.delay)
+        self.stages.add(stage)
+        self.triaged.append(context)
+        return '["request"]'
+
+    def run(self, requests):
+        for request in requests:
+            self.requests.append(request)
+            yield PipelineResult(request)
+
+
+def mock_gmail(monkeypatch, tmp_path, history):
+    """Wires the daemon to a Gmail mock and a fresh state store."""
+    mock_google_auth(monkeypatch)
+    store = StateStore(str(tmp_path / "state.db"))
+    service = MagicMock()
+    service.new_batch_http_request.side_effect = (
+        lambda callback=None: FakeBatchHttpRequest(callback)
+    )
+    users = service.users.return_value
+    users.getProfile.return_value.execute.return_value = {"historyId": "100"}
+    users.history.return_value.list.return_value.execute.return_value = (
+        history
+    )
+    content = get_mock_email_content(subject="Meet?", body="Tuesday?")
+    content["internalDate"] = str(int((time.time() - 5) * 1000))
+    users.messages.return_value.get.return_value.execute.return_value = (
+        content
+    )
+    monkeypatch.setattr(f"{DAEMON}.get_service", lambda api, version: service)
+    monkeypatch.setattr(f"{DAEMON}.get_http", MagicMock)
+    monkeypatch.setattr(f"{DAEMON}.get_state_store", lambda: store)
+    return service, store
+
+
+def test_poll_once_starts_from_the_current_mailbox(monkeypatch, tmp_path):
+    """Tests that the first poll only records a checkpoint."""
+    service, store = mock_gmail(monkeypatch, tmp_path, {})
+    daemon = AssistantDaemon(pipeline=FakePipeline())
+
+    assert daemon.poll_once() == 0
+    assert store.get("daemon.gmail.history_id") == "100"
+    assert daemon.queue.empty()
+    service.users.return_value.history.return_value.list.assert_not_called()
+
+
+def test_poll_once_enqueues_new_messages(monkeypatch, tmp_path):
+    """
+    Tests that messages added since the checkpoint are queued and the
+    checkpoint only advances past them once they are all processed.
+    """
+    history = {
+        "history": [
+            {"messagesAdded": [{"message": {"id": "m1"}}]},
+            {"messagesAdded": [{"message": {"id": "m2"}}]},
+        ],
+        "historyId": "120",
+    }
+    _, store = mock_gmail(monkeypatch, tmp_path, history)
+    store.set("daemon.gmail.history_id", "100")
+    daemon = AssistantDaemon(pipeline=FakePipeline())
+
+    assert daemon.poll_once() == 2
+    assert store.get("daemon.gmail.history_id") == "100"
+    item = daemon.queue.get_nowait()
+    assert item.message_id == "m1"
+    assert item.text.startswith("Thread ID: m1\nSubject: Meet?")
+    assert time.time() - item.received_at >= 5
+
+    daemon._handle(item)
+    assert store.get("daemon.gmail.history_id") == "100"
+    daemon._handle(daemon.queue.get_nowait())
+    assert store.get("daemon.gmail.history_id") == "120"
+
+
+def test_daemon_and_reader_keep_separate_checkpoints(monkeypatch, tmp_path):
+    """
+    Tests that the daemon and an incremental Gmail reader scan each read
+    history from their own checkpoint, kept per account.
+    """
+    history = {
+        "history": [{"messagesAdded": [{"message": {"id": "m1"}}]}],
+        "historyId": "120",
+    }
+    service, store = mock_gmail(monkeypatch, tmp_path, history)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.GMAIL_INCREMENTAL_SYNC", True)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_service", lambda *_: service)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_http", MagicMock)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_state_store", lambda: store)
+    history_list = service.users.return_value.history.return_value.list
+    with account_scope("alice@example.com"):
+        store.set("alice@example.com/daemon.gmail.history_id", "100")
+        store.set("alice@example.com/gmail.history_id", "90")
+        daemon = AssistantDaemon(pipeline=FakePipeline())
+
+        daemon.poll_once()
+        daemon._handle(daemon.queue.get_nowait())
+        gmail_reader_tool.run(query="newer_than:1d")
+
+    assert [
+        call.kwargs["startHistoryId"] for call in history_list.call_args_list
+    ] == ["100", "90"]
+    assert store.get("alice@example.com/daemon.gmail.history_id") == "120"
+    assert store.get("alice@example.com/gmail.history_id") == "120"
+    assert store.get("daemon.gmail.history_id") is None
+
+
+def test_later_polls_read_on_from_the_last_poll(monkeypatch, tmp_path):
+    """
+    Tests that a poll does not queue the messages of an earlier poll
+    again while they are still being processed.
+    """
+    history = {
+        "history": [{"messagesAdded": [{"message": {"id": "m1"}}]}],
+        "historyId": "120",
+    }
+    service, store = mock_gmail(monkeypatch, tmp_path, history)
+    store.set("daemon.gmail.history_id", "100")
+    daemon = AssistantDaemon(pipeline=FakePipeline())
+    history_list = service.users.return_value.history.return_value.list
+
+    daemon.poll_once()
+    daemon.poll_once()
+
+    assert [
+        call.kwargs["startHistoryId"] for call in history_list.call_args_list
+    ] == ["100", "120"]
+    assert store.get("daemon.gmail.history_id") == "100"
+
+
+def test_full_queue_blocks_the_poller_until_stopped(monkeypatch, tmp_path):
+    """
+    Tests backpressure: with a full queue the poller waits instead of
+    reading ahead, and a shutdown leaves the checkpoint untouched.
+    """
+    history = {
+        "history": [{"messagesAdded": [{"message": {"id": "m1"}}]}],
+        "historyId": "120",
+    }
+    _, store = mock_gmail(monkeypatch, tmp_path, history)
+    store.set("daemon.gmail.history_id", "100")
+    daemon = AssistantDaemon(pipeline=FakePipeline(), queue_size=1)
+    daemon.queue.put(WorkItem("m0", "", time.time()))
+
+    poller = threading.Thread(target=daemon.poll_once)
+    poller.start()
+    poller.join(0.2)
+    assert poller.is_alive()
+
+    daemon._stop.set()
+    poller.join(2)
+    assert not poller.is_alive()
+    assert store.get("daemon.gmail.history_id") == "100"
+
+
+def test_daemon_processes_and_drains_on_stop(monkeypatch, tmp_path):
+    """
+    Tests that workers triage each queued message, run its requests and
+    finish the backlog before stopping.
+    """
+    mock_gmail(monkeypatch, tmp_path, {})
+    pipeline = FakePipeline(delay=0.02)
+    daemon = AssistantDaemon(pipeline=pipeline, poll_interval=60, workers=2)
+    for index in range(5):
+        daemon.queue.put(WorkItem(f"m{index}", f"mail {index}", time.time()))
+
+    daemon.start()
+    daemon.stop()
+
+    assert sorted(pipeline.triaged) == [f"mail {index}" for index in range(5)]
+    # Each message is triaged on its own, not by rescanning the inbox.
+    assert pipeline.stages == {"triage_message_task"}
+    assert pipeline.requests == ["request"] * 5
+    assert daemon.queue.empty()
+
+
+def test_processing_failures_are_logged(monkeypatch, tmp_path, caplog):
+    """Tests that a failing message is logged with its traceback."""
+    mock_gmail(monkeypatch, tmp_path, {})
+    pipeline = FakePipeline()
+    monkeypatch.setattr(
+        pipeline, "run", MagicMock(side_effect=RuntimeError("boom"))
+    )
+    daemon = AssistantDaemon(pipeline=pipeline)
+
+    daemon._handle(WorkItem("m1", "mail", time.time()))
+
+    record = next(r for r in caplog.records if r.name == DAEMON)
+    assert record.getMessage() == "Processing message m1 failed"
+    assert "boom" in str(record.exc_info[1])
+
+
+def test_stop_gives_up_on_the_queue_after_the_timeout(monkeypatch, tmp_path):
+    """
+    Tests that stopping waits at most its timeout, after which workers
+    finish their current message and leave the rest of the queue.
+    """
+    mock_gmail(monkeypatch, tmp_path, {})
+    pipeline = FakePipeline(delay=0.5)
+    daemon = AssistantDaemon(
+        pipeline=pipeline, poll_interval=60, queue_size=10, workers=1
+    )
+    for index in range(10):
+        daemon.queue.put(WorkItem(f"m{index}", f"mail {index}", time.time()))
+
+    daemon.start()
+    started = time.monotonic()
+    daemon.stop(timeout=0.2)
+
+    assert time.monotonic() - started < 0.45
+    for thread in daemon._threads:
+        thread.join(2)
+    assert len(pipeline.triaged) <= 2
+    assert not daemon.queue.empty()
+
+
+def test_webhook_notification_wakes_the_poller(monkeypatch, tmp_path):
+    """Tests that a push notification triggers an immediate poll."""
+    mock_gmail(monkeypatch, tmp_path, {})
+    daemon = AssistantDaemon(
+        pipeline=FakePipeline(), poll_interval=60, webhook_port=0
+    )
+    polled = threading.Event()
+    calls = []
+
+    def poll_once():
+        calls.append(time.monotonic())
+        if len(calls) > 1:
+            polled.set()
+        return 0
+
+    monkeypatch.setattr(daemon, "poll_once", poll_once)
+    daemon.webhook_port = _free_port()
+    daemon.start()
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{daemon.webhook_port}/notify",
+            data=b'{"message": {"data": "e30="}}',
+            method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 204
+        assert polled.wait(2)
+    finally:
+        daemon.stop()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -1,14 +1,22 @@
-from unittest.mock import patch
+import json
+from unittest.mock import MagicMock, patch
+
+import httplib2
+from googleapiclient.errors import HttpError
 
 from tests.helpers import (
+    GOOGLE_TOOLS,
     mock_google_auth,
     mock_google_service_build,
+    mock_state_store,
     get_mock_email_list,
     get_mock_email_content,
     get_mock_freebusy_query_response,
     get_mock_event_insert_response,
 )
+from crewai_observability.mime import extract_body
 from crewai_observability.tools.google_tools import (
+    fetch_messages,
     gmail_reader_tool,
     google_calendar_search_tool,
     google_calendar_writer_tool,
@@ -39,6 +47,273 @@ def test_gmail_reader_tool_with_messages(monkeypatch):
     assert "Body: This is a test body." in result
 
 
+def test_gmail_reader_tool_batches_message_fetches(monkeypatch):
+    """
+    Tests that the gmail_reader_tool fetches messages through batch
+    requests instead of one execute() per message.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    monkeypatch.setattr(
+        "crewai_observability.tools.google_tools.GMAIL_BATCH_SIZE", 2
+    )
+    mock_gmail_data = {
+        "list": get_mock_email_list(count=5),
+        "get": get_mock_email_content(subject="Batched", body="Hello"),
+    }
+    service = mock_google_service_build(monkeypatch, "gmail", mock_gmail_data)
+
+    # Act
+    result = gmail_reader_tool.run(query="newer_than:1d")
+
+    # Assert
+    assert result.count("Subject: Batched") == 5
+    assert service.new_batch_http_request.call_count == 3
+    get = service.users.return_value.messages.return_value.get
+    assert get.call_args.kwargs["fields"]
+
+
+def test_fetch_messages_splits_into_concurrent_batches(monkeypatch):
+    """
+    Tests that fetch_messages honours the batch size and maps failed
+    fetches to None.
+    """
+    # Arrange
+    service = mock_google_service_build(monkeypatch, "gmail", {})
+    get = service.users.return_value.messages.return_value.get
+
+    def _get(userId, id, **kwargs):
+        request = MagicMock()
+        if id == "bad":
+            request.execute.side_effect = RuntimeError("boom")
+        else:
+            request.execute.return_value = {"id": id}
+        return request
+
+    get.side_effect = _get
+    message_ids = [f"m{i}" for i in range(7)] + ["bad"]
+    http_factory = MagicMock()
+
+    # Act
+    fetched = fetch_messages(
+        service,
+        message_ids,
+        http_factory=http_factory,
+        batch_size=3,
+        max_concurrency=2,
+    )
+
+    # Assert
+    assert service.new_batch_http_request.call_count == 3
+    assert http_factory.call_count == 3
+    assert fetched["m6"] == {"id": "m6"}
+    assert fetched["bad"] is None
+    assert len(fetched) == 8
+
+
+def test_gmail_reader_tool_follows_page_tokens(monkeypatch):
+    """
+    Tests that the gmail_reader_tool reads every result page and stops
+    requesting pages once GMAIL_MAX_MESSAGES is reached.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    service = mock_google_service_build(
+        monkeypatch,
+        "gmail",
+        {"get": get_mock_email_content(subject="Paged", body="Hi")},
+    )
+    first_page = dict(get_mock_email_list(count=2), nextPageToken="p2")
+    second_page = dict(get_mock_email_list(count=2), nextPageToken="p3")
+    messages = service.users.return_value.messages.return_value
+    messages.list.return_value.execute.side_effect = [first_page, second_page]
+    monkeypatch.setattr(
+        "crewai_observability.tools.google_tools.GMAIL_MAX_MESSAGES", 3
+    )
+
+    # Act
+    result = gmail_reader_tool.run(query="newer_than:1d")
+
+    # Assert
+    assert result.count("Subject: Paged") == 3
+    assert messages.list.call_args.kwargs["pageToken"] == "p2"
+    assert messages.list.return_value.execute.call_count == 2
+
+
+def test_gmail_reader_tool_incremental_sync(monkeypatch, tmp_path):
+    """
+    Tests that incremental mode stores the mailbox historyId after a full
+    scan and only reads history since that checkpoint afterwards.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    store = mock_state_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(
+        "crewai_observability.tools.google_tools.GMAIL_INCREMENTAL_SYNC", True
+    )
+    service = mock_google_service_build(
+        monkeypatch,
+        "gmail",
+        {
+            "list": get_mock_email_list(count=3),
+            "get": get_mock_email_content(subject="Synced", body="Hi"),
+        },
+    )
+    users = service.users.return_value
+    users.getProfile.return_value.execute.return_value = {"historyId": "100"}
+    history = users.history.return_value.list
+    history.return_value.execute.return_value = {
+        "history": [
+            {"messagesAdded": [{"message": {"id": "new1"}}]},
+            {"messagesAdded": [{"message": {"id": "new1"}}]},
+        ],
+        "historyId": "105",
+    }
+
+    # Act
+    first = gmail_reader_tool.run(query="newer_than:1d")
+    second = gmail_reader_tool.run(query="newer_than:1d")
+
+    # Assert
+    assert first.count("Subject: Synced") == 3
+    assert second.count("Subject: Synced") == 1
+    assert history.call_args.kwargs["startHistoryId"] == "100"
+    assert store.get("gmail.history_id") == "105"
+
+
+def test_gmail_reader_tool_keeps_unread_messages_for_the_next_scan(
+    monkeypatch, tmp_path
+):
+    """
+    Tests that messages an incremental scan leaves unread because of the
+    output budget are read by the next scan, although the history
+    checkpoint has moved past them.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    store = mock_state_store(monkeypatch, tmp_path)
+    store.set("gmail.history_id", "100")
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.GMAIL_INCREMENTAL_SYNC", True)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.GMAIL_MAX_OUTPUT_BYTES", 250)
+    service = mock_google_service_build(monkeypatch, "gmail", {})
+    users = service.users.return_value
+    users.messages.return_value.get.side_effect = lambda id, **kwargs: (
+        MagicMock(
+            execute=MagicMock(
+                return_value=get_mock_email_content(
+                    subject=f"Request {id}", body="Can we meet? " * 10
+                )
+            )
+        )
+    )
+    history = users.history.return_value.list.return_value.execute
+    history.side_effect = [
+        {
+            "history": [
+                {"messagesAdded": [{"message": {"id": f"new{i}"}}]}
+                for i in range(3)
+            ],
+            "historyId": "105",
+        },
+        {"historyId": "105"},
+        {"historyId": "105"},
+    ]
+
+    # Act
+    scans = [gmail_reader_tool.run(query="newer_than:1d") for _ in range(3)]
+
+    # Assert
+    read = [
+        line for scan in scans for line in scan.splitlines()
+        if line.startswith("Subject:")
+    ]
+    assert sorted(read) == [f"Subject: Request new{i}" for i in range(3)]
+    assert "Output limit reached" in scans[0]
+    assert store.get("gmail.history_id") == "105"
+    assert store.get("gmail.pending_ids") == []
+
+
+def test_gmail_reader_tool_drops_bulk_mail(monkeypatch):
+    """
+    Tests that the pre-filter keeps bulk mail away from the agent.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    service = mock_google_service_build(
+        monkeypatch, "gmail", {"list": get_mock_email_list(count=2)}
+    )
+    messages = service.users.return_value.messages.return_value
+    messages.get.return_value.execute.side_effect = [
+        get_mock_email_content(
+            subject="This week's deals",
+            body="Book your seat now.",
+            headers={
+                "List-Unsubscribe": "<mailto:unsubscribe@shop.example>",
+                "Precedence": "bulk",
+            },
+        ),
+        get_mock_email_content(
+            subject="Quick sync?", body="Can we meet on Tuesday at 3pm?"
+        ),
+    ]
+
+    # Act
+    result = gmail_reader_tool.run(query="is:unread")
+
+    # Assert
+    assert "Subject: Quick sync?" in result
+    assert "deals" not in result
+
+
+def test_gmail_reader_tool_decodes_each_message_once(monkeypatch):
+    """
+    Tests that the pre-filter and the output share one parse of every
+    message body.
+    """
+    mock_google_auth(monkeypatch)
+    mock_google_service_build(
+        monkeypatch,
+        "gmail",
+        {
+            "list": get_mock_email_list(count=3),
+            "get": get_mock_email_content(subject="Sync", body="Tuesday?"),
+        },
+    )
+
+    with patch(
+        f"{GOOGLE_TOOLS}.extract_body", wraps=extract_body
+    ) as decode:
+        result = gmail_reader_tool.run(query="newer_than:1d")
+
+    assert result.count("Subject: Sync") == 3
+    assert decode.call_count == 3
+
+
+def test_gmail_reader_tool_caps_output(monkeypatch):
+    """
+    Tests that message bodies and the overall output stay within their
+    byte budgets.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.GMAIL_MAX_BODY_BYTES", 50)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.GMAIL_MAX_OUTPUT_BYTES", 250)
+    mock_gmail_data = {
+        "list": get_mock_email_list(count=10),
+        "get": get_mock_email_content(subject="Long", body="word " * 1000),
+    }
+    mock_google_service_build(monkeypatch, "gmail", mock_gmail_data)
+
+    # Act
+    result = gmail_reader_tool.run(query="is:unread")
+
+    # Assert
+    assert len(result.encode("utf-8")) < 400
+    assert 1 <= result.count("Subject: Long") < 10
+    assert "[truncated]" in result
+    assert result.endswith("further messages were not read.]")
+
+
 def test_gmail_reader_tool_no_messages(monkeypatch):
     """
     Tests that the gmail_reader_tool returns the correct message
@@ -132,6 +407,118 @@ def test_google_calendar_writer_tool_success(monkeypatch):
     assert "Event created successfully. Event ID: evt123" in result
 
 
+def test_google_calendar_search_tool_returns_free_slots(monkeypatch):
+    """
+    Tests that the calendar search tool computes candidate slots of the
+    requested duration around the busy periods.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    busy_slots = [
+        {"start": "2024-09-02T09:00:00Z", "end": "2024-09-02T12:00:00Z"}
+    ]
+    mock_calendar_data = {
+        "query": get_mock_freebusy_query_response(busy_slots=busy_slots)
+    }
+    mock_google_service_build(monkeypatch, "calendar", mock_calendar_data)
+
+    # Act
+    result = google_calendar_search_tool.run(
+        start_time="2024-09-02T00:00:00Z",
+        end_time="2024-09-03T00:00:00Z",
+        duration_minutes=60,
+    )
+
+    # Assert
+    assert "Available 60-minute slots:" in result
+    assert "- 2024-09-02T12:00:00Z to 2024-09-02T13:00:00Z" in result
+
+
+def test_google_calendar_search_tool_intersects_attendees(monkeypatch):
+    """
+    Tests that the calendar search tool only proposes slots that are free
+    for the user and every attendee.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    response = {
+        "calendars": {
+            "primary": {
+                "busy": [
+                    {
+                        "start": "2024-09-02T09:00:00Z",
+                        "end": "2024-09-02T10:00:00Z",
+                    }
+                ]
+            },
+            "colleague@example.com": {
+                "busy": [
+                    {
+                        "start": "2024-09-02T10:00:00Z",
+                        "end": "2024-09-02T16:00:00Z",
+                    }
+                ]
+            },
+            "stranger@example.com": {"errors": [{"reason": "notFound"}]},
+        }
+    }
+    mock_google_service_build(monkeypatch, "calendar", {"query": response})
+
+    # Act
+    result = google_calendar_search_tool.run(
+        start_time="2024-09-02T00:00:00Z",
+        end_time="2024-09-03T00:00:00Z",
+        duration_minutes=60,
+        attendees=["colleague@example.com", "stranger@example.com"],
+    )
+
+    # Assert
+    assert "- 2024-09-02T16:00:00Z to 2024-09-02T17:00:00Z" in result
+    assert "- 2024-09-02T09:00:00Z to" not in result
+    assert "Availability could not be read for: stranger@example.com" in (
+        result
+    )
+
+
+def test_calendar_writer_updates_cached_availability(monkeypatch):
+    """
+    Tests that repeated searches are served from the busy cache and that
+    a booking shows up in the next search without another API query.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    busy_slots = [
+        {"start": "2024-09-01T10:00:00Z", "end": "2024-09-01T11:00:00Z"}
+    ]
+    service = mock_google_service_build(
+        monkeypatch,
+        "calendar",
+        {
+            "query": get_mock_freebusy_query_response(busy_slots=busy_slots),
+            "insert": get_mock_event_insert_response(event_id="evt123"),
+        },
+    )
+    window = {
+        "start_time": "2024-09-01T09:00:00Z",
+        "end_time": "2024-09-01T17:00:00Z",
+    }
+
+    # Act
+    google_calendar_search_tool.run(**window)
+    google_calendar_writer_tool.run(
+        event_details={
+            "summary": "Sync",
+            "start": {"dateTime": "2024-09-01T13:00:00Z"},
+            "end": {"dateTime": "2024-09-01T14:00:00Z"},
+        }
+    )
+    result = google_calendar_search_tool.run(**window)
+
+    # Assert
+    assert "- From 2024-09-01T13:00:00Z to 2024-09-01T14:00:00Z" in result
+    assert service.freebusy.return_value.query.call_count == 1
+
+
 @patch("builtins.input", return_value="2")
 def test_human_approval_tool_valid_selection(mock_input):
     """
@@ -154,3 +541,139 @@ def test_human_approval_tool_invalid_then_valid(mock_print, mock_input):
     assert mock_input.call_count == 3
     mock_print.assert_any_call("Please enter a valid number.")
     mock_print.assert_any_call("Invalid selection. Please try again.")
+
+
+def test_google_calendar_writer_tool_never_double_books(monkeypatch):
+    """
+    Tests that events are created with an idempotency key as their ID and
+    that booking them again reports the existing event.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    service = mock_google_service_build(
+        monkeypatch,
+        "calendar",
+        {"insert": get_mock_event_insert_response(event_id="evt123")},
+    )
+    insert = service.events.return_value.insert
+    event_details = {
+        "summary": "Final Review",
+        "start": {"dateTime": "2024-09-01T10:00:00Z"},
+        "end": {"dateTime": "2024-09-01T11:00:00Z"},
+    }
+    google_calendar_writer_tool.run(event_details=event_details)
+    event_id = insert.call_args.kwargs["body"]["id"]
+    insert.return_value.execute.side_effect = HttpError(
+        httplib2.Response({"status": 409}), b"duplicate"
+    )
+
+    # Act
+    result = google_calendar_writer_tool.run(event_details=event_details)
+
+    # Assert
+    assert insert.call_args.kwargs["body"]["id"] == event_id
+    assert result == f"Event already exists. Event ID: {event_id}"
+
+
+def test_google_calendar_writer_tool_books_events_in_bulk(monkeypatch):
+    """
+    Tests that a list of events is booked in one batch, with a result per
+    event, skipping repeats and events over cached busy intervals.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    busy_slots = [
+        {"start": "2024-09-01T10:00:00Z", "end": "2024-09-01T11:00:00Z"}
+    ]
+    service = mock_google_service_build(
+        monkeypatch,
+        "calendar",
+        {
+            "query": get_mock_freebusy_query_response(busy_slots=busy_slots),
+            "insert": {"status": "confirmed"},
+        },
+    )
+    google_calendar_search_tool.run(
+        start_time="2024-09-01T09:00:00Z", end_time="2024-09-01T17:00:00Z"
+    )
+    standup, review, clash = (
+        {
+            "summary": summary,
+            "start": {"dateTime": f"2024-09-01T{hour}:00:00Z"},
+            "end": {"dateTime": f"2024-09-01T{hour}:30:00Z"},
+        }
+        for summary, hour in (("Standup", "09"), ("Review", 13), ("Clash", 10))
+    )
+
+    # Act
+    result = google_calendar_writer_tool.run(
+        event_details=[standup, review, standup, clash]
+    )
+
+    # Assert
+    lines = result.splitlines()
+    assert lines[0] == "Created 2 of 4 events:"
+    assert lines[1].startswith("1. Standup: Event created successfully.")
+    assert lines[2].startswith("2. Review: Event created successfully.")
+    assert lines[3].startswith("3. Standup: Event already exists.")
+    assert lines[4] == (
+        "4. Clash: Event not created, the calendar is busy from "
+        "2024-09-01T10:00:00Z to 2024-09-01T10:30:00Z."
+    )
+    assert service.new_batch_http_request.call_count == 1
+    assert service.events.return_value.insert.call_count == 2
+
+
+def test_tools_return_compact_json_in_structured_mode(monkeypatch):
+    """
+    Tests that with STRUCTURED_OUTPUTS the inbox and calendar tools
+    answer with compact JSON: short keys and busy periods as minute
+    offsets from the start of the search.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.STRUCTURED_OUTPUTS", True)
+    mock_google_service_build(
+        monkeypatch,
+        "gmail",
+        {
+            "list": get_mock_email_list(count=1),
+            "get": get_mock_email_content(
+                subject="Sync?",
+                body="Can we meet\non Monday?",
+            ),
+        },
+    )
+    inbox = json.loads(gmail_reader_tool.run(query="newer_than:1d"))
+    busy_slots = [
+        {"start": "2024-09-02T09:00:00Z", "end": "2024-09-02T12:00:00Z"}
+    ]
+    mock_google_service_build(
+        monkeypatch,
+        "calendar",
+        {"query": get_mock_freebusy_query_response(busy_slots=busy_slots)},
+    )
+
+    # Act
+    availability = json.loads(
+        google_calendar_search_tool.run(
+            start_time="2024-09-02T08:00:00Z",
+            end_time="2024-09-03T00:00:00Z",
+            duration_minutes=60,
+        )
+    )
+
+    # Assert
+    assert inbox == {
+        "m": [
+            {
+                "t": "msg0",
+                "s": "Sync?",
+                "b": "Can we meet on Monday?",
+            }
+        ]
+    }
+    assert availability["t0"] == "2024-09-02T08:00:00Z"
+    assert availability["d"] == 60
+    assert availability["b"] == [[60, 240]]
+    assert availability["s"][0] == "2024-09-02T12:00:00Z"
@@ -0,0 +1,44 @@
+from crewai_observability.intervals import (
+    clip_intervals,
+    event_interval,
+    merge_intervals,
+    subtract_intervals,
+    to_epoch,
+    to_rfc3339,
+)
+
+
+def test_rfc3339_round_trip():
+    """Tests conversion between RFC 3339 strings and epoch seconds."""
+    epoch = to_epoch("2024-09-01T10:00:00Z")
+
+    assert epoch == to_epoch("2024-09-01T12:00:00+02:00")
+    assert to_rfc3339(epoch) == "2024-09-01T10:00:00Z"
+
+
+def test_event_interval_handles_all_day_events():
+    """Tests that date-only events span whole UTC days."""
+    start, end = event_interval(
+        {"start": {"date": "2024-09-01"}, "end": {"date": "2024-09-02"}}
+    )
+
+    assert end - start == 24 * 3600
+    assert to_rfc3339(start) == "2024-09-01T00:00:00Z"
+
+
+def test_merge_intervals_coalesces_overlapping_and_touching():
+    """Tests that overlapping and adjacent intervals are merged."""
+    assert merge_intervals([(5, 7), (1, 3), (3, 4), (6, 9), (10, 10)]) == [
+        (1, 4),
+        (5, 9),
+    ]
+
+
+def test_subtract_and_clip_intervals():
+    """Tests interval subtraction and clipping to a window."""
+    assert subtract_intervals([(0, 10), (20, 30)], [(2, 4), (8, 22)]) == [
+        (0, 2),
+        (4, 8),
+        (22, 30),
+    ]
+    assert clip_intervals([(0, 10), (20, 30)], 5, 25) == [(5, 10), (20, 25)]
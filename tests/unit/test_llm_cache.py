@@ -0,0 +1,114 @@
+from langchain_core.language_models.fake_chat_models import (
+    FakeListChatModel,
+)
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from crewai_observability import llm_cache
+from crewai_observability.llm_cache import (
+    CachedChatOpenAI,
+    LLMResponseCache,
+    cache_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _generations(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+def test_replayed_prompts_are_served_from_cache(tmp_path):
+    """
+    Tests that a chat model with the cache answers a repeated prompt
+    without calling the model again.
+    """
+    cache = LLMResponseCache(str(tmp_path / "llm.db"))
+    model = FakeListChatModel(responses=["first", "second"], cache=cache)
+
+    assert model.invoke("Find a slot for Tuesday").content == "first"
+    assert model.invoke("Find a slot  for\nTuesday").content == "first"
+    assert model.invoke("Find a slot for Friday").content == "second"
+
+
+def test_cache_key_depends_on_model_settings():
+    """Tests that the same prompt is cached separately per model."""
+    assert cache_key("prompt", "gpt-4") != cache_key("prompt", "gpt-4o")
+    assert cache_key("a \\n b", "gpt-4") == cache_key("a b", "gpt-4")
+    # The settings string embeds the cache's repr, address included
+    assert cache_key("p", "<Cache object at 0x7f01>") == cache_key(
+        "p", "<Cache object at 0x7f99>"
+    )
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    """Tests that stale responses are not returned."""
+    clock = FakeClock()
+    cache = LLMResponseCache(str(tmp_path / "llm.db"), ttl=60, clock=clock)
+    cache.update("prompt", "model", _generations("cached"))
+
+    assert cache.lookup("prompt", "model")[0].text == "cached"
+    clock.now += 61
+    assert cache.lookup("prompt", "model") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Tests the size cap keeps the most recently used entries."""
+    clock = FakeClock()
+    cache = LLMResponseCache(
+        str(tmp_path / "llm.db"), max_entries=2, clock=clock
+    )
+    for prompt in ("a", "b"):
+        clock.now += 1
+        cache.update(prompt, "model", _generations(prompt))
+    clock.now += 1
+    cache.lookup("a", "model")
+    clock.now += 1
+    cache.update("c", "model", _generations("c"))
+
+    assert cache.lookup("a", "model") is not None
+    assert cache.lookup("b", "model") is None
+    assert cache.lookup("c", "model") is not None
+
+
+def test_agent_llm_is_opt_in(monkeypatch, tmp_path):
+    """Tests that agents only get a cached model when enabled."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(
+        llm_cache, "_cache", LLMResponseCache(str(tmp_path / "llm.db"))
+    )
+
+    assert llm_cache.agent_llm() is None
+
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    assert llm_cache.agent_llm().cache is llm_cache._cache
+
+
+def test_streaming_agents_go_through_the_cache(monkeypatch, tmp_path):
+    """
+    Tests that stream(), which crewAI's agents use, is answered from the
+    cache on repeated prompts.
+    """
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    calls = []
+
+    def generate(model, messages, stop=None, **kwargs):
+        calls.append(messages)
+        return ChatResult(generations=_generations("Tuesday"))
+
+    monkeypatch.setattr(CachedChatOpenAI, "_generate", generate)
+    model = llm_cache.agent_llm(
+        cache=LLMResponseCache(str(tmp_path / "llm.db"))
+    )
+
+    first = "".join(chunk.content for chunk in model.stream("When?"))
+    second = "".join(chunk.content for chunk in model.stream("When?"))
+
+    assert first == second == "Tuesday"
+    assert len(calls) == 1
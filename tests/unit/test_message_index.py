@@ -0,0 +1,190 @@
+from unittest.mock import patch
+
+import pytest
+from crewai import Task
+from googleapiclient.discovery import build
+
+from crewai_observability.crew import TracedTask
+from crewai_observability.message_index import BloomFilter, MessageIndex
+from crewai_observability.mime import extract_body
+from crewai_observability.tools.google_tools import gmail_reader_tool
+from tests.fake_google import FakeGoogleServer
+from tests.helpers import GOOGLE_TOOLS, mock_google_auth
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = MessageIndex(path=str(tmp_path / "state.db"))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def gmail(monkeypatch, index):
+    """A fake Gmail server behind the Gmail reader tool, with the index."""
+    mock_google_auth(monkeypatch)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.MESSAGE_INDEX_ENABLED", True)
+    monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_message_index", lambda: index)
+    with FakeGoogleServer() as server:
+        service = build("gmail", "v1", http=server.http())
+        monkeypatch.setattr(
+            f"{GOOGLE_TOOLS}.get_service", lambda api, version: service
+        )
+        monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_http", server.http)
+        yield server
+
+
+def test_seen_messages_are_not_fetched_again(gmail, index):
+    """
+    Tests that a second scan skips the messages the first one handed on,
+    before fetching them, and that the index knows their output size.
+    """
+    for i in range(3):
+        gmail.add_message(f"msg{i}", f"Sync {i}", "Can we meet on Tuesday?")
+
+    first = gmail_reader_tool.run(query="newer_than:1d")
+    requests = gmail.http_requests
+    second = gmail_reader_tool.run(query="newer_than:1d")
+
+    assert first.count("Subject: Sync") == 3
+    assert second == "No messages found."
+    # Only the message list was read.
+    assert gmail.http_requests == requests + 1
+    assert index.seen("msg0") == len("Subject: Sync 0\n") + len(
+        "Body: Can we meet on Tuesday?\n---\n"
+    )
+
+
+def test_dropped_messages_are_not_fetched_again(gmail, index):
+    """
+    Tests that messages the pre-filter drops are indexed as dropped, so a
+    second scan skips them before fetching them.
+    """
+    gmail.add_message(
+        "promo",
+        "Weekly deals",
+        "50% off everything this week only.",
+        sender="noreply@shop.example",
+    )
+    gmail.add_message("sync", "Sync", "Can we meet on Tuesday?")
+
+    first = gmail_reader_tool.run(query="newer_than:1d")
+    requests = gmail.http_requests
+    second = gmail_reader_tool.run(query="newer_than:1d")
+
+    assert "Weekly deals" not in first
+    assert second == "No messages found."
+    assert gmail.http_requests == requests + 1
+    assert index.seen("promo") == 0
+
+
+def test_indexing_reuses_the_parsed_message(gmail):
+    """Tests that the index does not decode kept messages again."""
+    for i in range(3):
+        gmail.add_message(f"msg{i}", f"Sync {i}", "Can we meet on Tuesday?")
+
+    with patch(
+        f"{GOOGLE_TOOLS}.extract_body", wraps=extract_body
+    ) as decode:
+        gmail_reader_tool.run(query="newer_than:1d")
+
+    assert decode.call_count == 3
+
+
+def test_messages_of_a_failed_task_are_not_indexed(gmail, index):
+    """
+    Tests that the messages a task scanned are only indexed once it
+    completes, so a failed triage hands them on again.
+    """
+    gmail.add_message("msg0", "Sync", "Can we meet on Tuesday?")
+    task = TracedTask(
+        description="Scan the inbox.",
+        expected_output="Meeting requests.",
+        name="scan_inbox_task",
+    )
+
+    def scan_then_fail(*args, **kwargs):
+        gmail_reader_tool.run(query="newer_than:1d")
+        raise RuntimeError("LLM unavailable")
+
+    def scan(*args, **kwargs):
+        assert index.seen("msg0") is None
+        return gmail_reader_tool.run(query="newer_than:1d")
+
+    with patch.object(Task, "execute", scan_then_fail):
+        with pytest.raises(RuntimeError):
+            task.execute()
+    assert index.seen("msg0") is None
+
+    with patch.object(Task, "execute", scan):
+        assert "Subject: Sync" in task.execute()
+    assert index.seen("msg0") is not None
+
+
+def test_threads_collapse_to_their_newest_message(gmail):
+    """
+    Tests that a reply chain reaches triage once, as its newest message,
+    and that copies of one mail are handed on once.
+    """
+    gmail.add_message("a", "Planning", "Can we meet Monday?", thread_id="t")
+    gmail.add_message("b", "Re: Planning", "Tuesday works too.", thread_id="t")
+    gmail.add_message("c", "Lunch", "Lunch on Friday?", sender="ann@x.org")
+    gmail.add_message("d", "Lunch", "Lunch on Friday?", sender="ann@x.org")
+
+    result = gmail_reader_tool.run(query="newer_than:1d")
+
+    assert "Subject: Re: Planning" in result
+    assert "Subject: Planning" not in result
+    assert result.count("Subject: Lunch") == 1
+
+
+def test_new_replies_to_a_known_thread_are_handed_on(gmail):
+    """
+    Tests that a reply arriving after a thread was triaged is handed on,
+    while an older message of the thread seen for the first time is not.
+    """
+    gmail.add_message("old", "Planning", "Can we meet?", thread_id="t")
+    gmail.add_message("first", "Re: Planning", "Monday?", thread_id="t")
+    gmail_reader_tool.run(query="newer_than:1d")
+    # Forget the older message was ever listed, as if it had been
+    # archived and restored.
+    gmail.messages["old"]["id"] = "restored"
+    gmail.messages["restored"] = gmail.messages.pop("old")
+    gmail.add_message("reply", "Re: Planning", "Or Tuesday?", thread_id="t")
+
+    result = gmail_reader_tool.run(query="newer_than:1d")
+
+    assert "Body: Or Tuesday?" in result
+    assert "Can we meet?" not in result
+
+
+def test_compaction_drops_expired_entries(tmp_path):
+    """Tests that entries not seen within the retention period expire."""
+    now = [1_000_000.0]
+    index = MessageIndex(
+        path=str(tmp_path / "state.db"),
+        retention_days=1,
+        compact_interval=3600,
+        clock=lambda: now[0],
+    )
+    index.record([("old", "t1", 1, "digest-old", 10)])
+    now[0] += 2 * 86400
+    index.record([("new", "t2", 2, "digest-new", 20)])
+
+    assert index.seen("old") is None
+    assert not index.has_content("digest-old")
+    assert index.thread_received("t1") is None
+    assert index.seen("new") == 20
+    assert index.thread_received("t2") == 2
+    index.close()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Tests that every key added is found, and few others are."""
+    bloom = BloomFilter(1000)
+    for i in range(1000):
+        bloom.add(f"message:{i}")
+
+    assert all(f"message:{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other:{i}" in bloom for i in range(10000))
+    assert false_positives < 300
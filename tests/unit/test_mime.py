@@ -0,0 +1,95 @@
+import base64
+
+from crewai_observability.mime import (
+    extract_body,
+    iter_decoded,
+    strip_quoted,
+    truncate,
+)
+
+
+def _encode(text):
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def test_extract_body_walks_nested_multipart():
+    """
+    Tests that the plain text body is found inside nested multipart parts
+    and that attachments are skipped.
+    """
+    payload = {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {
+                "mimeType": "multipart/alternative",
+                "parts": [
+                    {
+                        "mimeType": "text/plain",
+                        "body": {"data": _encode("Lunch on Friday?")},
+                    },
+                    {
+                        "mimeType": "text/html",
+                        "body": {"data": _encode("<p>Lunch?</p>")},
+                    },
+                ],
+            },
+            {
+                "mimeType": "text/plain",
+                "filename": "notes.txt",
+                "body": {"attachmentId": "att1"},
+            },
+        ],
+    }
+
+    assert extract_body(payload, max_bytes=1000) == "Lunch on Friday?"
+
+
+def test_extract_body_falls_back_to_html():
+    """Tests HTML-to-text conversion when there is no plain text part."""
+    html = (
+        "<html><head><style>p {color: red}</style></head><body>"
+        "<p>Can we meet &amp; talk?</p><div>Thursday  works</div>"
+        "<script>track()</script></body></html>"
+    )
+    payload = {"mimeType": "text/html", "body": {"data": _encode(html)}}
+
+    assert extract_body(payload, max_bytes=1000) == (
+        "Can we meet & talk?\nThursday works"
+    )
+
+
+def test_strip_quoted_removes_replies_and_signatures():
+    """Tests removal of quoted history and signature blocks."""
+    text = (
+        "Tuesday works for me.\n"
+        "> Does Tuesday work?\n"
+        "Thanks\n"
+        "-- \n"
+        "Jane Doe | Example Corp\n"
+    )
+    reply = (
+        "Sounds good.\n\n"
+        "On Mon, 1 Jan 2024 at 10:00, Jane Doe <jane@example.com>\n"
+        "wrote:\n"
+        "Let's meet.\n"
+    )
+
+    assert strip_quoted(text) == "Tuesday works for me.\nThanks"
+    assert strip_quoted(reply) == "Sounds good."
+    assert strip_quoted("Ok\nSent from my iPhone") == "Ok"
+
+
+def test_iter_decoded_stops_at_the_limit():
+    """Tests that decoding stops once the byte budget is reached."""
+    data = _encode("a" * 10_000)
+
+    chunks = list(iter_decoded(data, limit=100, chunk_bytes=30))
+
+    assert b"".join(chunks) == b"a" * 100
+    assert len(chunks) == 4
+
+
+def test_truncate_respects_utf8_boundaries():
+    """Tests that truncation never splits a multi-byte character."""
+    assert truncate("short", 10) == "short"
+    assert truncate("héllo wörld", 2) == "h\n[truncated]"
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import defaultdict
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.runnables import Runnable
+
+from crewai_observability.checkpoints import CheckpointStore
+from crewai_observability.crew import SchedulingCrew
+from crewai_observability.pipeline import (
+    SchedulingPipeline,
+    default_stage_limits,
+    parse_stage_limits,
+    split_requests,
+)
+
+
+class FakeStageCrew:
+    """Records how many crews of each stage run at the same time."""
+
+    active = defaultdict(int)
+    peak = defaultdict(int)
+    lock = threading.Lock()
+
+    def __init__(self, stage, context):
+        self.stage = stage
+        self.context = context
+
+    def kickoff(self):
+        with self.lock:
+            self.active[self.stage] += 1
+            self.peak[self.stage] = max(
+                self.peak[self.stage], self.active[self.stage]
+            )
+        time.sleep(0.02)
+        with self.lock:
+            self.active[self.stage] -= 1
+        if self.stage == "scan_inbox_task":
+            return '[{"thread_id": "t1"}, {"thread_id": "t2"}, "t3", "t4"]'
+        if "fail" in self.context:
+            raise RuntimeError("stage failed")
+        return f"{self.stage}({self.context})"
+
+
+@pytest.fixture(autouse=True)
+def checkpoints(monkeypatch, tmp_path):
+    """Points the pipeline at a fresh checkpoint store."""
+    store = CheckpointStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(
+        "crewai_observability.pipeline.get_checkpoint_store", lambda: store
+    )
+    return store
+
+
+class FakeCrewFactory:
+    def stage_crew(self, stage, context=None):
+        return FakeStageCrew(stage, context)
+
+
+def test_split_requests_handles_wrapped_and_missing_json():
+    """Tests extraction of meeting requests from the triage output."""
+    wrapped = 'Found these:\n{"requests": [{"thread_id": "a"}, "b"]}'
+
+    assert split_requests(wrapped) == ['{"thread_id": "a"}', "b"]
+    assert split_requests("[]") == []
+    assert split_requests("No meeting requests today.") == []
+
+
+def test_parse_stage_limits():
+    """Tests parsing of the per-stage concurrency limit setting."""
+    assert parse_stage_limits("find_slots_task=3, confirm_time_task=1") == {
+        "find_slots_task": 3,
+        "confirm_time_task": 1,
+    }
+
+
+def test_pipeline_fans_out_requests_within_stage_limits():
+    """
+    Tests that every request runs through all stages concurrently while
+    each stage stays within its own concurrency limit.
+    """
+    FakeStageCrew.peak.clear()
+    pipeline = SchedulingPipeline(
+        crew_factory=FakeCrewFactory,
+        max_workers=4,
+        stage_limits={
+            "find_slots_task": 4,
+            "confirm_time_task": 1,
+            "create_event_task": 2,
+        },
+    )
+
+    results = list(pipeline.kickoff())
+
+    assert len(results) == 4
+    assert all(result.ok for result in results)
+    assert {result.output for result in results} == {
+        "create_event_task(confirm_time_task(find_slots_task(t3)))",
+        "create_event_task(confirm_time_task(find_slots_task(t4)))",
+        'create_event_task(confirm_time_task(find_slots_task({"thread_id": '
+        '"t1"})))',
+        'create_event_task(confirm_time_task(find_slots_task({"thread_id": '
+        '"t2"})))',
+    }
+    assert FakeStageCrew.peak["find_slots_task"] > 1
+    assert FakeStageCrew.peak["confirm_time_task"] == 1
+    assert FakeStageCrew.peak["create_event_task"] <= 2
+
+
+def test_brokered_approvals_run_on_every_worker(monkeypatch):
+    """
+    Tests that with approvals queued on the broker, the confirmation
+    stage is no longer limited to one request at a time.
+    """
+    monkeypatch.setattr(
+        "crewai_observability.pipeline.PIPELINE_STAGE_LIMITS",
+        default_stage_limits("broker"),
+    )
+    FakeStageCrew.peak.clear()
+    pipeline = SchedulingPipeline(crew_factory=FakeCrewFactory, max_workers=4)
+
+    assert all(result.ok for result in pipeline.kickoff())
+    assert FakeStageCrew.peak["confirm_time_task"] > 1
+    assert "confirm_time_task=1" in default_stage_limits("console")
+
+
+def test_pipeline_isolates_failing_requests():
+    """Tests that one failing request does not stop the others."""
+    pipeline = SchedulingPipeline(crew_factory=FakeCrewFactory)
+
+    results = list(pipeline.run(["ok", "fail"]))
+
+    failed = [result for result in results if not result.ok]
+    assert len(results) == 2
+    assert len(failed) == 1
+    assert failed[0].request == "fail"
+    assert failed[0].outputs == {}
+
+
+def test_stage_crew_runs_a_single_task_with_context():
+    """Tests that stage crews wrap one task and carry the stage input."""
+    with patch("crewai.agent.ChatOpenAI") as mock_chat_openai:
+        mock_llm = MagicMock()
+        mock_llm.bind.return_value = MagicMock(spec=Runnable)
+        mock_chat_openai.return_value = mock_llm
+
+        crew = SchedulingCrew().stage_crew(
+            "find_slots_task", "Let's meet on Monday."
+        )
+
+    assert len(crew.tasks) == 1
+    assert len(crew.agents) == 1
+    assert crew.agents[0].role == "Calendar Coordination Specialist"
+    assert crew.tasks[0].description.endswith("Input:\nLet's meet on Monday.")
+
+
+def test_pipeline_reuses_crews_across_stages_and_runs():
+    """
+    Tests that the crew configuration and agents are built once per crew
+    running at the same time, not once per stage.
+    """
+    built = []
+
+    def crew_factory():
+        built.append(FakeCrewFactory())
+        return built[-1]
+
+    pipeline = SchedulingPipeline(crew_factory=crew_factory, max_workers=1)
+
+    for _ in range(2):
+        assert all(result.ok for result in pipeline.kickoff())
+
+    assert len(built) == 1
+
+
+def test_stage_crews_reuse_their_agent_without_stacking_inputs():
+    """Tests that a stage's agent is reused with only the latest input."""
+    with patch("crewai.agent.ChatOpenAI") as mock_chat_openai:
+        mock_llm = MagicMock()
+        mock_llm.bind.return_value = MagicMock(spec=Runnable)
+        mock_chat_openai.return_value = mock_llm
+
+        scheduling_crew = SchedulingCrew()
+        first = scheduling_crew.stage_crew("find_slots_task", "Monday?")
+        second = scheduling_crew.stage_crew("find_slots_task", "Tuesday?")
+
+    assert mock_chat_openai.call_count == 1
+    assert second.agents[0] is first.agents[0]
+    description = second.tasks[0].description
+    assert description.endswith("Input:\nTuesday?")
+    assert "Monday?" not in description
+
+
+def test_message_triage_crew_cannot_read_the_inbox():
+    """
+    Tests that the message triage stage classifies its input with an
+    agent that has no Gmail tool, and stays out of the sequential crew.
+    """
+    with patch("crewai.agent.ChatOpenAI") as mock_chat_openai:
+        mock_llm = MagicMock()
+        mock_llm.bind.return_value = MagicMock(spec=Runnable)
+        mock_chat_openai.return_value = mock_llm
+
+        crew = SchedulingCrew().stage_crew(
+            "triage_message_task", "Subject: Sync\nBody: Monday?"
+        )
+        full_crew = SchedulingCrew().crew()
+
+    assert crew.agents[0].role == "Inbox Analyst"
+    assert crew.agents[0].tools == []
+    assert crew.tasks[0].description.endswith("Body: Monday?")
+    assert [task.name for task in full_crew.tasks] == [
+        "scan_inbox_task",
+        "find_slots_task",
+        "confirm_time_task",
+        "create_event_task",
+    ]
+
+
+def test_pipeline_resumes_after_the_last_completed_stage(checkpoints):
+    """
+    Tests that a resumed request skips the stages checkpointed for its
+    thread by an earlier, interrupted run.
+    """
+    request = '{"thread_id": "t9"}'
+    interrupted = SchedulingPipeline(crew_factory=FakeCrewFactory)
+    with patch.object(
+        FakeStageCrew,
+        "kickoff",
+        side_effect=["slots", RuntimeError("approval timed out")],
+    ):
+        assert not interrupted.process_request(request).ok
+
+    resumed = SchedulingPipeline(crew_factory=FakeCrewFactory, resume=True)
+    with patch.object(
+        FakeStageCrew, "kickoff", side_effect=["slot 1", "booked"]
+    ) as kickoff:
+        result = resumed.process_request(request)
+
+    assert result.ok
+    assert result.outputs == {
+        "find_slots_task": "slots",
+        "confirm_time_task": "slot 1",
+        "create_event_task": "booked",
+    }
+    assert kickoff.call_count == 2
+    assert checkpoints.completed("t9") == result.outputs
@@ -0,0 +1,138 @@
+import datetime
+
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from crewai_observability import prefetch, tool_metrics
+from crewai_observability.calendar_cache import BusyCache
+from crewai_observability.intervals import to_epoch
+from crewai_observability.prefetch import calendar_prefetch, prefetch_window
+from crewai_observability.tools.google_tools import (
+    google_calendar_search_tool,
+)
+from tests.fake_google import FakeGoogleServer
+from tests.helpers import GOOGLE_TOOLS
+
+WINDOW = (to_epoch("2024-09-02T00:00:00Z"), to_epoch("2024-09-10T00:00:00Z"))
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Records the spans of the tools and the prefetch in memory."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    monkeypatch.setattr(tool_metrics, "tracer", tracer)
+    monkeypatch.setattr(prefetch, "tracer", tracer)
+    return exporter
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """
+    Provides a fake Calendar server with a busy user and attendee, wired
+    into the calendar search tool, and the tool's busy cache.
+    """
+    cache = BusyCache(sync_ids=[])
+    with FakeGoogleServer(latency=0.02) as server:
+        for calendar_id in ("primary", "ann@example.com"):
+            server.add_busy(
+                calendar_id, "2024-09-02T09:00:00Z", "2024-09-02T12:00:00Z"
+            )
+
+        # A transport per request, as prefetch and search share the service.
+        def _request(http, *args, **kwargs):
+            return HttpRequest(server.http(), *args, **kwargs)
+
+        service = build(
+            "calendar", "v3", http=server.http(), requestBuilder=_request
+        )
+        monkeypatch.setattr(
+            f"{GOOGLE_TOOLS}.get_service", lambda api, version: service
+        )
+        monkeypatch.setattr(f"{GOOGLE_TOOLS}.get_busy_cache", lambda: cache)
+        yield server, service, cache
+
+
+def _search():
+    return google_calendar_search_tool.run(
+        start_time="2024-09-02T00:00:00Z",
+        end_time="2024-09-07T00:00:00Z",
+        duration_minutes=60,
+        attendees=["ann@example.com"],
+    )
+
+
+def test_prefetch_window_spans_the_next_working_days():
+    """
+    Tests that the window runs from the start of today to the end of the
+    fifth working day ahead, plus a day of slack.
+    """
+    friday = datetime.datetime(2024, 9, 6, 15, tzinfo=datetime.timezone.utc)
+
+    start, end = prefetch_window(friday.timestamp(), time_zone="UTC")
+
+    assert start == to_epoch("2024-09-06T00:00:00Z")
+    assert end == to_epoch("2024-09-15T00:00:00Z")
+
+
+def test_slot_search_is_served_from_the_prefetch(calendar, spans):
+    """
+    Tests that the user's calendar is read by the prefetch, so the slot
+    search only queries the attendee's, and that the search span shows
+    how much fetch time the prefetch saved.
+    """
+    server, service, cache = calendar
+
+    with calendar_prefetch(
+        enabled=True, window=WINDOW, cache=cache, service=service
+    ) as running:
+        running.wait()
+        result = _search()
+
+    assert "- 2024-09-02T12:00:00Z to 2024-09-02T13:00:00Z" in result
+    assert cache.api_calls == 2
+    assert server.http_requests == 2
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    assert "prefetch calendar" in finished
+    search = finished["tool Google Calendar Search Tool"].attributes
+    assert search["calendar.prefetch.hit"] is True
+    assert search["calendar.prefetch.calendars"] == ("primary",)
+    assert search["calendar.prefetch.saved"] > 0
+
+
+def test_failed_prefetch_leaves_the_search_to_fetch(calendar, spans):
+    """Tests that a failed prefetch only costs the search its head start."""
+    server, service, cache = calendar
+    server.fail_next(1, status=500)
+
+    with calendar_prefetch(
+        enabled=True, window=WINDOW, cache=cache, service=service
+    ) as running:
+        running.wait()
+        result = _search()
+
+    assert running.error is not None
+    assert "- 2024-09-02T12:00:00Z to 2024-09-02T13:00:00Z" in result
+    search = {
+        span.name: span for span in spans.get_finished_spans()
+    }["tool Google Calendar Search Tool"].attributes
+    assert search["calendar.prefetch.saved"] == 0
+
+
+def test_prefetch_is_off_by_default(calendar):
+    """Tests that nothing is read ahead unless CALENDAR_PREFETCH is set."""
+    server, _, _ = calendar
+
+    with calendar_prefetch() as running:
+        pass
+
+    assert running is None
+    assert server.http_requests == 0
@@ -0,0 +1,46 @@
+from crewai_observability.prefilter import keep_message, score_message
+
+
+def test_meeting_language_scores_higher_than_plain_mail():
+    """Tests that meeting phrases, times and days raise the score."""
+    plain = score_message({}, "Invoice", "Please find the invoice attached.")
+    request = score_message(
+        {}, "Catch up", "Let's meet next week, does Tuesday at 10am work?"
+    )
+
+    assert plain == 0
+    assert request >= 4
+
+
+def test_bulk_headers_lower_the_score():
+    """Tests the mailing list and automated sender heuristics."""
+    headers = {
+        "list-unsubscribe": "<https://news.example/unsub>",
+        "list-id": "news.example",
+        "precedence": "Bulk",
+        "from": "Example News <no-reply@news.example>",
+    }
+
+    assert score_message(headers, "Weekly digest", "Read more") == -8
+    assert score_message({"auto-submitted": "auto-replied"}, "Re", "") == -3
+    assert score_message({"auto-submitted": "no"}, "Re", "") == 0
+
+
+def test_keep_message_applies_the_threshold():
+    """Tests that the drop threshold decides what reaches triage."""
+    newsletter = {"list-unsubscribe": "<mailto:u@news.example>"}
+
+    assert keep_message({}, "Hello", "How are you?")
+    assert not keep_message(newsletter, "Sale", "Free shipping")
+    assert not keep_message({}, "Hello", "How are you?", threshold=1)
+    assert keep_message({}, "Call", "Can we talk?", threshold=1)
+
+
+def test_only_a_bounded_prefix_is_scanned(monkeypatch):
+    """Tests that meeting language buried deep in a body is ignored."""
+    monkeypatch.setattr(
+        "crewai_observability.prefilter.PREFILTER_SCAN_CHARS", 100
+    )
+    body = "x " * 500 + "let's meet tomorrow"
+
+    assert score_message({}, "Notes", body) == 0
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from crewai_observability import tool_metrics, usage
+from crewai_observability.profiling import profiling
+from crewai_observability.tool_metrics import instrumented
+from crewai_observability.usage import run_span
+
+_retained = []
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Records the run and tool spans in memory."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    monkeypatch.setattr(tool_metrics, "tracer", tracer)
+    monkeypatch.setattr(usage, "tracer", tracer)
+    yield exporter
+    _retained.clear()
+
+
+def _parse_busily(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(1000))
+    return total
+
+
+@instrumented("Busy Tool")
+def _busy_tool():
+    return _parse_busily(0.2)
+
+
+def _finished(exporter, name):
+    return next(s for s in exporter.get_finished_spans() if s.name == name)
+
+
+def test_tool_spans_carry_their_hot_stacks(spans):
+    """
+    Tests that a profiled tool span records the stacks it spent its time
+    in, and that the time was spent on the CPU.
+    """
+    with profiling(enabled=True, interval=0.002):
+        _busy_tool()
+
+    attributes = _finished(spans, "tool Busy Tool").attributes
+    assert attributes["profile.samples"] > 10
+    hottest = attributes["profile.stacks"][0]
+    assert "_busy_tool (test_profiling.py);_parse_busily" in hottest
+    assert attributes["profile.cpu_time"] > 0.1
+    assert attributes["profile.overhead"] >= 0
+
+
+def test_spans_are_not_profiled_by_default(spans):
+    """Tests that profiling is opt-in."""
+    _busy_tool()
+
+    attributes = _finished(spans, "tool Busy Tool").attributes
+    assert "profile.samples" not in attributes
+
+
+def test_run_profiles_every_thread_and_memory(spans, tmp_path):
+    """
+    Tests that a run's profile samples its worker threads, records the
+    memory the run allocated, and is written out as collapsed stacks.
+    """
+    with profiling(
+        enabled=True, interval=0.002, memory=True, output_dir=str(tmp_path)
+    ):
+        with run_span("test"):
+            worker = threading.Thread(
+                target=_parse_busily, args=(0.1,), name="worker"
+            )
+            worker.start()
+            _retained.append(bytearray(4_000_000))
+            worker.join()
+
+    attributes = _finished(spans, "run test").attributes
+    assert any(
+        stack.startswith("worker;") and "_parse_busily" in stack
+        for stack in attributes["profile.stacks"]
+    )
+    assert attributes["profile.memory.delta"] > 3_000_000
+    assert "test_profiling.py" in attributes["profile.memory.top"][0]
+    folded = (tmp_path / attributes["profile.file"]).read_text()
+    assert all(
+        line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines()
+    )
+
+
+def test_sampler_stops_with_the_last_profile(spans):
+    """Tests that no sampling thread is left running between spans."""
+    with profiling(enabled=True, interval=0.002):
+        _busy_tool()
+
+    deadline = time.monotonic() + 1
+    while time.monotonic() < deadline and any(
+        thread.name == "profiler" for thread in threading.enumerate()
+    ):
+        time.sleep(0.01)
+    assert not any(t.name == "profiler" for t in threading.enumerate())
@@ -0,0 +1,153 @@
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from crewai_observability import clients
+from crewai_observability.ratelimit import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RequestExecutor,
+    TokenBucket,
+)
+from crewai_observability.tools.google_tools import fetch_messages
+from tests.fake_google import FakeGoogleServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    """
+    Provides a fake Gmail server, a service whose requests go through the
+    client's executor, and the delays that executor slept for.
+    """
+    sleeps = []
+    executor = RequestExecutor(
+        "gmail",
+        breaker=CircuitBreaker(threshold=2, reset_timeout=30),
+        max_retries=3,
+        backoff_base=0.1,
+        sleep=sleeps.append,
+        jitter=lambda: 1.0,
+    )
+    monkeypatch.setattr(clients, "get_executor", lambda api: executor)
+    with FakeGoogleServer(message_count=3) as server:
+        service = build(
+            "gmail",
+            "v1",
+            http=server.http(),
+            requestBuilder=clients._InstrumentedRequest,
+        )
+        yield server, service, executor, sleeps
+
+
+def test_token_bucket_delays_requests_over_quota():
+    """Tests that a bucket hands out its capacity, then its refill rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, clock=clock)
+
+    assert bucket.reserve(5) == 0
+    assert bucket.reserve(5) == 0
+    assert bucket.reserve(5) == pytest.approx(0.5)
+    clock.now = 1.0
+    assert bucket.reserve(5) == 0
+    # Requests larger than the bucket wait for a full one.
+    assert bucket.reserve(50) == pytest.approx(1.0)
+
+
+def test_circuit_breaker_opens_and_lets_one_trial_through():
+    """Tests the closed, open and half-open states of the breaker."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=clock)
+
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.state == "half-open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_rate_limited_trial_call_closes_the_circuit():
+    """
+    Tests that a 429 answering the half-open trial call counts as the API
+    being up, so the retry and later calls are let through.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, clock=clock)
+    executor = RequestExecutor(
+        "gmail", breaker=breaker, sleep=lambda delay: None
+    )
+    breaker.record_failure()
+    clock.now = 10
+    responses = [HttpError(httplib2.Response({"status": 429}), b""), "ok"]
+
+    def _call():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert executor.execute(_call) == "ok"
+    assert breaker.state == "closed"
+    clock.now = 1000
+    assert executor.execute(lambda: "later") == "later"
+
+
+def test_rate_limited_requests_honour_retry_after(gmail):
+    """Tests that 429s are retried after the server's Retry-After."""
+    server, service, _, sleeps = gmail
+    server.fail_next(2, retry_after=3)
+
+    listing = service.users().messages().list(userId="me").execute()
+
+    assert len(listing["messages"]) == 3
+    assert sleeps == [3.0, 3.0]
+
+
+def test_rate_limited_batch_calls_are_fetched_again(gmail):
+    """
+    Tests that messages rate-limited inside a batch are fetched again
+    after a backoff, and only those.
+    """
+    server, service, executor, sleeps = gmail
+    server.fail_next(2)
+
+    fetched = fetch_messages(
+        service, list(server.messages), server.http, executor=executor
+    )
+
+    assert all(message is not None for message in fetched.values())
+    assert sleeps == [0.1]
+    assert server.http_requests == 2
+
+
+def test_failing_api_opens_the_circuit(gmail):
+    """
+    Tests that an API that keeps failing is given up on once its circuit
+    opens, and then not called at all.
+    """
+    server, service, _, sleeps = gmail
+    server.fail_next(4, status=503)
+    request = service.users().messages().list(userId="me")
+
+    with pytest.raises(HttpError):
+        request.execute()
+    with pytest.raises(CircuitOpenError):
+        request.execute()
+
+    assert server.http_requests == 2
+    assert sleeps == [0.1]
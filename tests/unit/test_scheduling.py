@@ -0,0 +1,112 @@
+from crewai_observability.intervals import to_epoch, to_rfc3339
+from crewai_observability.scheduling import (
+    find_free_slots,
+    merge_busy,
+    pick_slots,
+    working_windows,
+)
+
+# Monday 2 September 2024
+MONDAY = "2024-09-02"
+
+
+def _at(clock, day=MONDAY):
+    return to_epoch(f"{day}T{clock}:00Z")
+
+
+def test_merge_busy_combines_calendars_with_buffer():
+    """Tests that busy blocks of several calendars are merged and padded."""
+    busy = {
+        "a": [(_at("10:00"), _at("11:00")), (_at("14:00"), _at("15:00"))],
+        "b": [(_at("11:05"), _at("12:00"))],
+    }
+
+    assert merge_busy(busy, buffer=5 * 60) == [
+        (_at("09:55"), _at("12:05")),
+        (_at("13:55"), _at("15:05")),
+    ]
+
+
+def test_working_windows_skip_weekends_and_follow_time_zones():
+    """Tests working windows over a weekend in a non-UTC time zone."""
+    windows = working_windows(
+        _at("00:00", "2024-08-30"),
+        _at("23:59", "2024-09-02"),
+        time_zone="Europe/Berlin",
+        hours=(9, 17),
+        days=(0, 1, 2, 3, 4),
+    )
+
+    # Friday and Monday only; 09:00 CEST is 07:00 UTC.
+    assert [(to_rfc3339(s), to_rfc3339(e)) for s, e in windows] == [
+        ("2024-08-30T07:00:00Z", "2024-08-30T15:00:00Z"),
+        ("2024-09-02T07:00:00Z", "2024-09-02T15:00:00Z"),
+    ]
+
+
+def test_pick_slots_prefers_distinct_gaps():
+    """Tests that the first pick of each gap comes before later starts."""
+    free = [(_at("09:00"), _at("11:00")), (_at("13:10"), _at("14:00"))]
+
+    slots = pick_slots(free, duration=30 * 60, step=30 * 60, count=3)
+
+    assert slots == [
+        (_at("09:00"), _at("09:30")),
+        (_at("09:30"), _at("10:00")),
+        (_at("13:30"), _at("14:00")),
+    ]
+
+
+def test_find_free_slots_respects_every_attendee():
+    """Tests that slots avoid the busy time of all calendars."""
+    busy = {
+        "primary": [(_at("09:00"), _at("10:00"))],
+        "colleague@example.com": [(_at("10:00"), _at("12:00"))],
+    }
+
+    slots = find_free_slots(
+        busy,
+        _at("00:00"),
+        _at("23:59"),
+        duration_minutes=60,
+        count=2,
+        time_zone="UTC",
+        hours=(9, 17),
+        buffer_minutes=0,
+        step_minutes=30,
+    )
+
+    assert slots == [
+        (_at("12:00"), _at("13:00")),
+        (_at("13:00"), _at("14:00")),
+    ]
+
+
+def test_find_free_slots_returns_nothing_when_fully_booked():
+    """Tests that a fully booked day yields no candidates."""
+    busy = {"primary": [(_at("08:00"), _at("18:00"))]}
+
+    assert find_free_slots(busy, _at("00:00"), _at("23:59"), 30) == []
+
+
+def test_slots_align_to_the_local_clock():
+    """
+    Tests that slot starts fall on whole steps of local time in zones
+    whose offset is not a multiple of the step.
+    """
+    slots = find_free_slots(
+        {"primary": []},
+        _at("00:00"),
+        _at("23:59"),
+        duration_minutes=30,
+        time_zone="Asia/Kathmandu",
+        hours=(9, 17),
+        step_minutes=30,
+    )
+
+    # 09:00 in Kathmandu (+05:45) is 03:15 UTC.
+    assert [to_rfc3339(start) for start, _ in slots] == [
+        "2024-09-02T03:15:00Z",
+        "2024-09-02T03:45:00Z",
+        "2024-09-02T04:15:00Z",
+    ]
@@ -0,0 +1,22 @@
+from crewai_observability.state import StateStore
+
+
+def test_state_store_round_trips_json_values(tmp_path):
+    """Tests that values are stored as JSON and can be deleted."""
+    store = StateStore(str(tmp_path / "state.db"))
+
+    store.set("checkpoint", {"history_id": "42", "pages": [1, 2]})
+
+    assert store.get("checkpoint") == {"history_id": "42", "pages": [1, 2]}
+    store.delete("checkpoint")
+    assert store.get("checkpoint", "missing") == "missing"
+
+
+def test_state_store_persists_across_instances(tmp_path):
+    """Tests that a new store over the same file sees earlier writes."""
+    path = str(tmp_path / "state.db")
+    first = StateStore(path)
+    first.set("gmail.history_id", "100")
+    first.close()
+
+    assert StateStore(path).get("gmail.history_id") == "100"
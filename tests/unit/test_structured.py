@@ -0,0 +1,81 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from langchain_core.runnables import Runnable
+
+from crewai_observability import crew as crew_module
+from crewai_observability.crew import SchedulingCrew
+from crewai_observability.structured import (
+    Availability,
+    ConfirmedSlot,
+    MeetingRequests,
+    ProposedSlots,
+    encode,
+    output_format,
+    parse_output,
+)
+
+
+def test_output_format_describes_nested_models():
+    """Tests the one-line JSON shape added to structured tasks."""
+    assert output_format(MeetingRequests) == (
+        "Answer with JSON only: "
+        '{"requests":[{"thread_id":"str","body":"str"}]}'
+    )
+
+
+def test_results_are_encoded_with_short_keys():
+    """Tests that tool results drop absent fields and use their aliases."""
+    availability = Availability(
+        start="2024-09-02T09:00:00Z",
+        duration=30,
+        busy=[(0, 60)],
+        slots=["2024-09-02T10:00:00Z"],
+    )
+
+    assert encode(availability) == (
+        '{"t0":"2024-09-02T09:00:00Z","d":30,"b":[[0,60]],'
+        '"s":["2024-09-02T10:00:00Z"]}'
+    )
+
+
+def test_parse_output_reads_json_wrapped_in_prose():
+    """Tests that answers are validated without an LLM conversion."""
+    text = (
+        "Final answer:\n"
+        '{"topic": "Sync", "attendees": ["a@example.com"], '
+        '"start": "2024-09-02T10:00:00Z", "end": "2024-09-02T10:30:00Z"}'
+    )
+
+    slot = parse_output(ConfirmedSlot, text)
+
+    assert slot.topic == "Sync"
+    assert parse_output(ConfirmedSlot, '{"topic": "Sync"}') is None
+    assert parse_output(ConfirmedSlot, "No JSON here.") is None
+
+
+def test_structured_tasks_hand_on_compact_json(monkeypatch):
+    """
+    Tests that with STRUCTURED_OUTPUTS tasks declare their output model,
+    ask for its JSON, and pass their answer on as compact JSON.
+    """
+    monkeypatch.setattr(crew_module, "STRUCTURED_OUTPUTS", True)
+    with patch("crewai.agent.ChatOpenAI") as chat_openai:
+        llm = MagicMock()
+        llm.bind.return_value = MagicMock(spec=Runnable)
+        chat_openai.return_value = llm
+        task = SchedulingCrew().find_slots_task()
+
+    assert task.output_pydantic is ProposedSlots
+    assert task.expected_output == (
+        f"Three proposed slot start times. {output_format(ProposedSlots)}"
+    )
+
+    exported = task._export_output(
+        "Here are the slots:\n"
+        '{"topic": "Sync", "attendees": ["a@example.com"], '
+        '"duration_minutes": 30, "slots": ["2024-09-02T10:00:00Z"]}'
+    )
+
+    assert json.loads(exported)["slots"] == ["2024-09-02T10:00:00Z"]
+    assert " " not in exported
@@ -0,0 +1,63 @@
+import os
+
+from crewai_observability.accounts import current_account
+from crewai_observability.supervisor import (
+    Supervisor,
+    plan_shards,
+    run_shard,
+    shard_of,
+)
+
+ACCOUNTS = [f"user{i}@example.com" for i in range(12)]
+
+
+def count_requests(account):
+    """Stand-in for process_account; runs in the worker processes."""
+    if "fail" in account:
+        raise RuntimeError("token revoked")
+    assert current_account() == account
+    return int(account[len("user"):].split("@")[0]) % 3
+
+
+def test_accounts_always_map_to_the_same_shard():
+    """Tests that the shard plan covers every account once, stably."""
+    plan = plan_shards(ACCOUNTS, 4)
+
+    assert sorted(a for accounts in plan.values() for a in accounts) == (
+        sorted(ACCOUNTS)
+    )
+    for shard, accounts in plan.items():
+        assert all(shard_of(account, 4) == shard for account in accounts)
+    assert plan_shards(reversed(ACCOUNTS), 4).keys() == plan.keys()
+
+
+def test_failing_accounts_do_not_stop_the_shard():
+    """Tests that a shard reports failures and goes on to the next account."""
+    accounts = ["fail@example.com", "user5@example.com"]
+
+    report = run_shard(0, accounts, count_requests)
+
+    assert report.processed == 1
+    assert report.failed == 1
+    assert report.requests == 2
+    assert "RuntimeError: token revoked" in report.errors["fail@example.com"]
+
+
+def test_supervisor_serves_every_account_from_worker_processes():
+    """
+    Tests that the supervisor runs each shard in a worker process and
+    collects one report per shard.
+    """
+    supervisor = Supervisor(accounts=ACCOUNTS, shards=3, work=count_requests)
+
+    reports = sorted(supervisor.run(), key=lambda report: report.shard)
+
+    assert [report.shard for report in reports] == list(supervisor.plan())
+    assert sum(report.processed for report in reports) == len(ACCOUNTS)
+    assert sum(report.requests for report in reports) == sum(
+        i % 3 for i in range(len(ACCOUNTS))
+    )
+    for report in reports:
+        assert report.accounts == supervisor.plan()[report.shard]
+        assert report.to_dict()["accounts"] == len(report.accounts)
+        assert report.pid != os.getpid()
@@ -0,0 +1,57 @@
+import pathlib
+import time
+
+import yaml
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from crewai_observability.telemetry import span_processor
+
+DOCKER = pathlib.Path(__file__).parent.parent.parent / "docker"
+
+
+def test_span_processor_exports_full_batches_without_waiting():
+    """
+    Tests that spans are exported once a batch is full, well before the
+    export interval.
+    """
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        span_processor(exporter, queue_size=8, batch_size=2, interval=60)
+    )
+    tracer = provider.get_tracer(__name__)
+
+    for i in range(4):
+        tracer.start_span(f"span{i}").end()
+    deadline = time.monotonic() + 5
+    while len(exporter.get_finished_spans()) < 4:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    provider.shutdown()
+
+
+def test_production_collector_profile_samples_and_sheds_load():
+    """
+    Tests that the production collector profile limits memory first,
+    tail-samples traces and only references components it defines.
+    """
+    config = yaml.safe_load(
+        (DOCKER / "otel-collector-config.production.yaml").read_text()
+    )
+    pipelines = config["service"]["pipelines"]
+
+    for pipeline in pipelines.values():
+        assert pipeline["processors"][0] == "memory_limiter"
+        assert pipeline["processors"][-1] == "batch"
+        assert set(pipeline["processors"]) <= set(config["processors"])
+        assert set(pipeline["exporters"]) <= set(config["exporters"])
+    assert "tail_sampling" in pipelines["traces"]["processors"]
+    policies = {
+        policy["type"]
+        for policy in config["processors"]["tail_sampling"]["policies"]
+    }
+    assert policies == {"status_code", "latency", "probabilistic"}
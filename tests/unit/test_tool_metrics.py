@@ -0,0 +1,150 @@
+import importlib.util
+from unittest.mock import MagicMock
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from tests.helpers import (
+    mock_google_auth,
+    mock_google_service_build,
+    get_mock_email_list,
+    get_mock_email_content,
+)
+from crewai_observability import telemetry, tool_metrics
+from crewai_observability.tools.google_tools import (
+    gmail_reader_tool,
+    google_calendar_writer_tool,
+)
+
+INSTRUMENTS = (
+    "tool_requests",
+    "tool_errors",
+    "tool_duration",
+    "tool_pages",
+    "tool_messages",
+    "tool_bytes_decoded",
+    "api_requests",
+    "api_errors",
+    "api_duration",
+)
+
+
+@pytest.fixture
+def instruments(monkeypatch):
+    """Replaces the tool metric instruments with mocks."""
+    mocks = {}
+    for name in INSTRUMENTS:
+        mocks[name] = MagicMock()
+        monkeypatch.setattr(tool_metrics, name, mocks[name])
+    return mocks
+
+
+def _recorded(instrument):
+    return [(c.args[0], c.args[1]) for c in instrument.call_args_list]
+
+
+def test_gmail_reader_tool_records_its_work(monkeypatch, instruments):
+    """
+    Tests that a Gmail read records one request, its duration, and the
+    pages, messages and body bytes it read.
+    """
+    # Arrange
+    mock_google_auth(monkeypatch)
+    mock_google_service_build(
+        monkeypatch,
+        "gmail",
+        {
+            "list": get_mock_email_list(count=3),
+            "get": get_mock_email_content(body="Can we meet on Monday?"),
+        },
+    )
+    attributes = {"tool": "Gmail Reader Tool"}
+
+    # Act
+    gmail_reader_tool.run(query="is:unread")
+
+    # Assert
+    assert _recorded(instruments["tool_requests"].add) == [(1, attributes)]
+    assert not instruments["tool_errors"].add.called
+    assert _recorded(instruments["tool_pages"].record) == [(1, attributes)]
+    assert _recorded(instruments["tool_messages"].record) == [(3, attributes)]
+    [(decoded, _)] = _recorded(instruments["tool_bytes_decoded"].record)
+    assert decoded >= 3 * len("Can we meet on Monday?")
+    assert _recorded(instruments["api_requests"].add) == [
+        (1, {"api_method": "gmail.batch", "tool": "Gmail Reader Tool"})
+    ]
+
+
+def test_failing_tool_records_an_error(monkeypatch, instruments):
+    """Tests that a tool that raises is counted as a request and an error."""
+    # Arrange
+    mock_google_auth(monkeypatch)
+    service = mock_google_service_build(monkeypatch, "calendar", {})
+    insert = service.events.return_value.insert.return_value
+    insert.execute.side_effect = TimeoutError("timed out")
+
+    # Act
+    with pytest.raises(TimeoutError):
+        google_calendar_writer_tool.func(event_details={"summary": "Sync"})
+
+    # Assert
+    tool = {"tool": "Google Calendar Writer Tool"}
+    assert _recorded(instruments["tool_requests"].add) == [(1, tool)]
+    assert _recorded(instruments["tool_errors"].add) == [
+        (1, {**tool, "error.type": "TimeoutError"})
+    ]
+    assert instruments["tool_duration"].record.call_count == 1
+
+
+def test_api_call_is_attributed_to_the_running_tool(instruments):
+    """
+    Tests that API calls record their method and the tool they were made
+    for, and are recorded without a tool outside of one.
+    """
+
+    @tool_metrics.instrumented("Some Tool")
+    def some_tool():
+        with tool_metrics.api_call("calendar.events.insert"):
+            pass
+
+    # Act
+    some_tool()
+    with tool_metrics.api_call("gmail.users.getProfile"):
+        pass
+
+    # Assert
+    assert _recorded(instruments["api_requests"].add) == [
+        (1, {"api_method": "calendar.events.insert", "tool": "Some Tool"}),
+        (1, {"api_method": "gmail.users.getProfile"}),
+    ]
+
+
+def test_duration_histograms_use_second_scale_buckets(monkeypatch):
+    """
+    Tests that tool and API durations, recorded in seconds, are bucketed
+    in seconds rather than with the SDK's millisecond-scale defaults.
+    """
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader])
+    monkeypatch.setattr(telemetry, "meter", provider.get_meter("test"))
+    spec = importlib.util.find_spec("crewai_observability.tool_metrics")
+    metrics = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(metrics)
+
+    metrics.tool_duration.record(0.3, {"tool": "Gmail Reader Tool"})
+    metrics.api_duration.record(0.04, {"method": "gmail.users.list"})
+
+    points = {
+        metric.name: metric.data.data_points[0]
+        for resource in reader.get_metrics_data().resource_metrics
+        for scope in resource.scope_metrics
+        for metric in scope.metrics
+    }
+    tool = points["assistant.tool.duration"]
+    api = points["assistant.google_api.duration"]
+    assert tuple(tool.explicit_bounds) == tool_metrics.DURATION_BUCKETS
+    assert tuple(api.explicit_bounds) == tool_metrics.DURATION_BUCKETS
+    # 0.3 s lands in (0.25, 0.5], not in the first bucket.
+    assert tool.bucket_counts[5] == 1
+    assert api.bucket_counts[2] == 1
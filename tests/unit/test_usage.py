@@ -0,0 +1,132 @@
+from unittest.mock import MagicMock
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+
+from crewai_observability import usage
+from crewai_observability.usage import (
+    AGENT_ATTRIBUTE,
+    RUN_ATTRIBUTE,
+    TASK_ATTRIBUTE,
+    TokenBudgetExceeded,
+    UsageSpanProcessor,
+    parse_prices,
+    price_of,
+)
+
+PRICES = {"gpt-4": (0.03, 0.06), "gpt-4o": (0.005, 0.015)}
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    """Provides a usage processor on a private tracer provider."""
+    for name in ("llm_tokens", "llm_cost", "run_tokens", "run_cost"):
+        monkeypatch.setattr(usage, name, MagicMock())
+    processor = UsageSpanProcessor(prices=PRICES, budget=1000)
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    processor.tracer = provider.get_tracer("test")
+    return processor
+
+
+def _llm_call(tracer, prompt, completion, model="gpt-4o-2024-05-13"):
+    with tracer.start_as_current_span(
+        "openai.chat",
+        attributes={
+            "gen_ai.response.model": model,
+            "gen_ai.usage.prompt_tokens": prompt,
+            "gen_ai.usage.completion_tokens": completion,
+        },
+    ):
+        pass
+
+
+def test_prices_match_the_longest_model_prefix():
+    """Tests price table parsing and model matching."""
+    prices = parse_prices("gpt-4=0.03/0.06, gpt-4o=0.005/0.015")
+
+    assert prices == PRICES
+    assert price_of(prices, "gpt-4o-mini", 1000, 1000) == pytest.approx(0.02)
+    assert price_of(prices, "gpt-4-0613", 1000, 0) == pytest.approx(0.03)
+    assert price_of(prices, "claude", 1000, 1000) == 0.0
+
+
+def test_usage_is_charged_to_the_enclosing_task_and_run(processor):
+    """
+    Tests that LLM spans are attributed to the nearest task span and that
+    the run's total is recorded when it ends.
+    """
+    tracer = processor.tracer
+
+    # Act
+    with tracer.start_as_current_span(
+        "run crew", attributes={RUN_ATTRIBUTE: "crew"}
+    ) as run:
+        with tracer.start_as_current_span(
+            "task scan_inbox_task",
+            attributes={
+                TASK_ATTRIBUTE: "scan_inbox_task",
+                AGENT_ATTRIBUTE: "email_triage_agent",
+            },
+        ):
+            _llm_call(tracer, 100, 20)
+            _llm_call(tracer, 200, 40)
+        run_total = processor.run_usage(run)
+
+    # Assert
+    labels = {
+        "model": "gpt-4o-2024-05-13",
+        "task": "scan_inbox_task",
+        "agent": "email_triage_agent",
+    }
+    usage.llm_tokens.add.assert_any_call(
+        200, {**labels, "token.type": "prompt"}
+    )
+    usage.llm_cost.add.assert_any_call(pytest.approx(0.0016), labels)
+    assert run_total.prompt_tokens == 300
+    assert run_total.completion_tokens == 60
+    usage.run_tokens.record.assert_called_once_with(360)
+
+
+def test_usage_reported_by_nested_spans_is_counted_once(processor):
+    """
+    Tests that a LangChain span wrapping an OpenAI span reporting the same
+    call does not double the count.
+    """
+    tracer = processor.tracer
+
+    # Act
+    with tracer.start_as_current_span(
+        "run crew", attributes={RUN_ATTRIBUTE: "crew"}
+    ) as run:
+        with tracer.start_as_current_span(
+            "ChatOpenAI.chat",
+            attributes={
+                "gen_ai.usage.prompt_tokens": 100,
+                "gen_ai.usage.completion_tokens": 20,
+            },
+        ):
+            _llm_call(tracer, 100, 20)
+        run_total = processor.run_usage(run)
+
+    # Assert
+    assert run_total.total_tokens == 120
+    assert usage.llm_cost.add.call_count == 1
+
+
+def test_check_budget_aborts_a_run_over_budget(processor):
+    """Tests that a run is stopped once it used more than its budget."""
+    tracer = processor.tracer
+
+    with tracer.start_as_current_span(
+        "run request", attributes={RUN_ATTRIBUTE: "request"}
+    ):
+        _llm_call(tracer, 600, 100)
+        processor.check_budget()
+
+        _llm_call(tracer, 300, 100)
+        with pytest.raises(TokenBudgetExceeded):
+            processor.check_budget()
+
+    # Outside of a run there is nothing to enforce.
+    processor.check_budget()